@@ -0,0 +1,103 @@
+# scripts/16_build_geometry_lod.py
+# Build a level-of-detail pyramid of boundary GeoJSONs from the full-resolution
+# Stats NZ shapefile. Uses mapshaper (same tool as ta2025_ms_5pct.geojson) because
+# it simplifies shared arcs once, so neighbouring TAs keep identical borders and
+# `-clean` removes any slivers/overlaps left behind.
+#
+# Usage:
+#   npm install -g mapshaper          # or let the script fall back to `npx mapshaper`
+#   python scripts/16_build_geometry_lod.py               # TA 2025
+#   python scripts/16_build_geometry_lod.py --layer ta --force
+#
+# Output: data_raw/geometry_lod/{layer}_{interval}m.geojson + {layer}_lod.json
+# (per-level tolerance, byte size and feature count; read by scripts/geo_lod.py)
+
+import argparse
+import json
+import math
+import shutil
+import subprocess
+from pathlib import Path
+
+from geo_lod import LOD_DIR, manifest_path
+
+RAW = Path("data_raw")
+
+# layer -> (source folder with a single .shp, id field, fields to keep)
+LAYERS = {
+    "ta": (RAW / "ta_2025_gen", "TA2025_V1_", ["TA2025_V1_", "TA2025_V_2", "AREA_SQ_KM"]),
+}
+
+# Simplification intervals in metres (coarse -> fine). Roughly one level per
+# mapbox zoom step between all-of-NZ (z4) and a city view (z11).
+INTERVALS_M = [5000, 2000, 1000, 500, 200, 100, 50, 20]
+
+
+def mapshaper_cmd() -> list:
+    exe = shutil.which("mapshaper")
+    if exe:
+        return [exe]
+    if shutil.which("npx"):
+        return ["npx", "--yes", "mapshaper"]
+    raise SystemExit("mapshaper not found. Install it with: npm install -g mapshaper")
+
+
+def precision_for(interval_m: float) -> str:
+    # keep coordinates to ~1/10 of the tolerance (degrees), never coarser than 3 d.p.
+    decimals = max(3, math.ceil(-math.log10(interval_m / 111_320 / 10)))
+    return f"{10 ** -decimals:.{decimals}f}"
+
+
+def build_level(cmd: list, shp: Path, fields: list, interval_m: int, out: Path):
+    subprocess.check_call(cmd + [
+        "-i", shp.as_posix(), "snap",
+        "-proj", "wgs84",
+        "-simplify", f"interval={interval_m}", "keep-shapes",
+        "-clean",
+        "-filter-fields", ",".join(fields),
+        "-o", "format=geojson", f"precision={precision_for(interval_m)}",
+        "bbox", out.as_posix(), "force",
+    ])
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--layer", default="ta", choices=sorted(LAYERS))
+    ap.add_argument("--force", action="store_true", help="rebuild levels that already exist")
+    args = ap.parse_args()
+
+    src_dir, id_field, fields = LAYERS[args.layer]
+    shps = list(src_dir.glob("*.shp"))
+    if not shps:
+        raise SystemExit(f"No .shp found in {src_dir}. Did you unzip the shapefile?")
+    shp = shps[0]
+
+    LOD_DIR.mkdir(parents=True, exist_ok=True)
+    cmd = mapshaper_cmd()
+
+    levels = []
+    for interval in INTERVALS_M:
+        name = f"{args.layer}_{interval}m.geojson"
+        out = LOD_DIR / name
+        if args.force or not out.exists() or out.stat().st_mtime < shp.stat().st_mtime:
+            print(f"→ Simplifying {shp.name} @ {interval} m …")
+            build_level(cmd, shp, fields, interval, out)
+
+        with open(out) as f:
+            gj = json.load(f)
+        levels.append({
+            "file": name,
+            "interval_m": interval,
+            "bytes": out.stat().st_size,
+            "features": len(gj["features"]),
+        })
+        print(f"   {name:<22} {out.stat().st_size / 1e6:6.2f} MB  ({len(gj['features'])} features)")
+
+    man = {"layer": args.layer, "source": shp.name, "id_field": id_field, "levels": levels}
+    with open(manifest_path(args.layer), "w") as f:
+        json.dump(man, f, indent=2)
+    print(f"✅ Wrote {manifest_path(args.layer)} ({len(levels)} levels)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+# scripts/17_assign_geography.py
+# Tag points with their TA / regional council / health region (geo_assign.py).
+#
+# Default: every LAWA monitoring site -> data_proc/lawa_sites_geography.csv, so air
+# quality can be joined to health by location instead of LAWA's free-text Region.
+# Any CSV of coordinates works too; it is streamed in chunks, so file size is not a limit.
+#
+#   python scripts/17_assign_geography.py
+#   python scripts/17_assign_geography.py --csv points.csv --lon-col x --lat-col y --out points_geo.csv
+#   python scripts/17_assign_geography.py --geo ta health_region
+
+import argparse
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from geo_assign import DERIVED, GEOGRAPHIES, assign
+from lawa_io import load_lawa
+
+OUT_SITES = Path("data_proc/lawa_sites_geography.csv")
+CHUNK_ROWS = 2_000_000
+
+
+def lawa_sites() -> pd.DataFrame:
+    df = load_lawa(columns=["region", "site_name", "lawa_site_id", "lat", "lon"])
+    return (df.dropna(subset=["lat", "lon"])
+              .groupby(["region", "site_name", "lawa_site_id"], as_index=False, observed=True)
+              [["lat", "lon"]].first())
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--csv", type=Path, help="CSV with coordinates (default: LAWA sites)")
+    ap.add_argument("--lon-col", default="lon")
+    ap.add_argument("--lat-col", default="lat")
+    ap.add_argument("--out", type=Path, help="default: <csv>_geo.csv, or " + str(OUT_SITES))
+    ap.add_argument("--geo", nargs="+", choices=list(GEOGRAPHIES) + list(DERIVED),
+                    help="geographies to assign (default: all available)")
+    args = ap.parse_args()
+
+    if args.csv is None:
+        chunks = [lawa_sites()]
+        out = args.out or OUT_SITES
+    else:
+        chunks = pd.read_csv(args.csv, chunksize=CHUNK_ROWS)
+        out = args.out or args.csv.with_name(args.csv.stem + "_geo.csv")
+    out.parent.mkdir(parents=True, exist_ok=True)
+
+    n, t0 = 0, time.perf_counter()
+    for i, chunk in enumerate(chunks):
+        zones = assign(chunk[args.lon_col], chunk[args.lat_col], args.geo)
+        chunk.join(zones).to_csv(out, mode="w" if i == 0 else "a", header=i == 0, index=False)
+        n += len(chunk)
+    dt = time.perf_counter() - t0
+    print(f"✅ Wrote {out}  points={n:,}  ({n / max(dt, 1e-9):,.0f} points/s incl. I/O)")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,8 @@ import rasterio
 from rasterstats import zonal_stats
 import pandas as pd
 
+from storage import save
+
 RAW = Path("data_raw")
 OUT = Path("data_proc")
 OUT.mkdir(exist_ok=True)
@@ -54,5 +56,5 @@ res["radiance_max"]     = [d["max"]    for d in zs]
 res["radiance_countpx"] = [d["count"]  for d in zs]
 
 out_csv = OUT / f"viirs_ta_annual_{year}.csv"
-res.to_csv(out_csv, index=False)
+save(res, out_csv)
 print(f"✅ Saved {out_csv} with {len(res)} rows. Columns: {list(res.columns)}")
\ No newline at end of file
@@ -0,0 +1,214 @@
+# scripts/21_render_viirs_tiles.py
+# Render annual (or trend) VIIRS rasters into colour-mapped XYZ tile pyramids so
+# the actual pixels can be shown as a tile layer instead of only TA averages.
+#
+# Each zoom is read through a WarpedVRT aligned to the Web-Mercator tile grid, so
+# GDAL pulls from the source overviews when zoomed out and every tile is a plain
+# 256×256 window. Tile columns are rendered in parallel; empty (dark/nodata)
+# tiles are never written; years whose source and settings are unchanged are skipped.
+#
+# Usage:
+#   python scripts/21_render_viirs_tiles.py                     # every data_raw/viirs_annual_*.tif
+#   python scripts/21_render_viirs_tiles.py --year 2021 --maxzoom 11
+#   python scripts/21_render_viirs_tiles.py --src data_raw/viirs_trend.tif --name trend \
+#       --scale linear --cmap RdBu_r --vmin -0.5 --vmax 0.5
+#   python scripts/21_render_viirs_tiles.py --build-overviews   # one-off, speeds up low zooms
+#
+# Output: docs/tiles/viirs/{name}/{z}/{x}/{y}.png|webp, docs/tiles/viirs/manifest.json,
+#         docs/viirs_pixels_map.html
+
+import argparse
+import json
+import os
+import re
+import shutil
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import numpy as np
+import rasterio
+from affine import Affine
+from matplotlib import colormaps
+from PIL import Image
+from rasterio.enums import Resampling
+from rasterio.vrt import WarpedVRT
+from rasterio.windows import Window
+
+from tiles import NZ_BOUNDS, lonlat_to_merc, maplibre_page, tile_bounds, tile_range, tile_size_m
+
+RAW = Path("data_raw")
+DOCS = Path("docs")
+OUT_ROOT = DOCS / "tiles" / "viirs"
+MANIFEST = OUT_ROOT / "manifest.json"
+PATTERN = re.compile(r"viirs_annual_(\d{4})\.tif$", re.I)
+
+TILE = 256
+
+
+# ---------- colour mapping ----------
+def make_lut(cmap: str) -> np.ndarray:
+    return (colormaps[cmap](np.linspace(0, 1, 256)) * 255).astype("uint8")
+
+
+def colorize(arr: np.ma.MaskedArray, lut: np.ndarray, vmin: float, vmax: float,
+             scale: str) -> np.ndarray | None:
+    """RGBA uint8 tile, or None if nothing in it is worth drawing."""
+    data = arr.filled(np.nan).astype("float32")
+    if scale == "log":
+        valid = np.isfinite(data) & (data >= vmin)   # darker than vmin -> transparent
+        if not valid.any():
+            return None
+        norm = (np.log10(np.clip(data, vmin, vmax)) - np.log10(vmin)) / (np.log10(vmax) - np.log10(vmin))
+    else:
+        valid = np.isfinite(data)
+        if not valid.any():
+            return None
+        norm = (np.clip(data, vmin, vmax) - vmin) / (vmax - vmin)
+    idx = np.nan_to_num(norm * 255, nan=0).astype("uint8")
+    rgba = lut[idx]
+    rgba[..., 3] = np.where(valid, rgba[..., 3], 0)
+    return rgba
+
+
+# ---------- per-zoom grid ----------
+def zoom_grid(z: int) -> tuple:
+    """Tile range over NZ and the matching (transform, width, height) in EPSG:3857."""
+    mx0, my0 = lonlat_to_merc(NZ_BOUNDS[0], NZ_BOUNDS[1])
+    mx1, my1 = lonlat_to_merc(NZ_BOUNDS[2], NZ_BOUNDS[3])
+    x0, y0, x1, y1 = tile_range((float(mx0), float(my0), float(mx1), float(my1)), z)
+    left, _, _, top = tile_bounds(z, x0, y0)
+    res = tile_size_m(z) / TILE
+    transform = Affine(res, 0, left, 0, -res, top)
+    return (x0, y0, x1, y1), transform, (x1 - x0 + 1) * TILE, (y1 - y0 + 1) * TILE
+
+
+def render_column(src_path: str, z: int, x: int, out_dir: str, opts: dict) -> int:
+    """Render one tile column at zoom z (runs in a worker process)."""
+    (x0, y0, x1, y1), transform, width, height = zoom_grid(z)
+    lut = make_lut(opts["cmap"])
+    written = 0
+    with rasterio.open(src_path) as src:
+        nodata = src.nodata if src.nodata is not None else opts["nodata"]
+        with WarpedVRT(src, crs="EPSG:3857", transform=transform, width=width, height=height,
+                       resampling=Resampling.average, src_nodata=nodata, nodata=nodata) as vrt:
+            for y in range(y0, y1 + 1):
+                win = Window((x - x0) * TILE, (y - y0) * TILE, TILE, TILE)
+                arr = vrt.read(1, window=win, masked=True)
+                if arr.mask.all():
+                    continue
+                rgba = colorize(arr, lut, opts["vmin"], opts["vmax"], opts["scale"])
+                if rgba is None:
+                    continue
+                out = Path(out_dir) / str(z) / str(x) / f"{y}.{opts['fmt']}"
+                out.parent.mkdir(parents=True, exist_ok=True)
+                img = Image.fromarray(rgba, "RGBA")
+                if opts["fmt"] == "webp":
+                    img.save(out, "WEBP", lossless=False, quality=85)
+                else:
+                    img.save(out, "PNG", optimize=True)
+                written += 1
+    return written
+
+
+def render(src: Path, name: str, opts: dict, workers: int) -> int:
+    out_dir = OUT_ROOT / name
+    if out_dir.exists():
+        shutil.rmtree(out_dir)
+    out_dir.mkdir(parents=True)
+    total = 0
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        for z in range(opts["minzoom"], opts["maxzoom"] + 1):
+            (x0, _, x1, _), *_ = zoom_grid(z)
+            futs = [ex.submit(render_column, src.as_posix(), z, x, out_dir.as_posix(), opts)
+                    for x in range(x0, x1 + 1)]
+            n = sum(f.result() for f in as_completed(futs))
+            total += n
+            print(f"   {name} z{z:<2} {n:6d} tiles")
+    return total
+
+
+def build_overviews(path: Path):
+    with rasterio.open(path, "r+") as ds:
+        if ds.overviews(1):
+            return
+        factors = [2, 4, 8, 16, 32, 64]
+        ds.build_overviews(factors, Resampling.average)
+        ds.update_tags(ns="rio_overview", resampling="average")
+    print(f"   built overviews for {path.name}")
+
+
+def fingerprint(path: Path, opts: dict) -> dict:
+    st = path.stat()
+    return {"source": path.as_posix(), "size": st.st_size, "mtime_ns": st.st_mtime_ns, "opts": opts}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--year", type=int, action="append", help="repeatable; default: all annual rasters")
+    ap.add_argument("--src", type=Path, help="render an arbitrary raster (e.g. a trend) instead")
+    ap.add_argument("--name", help="pyramid name for --src (default: file stem)")
+    ap.add_argument("--minzoom", type=int, default=3)
+    ap.add_argument("--maxzoom", type=int, default=10)
+    ap.add_argument("--format", dest="fmt", choices=["png", "webp"], default="png")
+    ap.add_argument("--cmap", default="magma")
+    ap.add_argument("--scale", choices=["log", "linear"], default="log")
+    ap.add_argument("--vmin", type=float, default=0.5, help="nW/cm²·sr; darker pixels are transparent")
+    ap.add_argument("--vmax", type=float, default=80.0)
+    ap.add_argument("--nodata", type=float, default=0.0, help="used when the raster has no nodata set")
+    ap.add_argument("--workers", type=int, default=os.cpu_count())
+    ap.add_argument("--build-overviews", action="store_true")
+    ap.add_argument("--force", action="store_true")
+    args = ap.parse_args()
+
+    if args.src:
+        jobs = [(args.src, args.name or args.src.stem)]
+    else:
+        tifs = sorted(p for p in RAW.glob("viirs_annual_*.tif") if PATTERN.search(p.name))
+        if args.year:
+            tifs = [p for p in tifs if int(PATTERN.search(p.name).group(1)) in args.year]
+        jobs = [(p, PATTERN.search(p.name).group(1)) for p in tifs]
+    if not jobs:
+        raise SystemExit("No rasters to render (expected data_raw/viirs_annual_YYYY.tif or --src).")
+
+    opts = {k: getattr(args, k) for k in ("minzoom", "maxzoom", "fmt", "cmap", "scale",
+                                          "vmin", "vmax", "nodata")}
+    OUT_ROOT.mkdir(parents=True, exist_ok=True)
+    manifest = json.loads(MANIFEST.read_text()) if MANIFEST.exists() else {}
+
+    for src, name in jobs:
+        if not src.exists():
+            raise FileNotFoundError(f"Missing raster: {src}")
+        fp = fingerprint(src, opts)
+        prev = manifest.get(name, {})
+        if not args.force and {k: prev.get(k) for k in fp} == fp and (OUT_ROOT / name).exists():
+            print(f"✔️ {name}: unchanged, skipping")
+            continue
+        if args.build_overviews:
+            build_overviews(src)
+            fp = fingerprint(src, opts)   # building overviews touches the file
+        print(f"→ Rendering {src.name} as '{name}' (z{args.minzoom}–{args.maxzoom}) …")
+        n = render(src, name, opts, args.workers)
+        manifest[name] = {**fp, "tiles": n}
+        MANIFEST.write_text(json.dumps(manifest, indent=2))
+        print(f"✅ {name}: {n} tiles → {OUT_ROOT / name}")
+
+    # docs page: latest annual pyramid over the basemap
+    annual = sorted(k for k in manifest if k.isdigit())
+    if annual:
+        latest = annual[-1]
+        m = manifest[latest]["opts"]
+        lut = make_lut(m["cmap"])
+        html = maplibre_page(
+            f"NZ night-time radiance — VIIRS {latest} pixels",
+            rasters=[{"id": "viirs", "url": f"tiles/viirs/{latest}/{{z}}/{{x}}/{{y}}.{m['fmt']}",
+                      "minzoom": m["minzoom"], "maxzoom": m["maxzoom"], "opacity": 0.9}],
+            legend=f"Radiance (nW/cm²·sr, {m['scale']} scale)",
+            colors=["#%02x%02x%02x" % tuple(lut[i, :3]) for i in (0, 64, 128, 191, 255)],
+            legend_ticks=(f"{m['vmin']:g}", f"{m['vmax']:g}"),
+        )
+        (DOCS / "viirs_pixels_map.html").write_text(html, encoding="utf-8")
+        print(f"✅ Saved → {DOCS / 'viirs_pixels_map.html'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,18 @@
 # scripts/30_plot_choropleth.py
-import json
 import pandas as pd
 import plotly.express as px
-import plotly.io as pio
 from shapely.geometry import shape
 
-# 1) Load data and make TA code strings like '001','011',...
-df = pd.read_csv("data_proc/viirs_ta_annual_2021_with_names.csv")
-df["ta_code_str"] = (
-    pd.to_numeric(df["ta_code"], errors="coerce")
-      .astype("Int64").astype(str).str.zfill(3)
-)
+from geo_lod import load_layer
+from site_assets import write_html
+from storage import load
+
+# 1) Load data (ta_code_str: fixed-width codes like '001', '011', ...)
+df = load("data_proc/viirs_ta_annual_2021_with_names.csv", columns=["ta_code_str", "ta_name", "radiance_mean"])
 
-# 2) Load small GeoJSON (fast in browser)
-with open("data_raw/ta2025_ms_5pct.geojson") as f:
-    gj = json.load(f)
+# 2) Load the smallest GeoJSON level that still looks sharp at this zoom
+ZOOM = 4.9
+gj = load_layer("ta", zoom=ZOOM)
 
 # 3) Make 5 quantile bands for strong visual contrast
 bands = ["Very low", "Low", "Medium", "High", "Very high"]
@@ -32,7 +30,7 @@ fig = px.choropleth_mapbox(
     color_discrete_sequence=px.colors.sequential.Viridis,
     mapbox_style="carto-positron",
     center={"lat": -41.3, "lon": 174.7},
-    zoom=4.9,
+    zoom=ZOOM,
     opacity=0.78,
     title="NZ night-time brightness by Territorial Authority (VIIRS 2021)"
 )
@@ -83,7 +81,7 @@ fig.add_scattermapbox(
     showlegend=False,
     name=""             # ← no “trace 5”
 )
-# 7) Save interactive HTML (CDN keeps file small)
+# 7) Save interactive HTML (thin page + shared geometry/data assets)
 fig.update_layout(
     title=dict(
         text="NZ night-time brightness by Territorial Authority (VIIRS 2021)",
@@ -101,10 +99,5 @@ fig.update_layout(
     ],
     margin=dict(l=10, r=10, t=50, b=40)
 )
-pio.write_html(
-    fig,
-    file="data_proc/ta_brightness_map.html",
-    include_plotlyjs="cdn",
-    full_html=True
-)
-print("✅ Saved → data_proc/ta_brightness_map.html")
\ No newline at end of file
+write_html(fig, "docs/ta_brightness_map.html")
+print("✅ Saved → docs/ta_brightness_map.html")
\ No newline at end of file
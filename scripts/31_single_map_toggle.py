@@ -1,5 +1,4 @@
 # scripts/31_single_map_toggle.py
-import json
 from pathlib import Path
 
 import pandas as pd
@@ -7,15 +6,18 @@ import plotly.express as px
 import plotly.io as pio
 from plotly.subplots import make_subplots
 
+from fig_export import export_images
+from geo_lod import load_layer
+from site_assets import write_html
+from storage import load
+
 # ----------------- data -----------------
-df = pd.read_csv("data_proc/viirs_ta_annual_2021_with_names.csv")
-df["ta_code_str"] = (
-    pd.to_numeric(df["ta_code"], errors="coerce")
-      .astype("Int64").astype(str).str.zfill(3)
-)
+df = load("data_proc/viirs_ta_annual_2021_with_names.csv", columns=["ta_code_str", "ta_name", "radiance_mean"])
 
-with open("data_raw/ta2025_ms_5pct.geojson") as f:
-    gj = json.load(f)
+# geometry level picked for the PNG (1600px @ scale 2) so the static export stays crisp;
+# the HTML shares the same figure
+ZOOM = 4.9
+gj = load_layer("ta", zoom=ZOOM, scale=2)
 
 # quantile bands (relative view)
 bands = ["Very low", "Low", "Medium", "High", "Very high"]
@@ -101,7 +103,7 @@ fig.update_layout(
         x=0.5, xanchor="center", y=0.98, yanchor="top"
     ),
     mapbox_style="carto-positron",
-    mapbox=dict(center=center, zoom=4.9),
+    mapbox=dict(center=center, zoom=ZOOM),
     margin=dict(l=10, r=10, t=110, b=50),   # extra space for title + buttons
     legend_title_text="",
     # categorical color axis (for quantile bands)
@@ -157,14 +159,13 @@ fig.add_annotation(
 # ----------------- outputs -----------------
 Path("data_proc").mkdir(parents=True, exist_ok=True)
 
-# Interactive HTML
-out_html = "data_proc/ta_single_map_toggle.html"
-pio.write_html(fig, file=out_html, include_plotlyjs="cdn", full_html=True)
+# Interactive HTML (thin page in docs/ + shared geometry/data assets)
+out_html = "docs/ta_single_map_toggle.html"
+write_html(fig, out_html)
 print(f"✅ Saved → {out_html}")
 
 # Static PNG (solid background avoids blank tiles)
 fig_png = pio.from_json(pio.to_json(fig))
 fig_png.update_layout(mapbox_style="white-bg")
 out_png = "data_proc/ta_brightness_map_1600.png"
-pio.write_image(fig_png, out_png, width=1600, height=900, scale=2, engine="kaleido")
-print(f"🖼️ Saved → {out_png}")
\ No newline at end of file
+export_images([(fig_png, out_png, 1600, 900, 2)])
\ No newline at end of file
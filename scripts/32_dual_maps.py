@@ -1,19 +1,19 @@
 # scripts/32_dual_maps.py
-import json
 import pandas as pd
 import plotly.express as px
-import plotly.io as pio
 from plotly.subplots import make_subplots
 from shapely.geometry import shape
 
+from geo_lod import load_layer
+from site_assets import write_html
+from storage import load
+
 # ---------- 1) Load data ----------
-df = pd.read_csv("data_proc/viirs_ta_annual_2021_with_names.csv")
-df["ta_code_str"] = (
-    pd.to_numeric(df["ta_code"], errors="coerce").astype("Int64").astype(str).str.zfill(3)
-)
+df = load("data_proc/viirs_ta_annual_2021_with_names.csv", columns=["ta_code_str", "ta_name", "radiance_mean"])
 
-with open("data_raw/ta2025_ms_5pct.geojson") as f:
-    gj = json.load(f)
+# smallest geometry level that still looks sharp at this zoom (shared by both panes)
+ZOOM = 4.9
+gj = load_layer("ta", zoom=ZOOM)
 
 # ---------- 2) Quantile bands ----------
 bands = ["Very low", "Low", "Medium", "High", "Very high"]
@@ -98,8 +98,8 @@ fig.update_layout(
     margin=dict(l=10, r=10, t=60, b=40),
     # same clean basemap + same camera for both subplots
     mapbox_style="carto-positron",
-    mapbox=dict(center=center, zoom=4.9),
-    mapbox2=dict(style="carto-positron", center=center, zoom=4.9),
+    mapbox=dict(center=center, zoom=ZOOM),
+    mapbox2=dict(style="carto-positron", center=center, zoom=ZOOM),
     coloraxis_colorbar=dict(title="Mean radiance\n(nW/cm²·sr)")
 )
 
@@ -112,6 +112,7 @@ fig.add_annotation(
 )
 
 # ---------- 8) Save ----------
-out_path = "data_proc/ta_dual_maps.html"
-pio.write_html(fig, file=out_path, include_plotlyjs="cdn", full_html=True)
+# both panes reference the same geometry -> written once as a shared asset
+out_path = "docs/ta_dual_maps.html"
+write_html(fig, out_path)
 print(f"✅ Saved → {out_path}")
\ No newline at end of file
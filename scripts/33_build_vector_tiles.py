@@ -0,0 +1,151 @@
+# scripts/33_build_vector_tiles.py
+# Cut boundary layers into Mapbox Vector Tiles (MVT) so maps stream only the
+# polygons in view instead of embedding the whole GeoJSON in the figure JSON.
+# Each zoom uses the geometry level picked by geo_lod (built by 16_*), and every
+# feature carries its zone id so data can be joined client-side.
+#
+# Usage:
+#   python scripts/33_build_vector_tiles.py                     # TA, z3–12
+#   python scripts/33_build_vector_tiles.py --layer ta --maxzoom 14
+#   python scripts/34_serve_tiles.py                            # then open the page below
+#
+# Output: docs/tiles/{layer}/{z}/{x}/{y}.pbf, docs/tiles/{layer}/tiles.json,
+#         docs/ta_tiles_map.html (MapLibre page joining VIIRS 2021 by TA code)
+
+import argparse
+import json
+import shutil
+from pathlib import Path
+
+import mapbox_vector_tile
+from shapely.geometry import box, shape
+from shapely.ops import transform
+
+import geo_lod
+from storage import load
+from tiles import NZ_BOUNDS, lonlat_to_merc, maplibre_page, tile_bounds, tile_range, tile_size_m
+
+DOCS = Path("docs")
+TILE_ROOT = DOCS / "tiles"
+
+EXTENT = 4096          # MVT grid units per tile
+BUFFER = 64            # grid units of overlap so strokes don't seam at tile edges
+
+# layer -> (id property, name property, zero-padded id width)
+LAYER_PROPS = {
+    "ta": ("TA2025_V1_", "TA2025_V_2", 3),
+}
+
+
+def to_merc(geom):
+    return transform(lambda x, y, z=None: lonlat_to_merc(x, y), geom)
+
+
+def load_features(layer: str, zoom: int) -> list:
+    """Geometry level for tiles at `zoom` (tiles are overzoomed by ~1 level)."""
+    id_prop, name_prop, width = LAYER_PROPS[layer]
+    gj = geo_lod.load_layer(layer, zoom=zoom + 1)
+    feats = []
+    for f in gj["features"]:
+        if not f.get("geometry"):
+            continue
+        geom = to_merc(shape(f["geometry"]))
+        if not geom.is_valid:
+            geom = geom.buffer(0)
+        p = f["properties"]
+        feats.append({
+            "geometry": geom,
+            "properties": {"zone_id": str(p[id_prop]).zfill(width), "name": p.get(name_prop, "")},
+        })
+    return feats
+
+
+def cut_zoom(layer: str, z: int, out_dir: Path) -> int:
+    feats = load_features(layer, z)
+    pad = tile_size_m(z) * BUFFER / EXTENT
+    # bucket features into the tiles their bbox touches, buffer included
+    buckets = {}
+    for i, f in enumerate(feats):
+        minx, miny, maxx, maxy = f["geometry"].bounds
+        x0, y0, x1, y1 = tile_range((minx - pad, miny - pad, maxx + pad, maxy + pad), z)
+        for x in range(x0, x1 + 1):
+            for y in range(y0, y1 + 1):
+                buckets.setdefault((x, y), []).append(i)
+
+    written = 0
+    for (x, y), idx in buckets.items():
+        minx, miny, maxx, maxy = tile_bounds(z, x, y)
+        clip = box(minx - pad, miny - pad, maxx + pad, maxy + pad)
+        tile_feats = []
+        for i in idx:
+            g = feats[i]["geometry"].intersection(clip)
+            if g.is_empty or g.area == 0:
+                continue
+            tile_feats.append({"geometry": g, "properties": feats[i]["properties"]})
+        if not tile_feats:
+            continue  # only write non-empty tiles
+        pbf = mapbox_vector_tile.encode(
+            [{"name": layer, "features": tile_feats}],
+            quantize_bounds=(minx, miny, maxx, maxy),
+            extents=EXTENT,
+        )
+        out = out_dir / str(z) / str(x) / f"{y}.pbf"
+        out.parent.mkdir(parents=True, exist_ok=True)
+        out.write_bytes(pbf)
+        written += 1
+    return written
+
+
+def write_tilejson(layer: str, minzoom: int, maxzoom: int, out_dir: Path):
+    tj = {
+        "tilejson": "3.0.0",
+        "name": layer,
+        "tiles": [f"tiles/{layer}/{{z}}/{{x}}/{{y}}.pbf"],
+        "minzoom": minzoom,
+        "maxzoom": maxzoom,
+        "bounds": list(NZ_BOUNDS),
+        "vector_layers": [{"id": layer, "fields": {"zone_id": "String", "name": "String"}}],
+    }
+    with open(out_dir / "tiles.json", "w") as f:
+        json.dump(tj, f, indent=2)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--layer", default="ta", choices=sorted(LAYER_PROPS))
+    ap.add_argument("--minzoom", type=int, default=3)
+    ap.add_argument("--maxzoom", type=int, default=12)
+    args = ap.parse_args()
+
+    out_dir = TILE_ROOT / args.layer
+    if out_dir.exists():
+        shutil.rmtree(out_dir)   # stale tiles from a previous geometry vintage
+    out_dir.mkdir(parents=True)
+
+    total = 0
+    for z in range(args.minzoom, args.maxzoom + 1):
+        n = cut_zoom(args.layer, z, out_dir)
+        total += n
+        print(f"   z{z:<2}  {n:5d} tiles")
+    write_tilejson(args.layer, args.minzoom, args.maxzoom, out_dir)
+    size_mb = sum(p.stat().st_size for p in out_dir.rglob("*.pbf")) / 1e6
+    print(f"✅ Wrote {total} tiles → {out_dir}  ({size_mb:.1f} MB)")
+
+    # MapLibre page for the TA layer: values joined by zone id in the browser
+    if args.layer == "ta":
+        df = load("data_proc/viirs_ta_annual_2021_with_names.csv", columns=["ta_code_str", "radiance_mean"])
+        codes = df["ta_code_str"].astype(str)
+        html = maplibre_page(
+            "NZ night-time brightness by TA (VIIRS 2021) — vector tiles",
+            vector={"url": "tiles/ta/{z}/{x}/{y}.pbf", "layer": "ta",
+                    "values": dict(zip(codes, df["radiance_mean"])),
+                    "minzoom": args.minzoom, "maxzoom": args.maxzoom},
+            legend="Mean radiance (nW/cm²·sr)",
+        )
+        out_html = DOCS / "ta_tiles_map.html"
+        out_html.write_text(html, encoding="utf-8")
+        print(f"✅ Saved → {out_html}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# scripts/34_serve_tiles.py
+# Tiny local static/tile server for docs/ (stdlib only). Serves the MVT/PNG tile
+# pyramids with the right content types, long-lived caching headers + ETags and
+# CORS, so the Streamlit app (another port) and the docs pages can use them.
+#
+# Usage:
+#   python scripts/34_serve_tiles.py                 # http://localhost:8765/ta_tiles_map.html
+#   python scripts/34_serve_tiles.py --port 9000 --root docs
+
+import argparse
+import email.utils
+import functools
+from http import HTTPStatus
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+TILE_TYPES = {
+    ".pbf": "application/x-protobuf",
+    ".mvt": "application/vnd.mapbox-vector-tile",
+    ".png": "image/png",
+    ".webp": "image/webp",
+}
+TILE_MAX_AGE = 7 * 24 * 3600   # tiles are rebuilt wholesale, so a week is safe
+PAGE_MAX_AGE = 60
+
+
+class TileHandler(SimpleHTTPRequestHandler):
+    extensions_map = {**SimpleHTTPRequestHandler.extensions_map, **TILE_TYPES,
+                      ".json": "application/json"}
+
+    def end_headers(self):
+        self.send_header("Access-Control-Allow-Origin", "*")
+        super().end_headers()
+
+    def send_head(self):
+        path = Path(self.translate_path(self.path))
+        is_tile = "/tiles/" in self.path and path.suffix in TILE_TYPES
+
+        if is_tile and not path.exists():
+            # empty tiles are never written -> tell the map "nothing here" without a 404 storm
+            self.send_response(HTTPStatus.NO_CONTENT)
+            self.send_header("Cache-Control", f"public, max-age={TILE_MAX_AGE}")
+            self.end_headers()
+            return None
+        if not path.is_file():
+            return super().send_head()
+
+        st = path.stat()
+        etag = f'"{st.st_mtime_ns:x}-{st.st_size:x}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return None
+
+        f = open(path, "rb")
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", self.guess_type(path.as_posix()))
+        self.send_header("Content-Length", str(st.st_size))
+        self.send_header("Last-Modified", email.utils.formatdate(st.st_mtime, usegmt=True))
+        self.send_header("ETag", etag)
+        max_age = TILE_MAX_AGE if is_tile else PAGE_MAX_AGE
+        self.send_header("Cache-Control", f"public, max-age={max_age}")
+        self.end_headers()
+        return f
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--root", default="docs")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    args = ap.parse_args()
+
+    root = Path(args.root).resolve()
+    if not root.exists():
+        raise SystemExit(f"Missing {root}. Build tiles first (scripts/33_build_vector_tiles.py).")
+
+    handler = functools.partial(TileHandler, directory=str(root))
+    with ThreadingHTTPServer((args.host, args.port), handler) as httpd:
+        print(f"🛰️  Serving {root} at http://{args.host}:{args.port}/  (Ctrl+C to stop)")
+        try:
+            httpd.serve_forever()
+        except KeyboardInterrupt:
+            print("\nbye")
+
+
+if __name__ == "__main__":
+    main()
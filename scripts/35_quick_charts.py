@@ -1,7 +1,8 @@
-import pandas as pd
 import matplotlib.pyplot as plt
 
-df = pd.read_csv("data_proc/viirs_ta_annual_2021.csv").rename(
+from storage import load
+
+df = load("data_proc/viirs_ta_annual_2021.csv").rename(
     columns={"TA_CODE":"ta_code","radiance_mean":"radiance_mean"}
 )
 
@@ -1,7 +1,8 @@
 # scripts/36_normalize_and_rank.py
 import json
 import pandas as pd
-from pathlib import Path
+
+from storage import load, save
 
 VIIRS_CSV = "data_proc/viirs_ta_annual_2021_with_names.csv"
 GEOJSON   = "data_raw/ta2025_ms_5pct.geojson"     # has AREA_SQ_KM in properties
@@ -9,9 +10,7 @@ POP_CSV   = "data_raw/pop_2023.csv"
 OUT_CSV   = "data_proc/viirs_ta_2021_normalized.csv"
 
 # --- VIIRS table ---
-df = pd.read_csv(VIIRS_CSV)
-df["ta_code"] = pd.to_numeric(df["ta_code"], errors="coerce").astype("Int64")
-df["ta_code_str"] = df["ta_code"].astype(str).str.zfill(3)
+df = load(VIIRS_CSV)                               # ta_code int16, ta_code_str '001'
 
 # --- Areas from GeoJSON ---
 with open(GEOJSON) as f:
@@ -52,8 +51,7 @@ out["rank_per_km2"]          = out["radiance_per_km2"].rank(ascending=False, met
 out["rank_per_capita"]       = out["radiance_per_capita"].rank(ascending=False, method="min")
 
 # Save
-Path("data_proc").mkdir(parents=True, exist_ok=True)
-out.to_csv(OUT_CSV, index=False)
+save(out, OUT_CSV)
 print(f"✅ wrote {OUT_CSV} with {len(out)} rows")
 print(out.head(5)[[
     "ta_code","ta_name","radiance_mean","area_sq_km","pop_2023",
@@ -0,0 +1,74 @@
+# scripts/36b_spatial_autocorrelation.py
+# Do the TA brightness rankings cluster in space? Global Moran's I per metric and
+# Getis–Ord Gi* hot/cold spots per TA, on the contiguity graph from spatial.py.
+#   data_proc/ta_hotspots_2021.csv   ta_code_str, ta_name, metric, value, gi_z, p_sim, spot
+#
+#   python scripts/36b_spatial_autocorrelation.py
+#   python scripts/36b_spatial_autocorrelation.py --kind knn --k 6 --cols radiance_mean
+#   python scripts/36b_spatial_autocorrelation.py --csv data_proc/my_mb_values.csv --id mb_code \
+#       --layer mb --boundaries data_raw/mb2025.geojson --code-prop MB2025_V1_
+import argparse
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from spatial import gi_star, morans_i, weights
+from storage import load, save
+
+ROOT = Path(__file__).resolve().parents[1]
+IN_CSV = ROOT / "data_proc" / "viirs_ta_2021_normalized.csv"
+OUT_CSV = ROOT / "data_proc" / "ta_hotspots_2021.csv"
+METRICS = ["radiance_mean", "radiance_per_km2", "radiance_per_capita"]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--csv", type=Path, default=IN_CSV, help="per-zone values (output of 36 by default)")
+    ap.add_argument("--id", default="ta_code_str", help="zone id column")
+    ap.add_argument("--cols", nargs="+", default=METRICS)
+    ap.add_argument("--layer", default="ta")
+    ap.add_argument("--boundaries", type=Path, help="boundary GeoJSON for a layer not in geo_registry")
+    ap.add_argument("--code-prop", help="zone code property in --boundaries")
+    ap.add_argument("--kind", choices=["queen", "knn"], default="queen")
+    ap.add_argument("--k", type=int, default=6)
+    ap.add_argument("--n-perm", type=int, default=9_999)
+    ap.add_argument("--out", type=Path, default=OUT_CSV)
+    args = ap.parse_args()
+
+    if args.layer == "ta":
+        df = load(args.csv).astype({args.id: str})         # ta_code_str stays '001'
+    else:
+        df = pd.read_csv(args.csv, dtype={args.id: str})
+    t0 = time.perf_counter()
+    w = weights(args.layer, args.kind, args.k, path=args.boundaries, code_prop=args.code_prop)
+    print(f"→ {args.layer} {args.kind} graph: {w.n:,} zones, {w.B.nnz:,} links "
+          f"({time.perf_counter() - t0:.1f}s)")
+
+    names = df.set_index(args.id)["ta_name"] if "ta_name" in df.columns else None
+    parts = []
+    for col in [c for c in args.cols if c in df.columns]:
+        a = w.align(df.set_index(args.id)[col])
+        g = morans_i(a.values, a.W, n_perm=args.n_perm)
+        print(f"  {col:<22} Moran's I={g['I']:.3f}  (E[I]={g['EI']:.3f}, z={g['z_sim']:.2f}, "
+              f"p_sim={g['p_sim']:.4f}, n={g['n']})")
+        loc = gi_star(a.values, a.W, n_perm=min(args.n_perm, 999))
+        loc.insert(0, args.id, a.ids)
+        loc.insert(1, "metric", col)
+        loc.insert(2, "value", a.values)
+        parts.append(loc)
+    if not parts:
+        raise SystemExit(f"None of {args.cols} in {args.csv.name}")
+
+    out = pd.concat(parts, ignore_index=True)
+    if names is not None:
+        out.insert(1, "ta_name", out[args.id].map(names[~names.index.duplicated()]))
+    save(out, args.out)
+    print(f"✅ Wrote {args.out}  (rows: {len(out)})")
+    hot = out[out["spot"] != ""].sort_values(["metric", "gi_z"], ascending=[True, False])
+    if len(hot):
+        print(hot.head(20).to_string(index=False, float_format=lambda v: f"{v:.3f}"))
+
+
+if __name__ == "__main__":
+    main()
@@ -2,10 +2,12 @@ from pathlib import Path
 import pandas as pd
 import matplotlib.pyplot as plt
 
+from storage import load
+
 IN = "data_proc/viirs_ta_2021_normalized.csv"
 Path("data_proc").mkdir(exist_ok=True)
 
-df = pd.read_csv(IN)
+df = load(IN)
 
 def top_bar(data: pd.DataFrame, value_col: str, title: str, out_png: str, n=15):
     t = data.sort_values(value_col, ascending=False).head(n)
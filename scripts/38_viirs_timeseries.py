@@ -1,37 +1,28 @@
 # scripts/38_viirs_timeseries.py
 """
-Aggregate VIIRS night light data (2014–2023) to build a time series
-for each Territorial Authority (TA) and plot trends.
+Plot VIIRS night-light trends (2014–2023) for the brightest Territorial
+Authorities (TA), from the year-partitioned VIIRS store (viirs_store.py).
 """
 
-import pandas as pd
 import matplotlib.pyplot as plt
 import pathlib
 
+from viirs_store import read_viirs
+
 # ---- paths ----
-DATA_DIR = pathlib.Path("data_raw/viirs_yearly")
 OUT_DIR = pathlib.Path("data_proc")
 OUT_DIR.mkdir(exist_ok=True)
 
-# Expect CSVs like viirs_ta_annual_2014_with_names.csv ... 2023 ...
-files = sorted(DATA_DIR.glob("viirs_ta_annual_*_with_names.csv"))
-if not files:
-    raise FileNotFoundError("No annual files found in data_raw/viirs_yearly/")
-
-dfs = []
-for f in files:
-    year = int(f.stem.split("_")[3])
-    df = pd.read_csv(f)
-    df["year"] = year
-    dfs.append(df)
-
-df_all = pd.concat(dfs, ignore_index=True)
-df_all.to_csv(OUT_DIR / "viirs_ta_timeseries_2014_2023.csv", index=False)
-print(f"✅ Combined {len(files)} years → data_proc/viirs_ta_timeseries_2014_2023.csv")
+# one typed read of the VIIRS store (20b / 39 append a partition per year)
+df_all = read_viirs(columns=["viirs_year", "ta_name", "radiance_mean"])
+if df_all.empty:
+    raise FileNotFoundError("VIIRS store is empty — run scripts/39_batch_years.py "
+                            "(or 40_concat_years.py to import yearly CSVs)")
+print(f"→ {df_all['viirs_year'].nunique()} years × {df_all['ta_name'].nunique()} TAs from the VIIRS store")
 
 # ---- summary ----
 mean_by_year = (
-    df_all.groupby(["year", "ta_name"])["radiance_mean"].mean().reset_index()
+    df_all.groupby(["viirs_year", "ta_name"])["radiance_mean"].mean().reset_index()
 )
 
 # ---- top 6 TAs overall ----
@@ -48,7 +39,7 @@ axes = axes.flatten()
 
 for ax, name in zip(axes, top6):
     sub = mean_by_year[mean_by_year.ta_name == name]
-    ax.plot(sub["year"], sub["radiance_mean"], marker="o", lw=2)
+    ax.plot(sub["viirs_year"], sub["radiance_mean"], marker="o", lw=2)
     ax.set_title(name, fontsize=11)
     ax.grid(alpha=0.3)
 
@@ -24,4 +24,4 @@ for y in years:
         ["python", "scripts/20b_aggregate_one_year.py", "--year", str(y)]
     )
 
-print("✅ Done. Yearly TA CSVs are in data_raw/viirs_yearly/")
\ No newline at end of file
+print("✅ Done. Yearly TA means are in data_proc/viirs_ta_store/ (export: scripts/40_concat_years.py)")
\ No newline at end of file
@@ -1,8 +1,26 @@
+# scripts/40_concat_years.py
+# Export the VIIRS store (viirs_store.py) as one long CSV for 41 and the repo, plus the
+# map year's table that the maps (30-33), ranks (36) and brightness by region (50) read:
+#   data_proc/viirs_ta_timeseries_2014_2023.csv   viirs_year, ta_code, ta_name, radiance_mean
+#   data_proc/viirs_ta_annual_2021_with_names.csv ta_code, ta_name, radiance_mean, viirs_year
+# Yearly CSVs from older runs (data_raw/viirs_yearly/*.csv, any column spelling) are
+# imported first for years the store doesn't have yet; --reimport replaces those too.
+#
+#   python scripts/40_concat_years.py
+#   python scripts/40_concat_years.py --reimport
+import argparse
+import re
 from pathlib import Path
 import pandas as pd
 
+from storage import save
+from viirs_store import read_viirs, write_year, years
+
 YEARLY_DIR = Path("data_raw/viirs_yearly")
 OUT = Path("data_proc/viirs_ta_timeseries_2014_2023.csv")
+MAP_YEAR = 2021
+OUT_MAP = Path(f"data_proc/viirs_ta_annual_{MAP_YEAR}_with_names.csv")
+YEARLY_RE = re.compile(r"viirs_ta_annual_(\d{4})_with_names\.csv$")
 
 def load_one(path: Path) -> pd.DataFrame:
     df = pd.read_csv(path)
@@ -34,7 +52,6 @@ def load_one(path: Path) -> pd.DataFrame:
         year = pd.to_numeric(df[cols["year"]], errors="coerce").astype(int)
     else:
         # try to infer from filename
-        import re
         m = re.search(r"(\d{4})", path.name)
         if not m:
             raise ValueError(f"{path} missing year column and couldn’t infer from filename")
@@ -61,14 +78,37 @@ def load_one(path: Path) -> pd.DataFrame:
     )
     return out
 
-files = sorted(YEARLY_DIR.glob("viirs_ta_annual_*_with_names.csv"))
-if not files:
-    raise SystemExit("No yearly CSVs found under data_raw/viirs_yearly/")
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--reimport", action="store_true", help="re-import yearly CSVs already in the store")
+    args = ap.parse_args()
+
+    have = set(years())
+    for f in sorted(YEARLY_DIR.glob("viirs_ta_annual_*_with_names.csv")):
+        m = YEARLY_RE.search(f.name)
+        if m and int(m.group(1)) in have and not args.reimport:
+            continue                                    # year already in the store: don't even read it
+        df = load_one(f)
+        for yr, part in df.groupby("viirs_year"):
+            if yr in have and not args.reimport:
+                continue
+            write_year(part, int(yr))
+            print(f"→ Imported {f.name} ({yr})")
 
-frames = [load_one(f) for f in files]
-full = pd.concat(frames, ignore_index=True).sort_values(["ta_code", "viirs_year"])
+    full = read_viirs()
+    if full.empty:
+        raise SystemExit("VIIRS store is empty — run scripts/39_batch_years.py "
+                         "(or put yearly CSVs under data_raw/viirs_yearly/)")
+    save(full, OUT)
+    print(f"✅ Wrote {OUT} with {len(full):,} rows, years {sorted(full['viirs_year'].unique().tolist())}.")
+    print("   Columns:", list(full.columns))
+
+    one = full[full["viirs_year"] == MAP_YEAR]
+    if one.empty:
+        print(f"ℹ️ No {MAP_YEAR} in the store; {OUT_MAP} left as it is")
+    else:
+        save(one[["ta_code", "ta_name", "radiance_mean", "viirs_year"]], OUT_MAP)
+        print(f"✅ Wrote {OUT_MAP} ({len(one)} TAs)")
 
-OUT.parent.mkdir(parents=True, exist_ok=True)
-full.to_csv(OUT, index=False)
-print(f"✅ Wrote {OUT} with {len(full):,} rows from {len(files)} yearly files.")
-print("   Columns:", list(full.columns))
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -2,21 +2,19 @@
 # Make time-series charts + small multiples + city vs district comparison.
 
 from pathlib import Path
-import pandas as pd
 import matplotlib.pyplot as plt
 
+from storage import exists, load
+
 IN = Path("data_proc/viirs_ta_timeseries_2014_2023.csv")
 OUT_DIR = Path("data_proc")
 OUT_DIR.mkdir(parents=True, exist_ok=True)
 
-if not IN.exists():
+if not exists(IN):
     raise SystemExit(f"Missing input: {IN}. Run scripts/40_concat_years.py first.")
 
-df = pd.read_csv(IN)
-
-# --- hygiene / types ---
-df["viirs_year"] = pd.to_numeric(df["viirs_year"], errors="coerce").astype(int)
-df["radiance_mean"] = pd.to_numeric(df["radiance_mean"], errors="coerce")
+df = load(IN)                                      # viirs_year int16, ta_name categorical
+df["ta_name"] = df["ta_name"].astype(str)
 
 # If you currently only have 1 year, the script still runs; plots will be simple.
 years_avail = sorted(df["viirs_year"].unique())
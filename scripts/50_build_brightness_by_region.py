@@ -1,30 +1,21 @@
-import pandas as pd
 from pathlib import Path
 
-TA = "data_proc/viirs_ta_annual_2021_with_names.csv"
-LUT = "data_raw/ta_to_health_region.csv"
-OUT = Path("data_proc/brightness_by_health_region.csv")
-
-ta = pd.read_csv(TA)
-lut = pd.read_csv(LUT)
-
-ta["ta_name"] = ta["ta_name"].str.strip()
-lut["ta_name"] = lut["ta_name"].str.strip()
+from panel_store import upsert
+from storage import load, save
+from zonal import to_health_region
 
-m = ta.merge(lut, on="ta_name", how="left")
-
-missing = sorted(m.loc[m["health_region"].isna(), "ta_name"].dropna().unique())
-if missing:
-    print("⚠️ TAs missing from lookup (add to data_raw/ta_to_health_region.csv):")
-    for x in missing:
-        print(" -", x)
+YEAR = 2021
+TA = f"data_proc/viirs_ta_annual_{YEAR}_with_names.csv"
+OUT = Path("data_proc/brightness_by_health_region.csv")
 
-agg = (m.dropna(subset=["health_region"])
-        .groupby("health_region", as_index=False)["radiance_mean"]
-        .mean()
-        .sort_values("radiance_mean", ascending=False))
+ta = load(TA, columns=["ta_code_str", "ta_name", "radiance_mean"])
+agg = to_health_region(ta, "radiance_mean").sort_values("radiance_mean", ascending=False)
 
-OUT.parent.mkdir(parents=True, exist_ok=True)
-agg.to_csv(OUT, index=False)
+save(agg, OUT)
 print("✅ Wrote", OUT.as_posix())
+
+# zone-level indicator in the analysis panel (ethnicity "Total")
+rows = agg.rename(columns={"health_region_code": "zone_code"})[["zone_code", "radiance_mean"]]
+upsert(rows.assign(geo_level="health_region", period=str(YEAR), ethnicity="Total"), source="viirs")
+print("✅ Panel: radiance_mean at health_region,", YEAR)
 print(agg.to_string(index=False))
\ No newline at end of file
@@ -1,4 +1,13 @@
-import os, sys, pandas as pd
+# scripts/51_clean_ethnicity_once.py
+# Latest overweight/obese rate per Health NZ region × prioritised ethnicity from the
+# NZ Health Survey export. Read through nzhs_io: only the needed columns, filtered
+# chunk by chunk, so the full multi-topic export works as well as the topic file.
+import os, sys
+import pandas as pd
+
+from geo_registry import encode
+from nzhs_io import header, read_nzhs, truthy, year_end
+from storage import save
 
 IN  = "data_raw/adult_unadjusted_topic_body_size_includes_obesity.csv"
 OUT = "data_proc/obesity_by_region_ethnicity.csv"
@@ -6,32 +15,32 @@ OUT = "data_proc/obesity_by_region_ethnicity.csv"
 print("Python:", sys.executable)
 assert os.path.exists(IN), f"CSV not found: {IN}"
 os.makedirs("data_proc", exist_ok=True)
-
-def truthy(v):
-    return str(v).strip().lower() in {"yes","y","true","1","t"}
-
-df = pd.read_csv(IN, encoding="utf-8", low_memory=False)
-print("Loaded rows:", len(df), "| cols:", len(df.columns))
-
-# ---- base filter (unadjusted, all ages, both sexes, real regions) ----
-mask_indicator = df["indicator"].str.contains(
-    r"(overw[_ ]?obese|overweight.*obese|^obese$)", case=False, na=False
-)
-mask_unadj = df["age_standardised"].astype(str).str.lower().eq("no")
-mask_age   = df["agegroup"].astype(str).str.lower().isin({"all ages","total"})
-mask_sex   = df["gender"].astype(str).str.lower().isin({"all","both","male and female","total"})
-mask_reg   = df["health_region"].astype(str).str.strip().ne("All")
-
-base = df.loc[mask_indicator & mask_unadj & mask_age & mask_sex & mask_reg].copy()
+in_cols = header(IN)
 
 # Choose rate columns (prefer proportion; else mean)
-rate_col = "proportion" if "proportion" in base.columns else ("mean" if "mean" in base.columns else None)
-lo_col   = "proportion_low" if "proportion_low" in base.columns else ("mean_low" if "mean_low" in base.columns else None)
-hi_col   = "proportion_high" if "proportion_high" in base.columns else ("mean_high" if "mean_high" in base.columns else None)
+rate_col = "proportion" if "proportion" in in_cols else ("mean" if "mean" in in_cols else None)
+lo_col   = "proportion_low" if "proportion_low" in in_cols else ("mean_low" if "mean_low" in in_cols else None)
+hi_col   = "proportion_high" if "proportion_high" in in_cols else ("mean_high" if "mean_high" in in_cols else None)
 if rate_col is None:
     raise RuntimeError("No rate column (proportion/mean) found.")
+value_cols = [rate_col] + ([lo_col] if lo_col else []) + ([hi_col] if hi_col else [])
 
 eth_cols = [("Māori","māori"), ("Pacific","pacific"), ("Asian","asian"), ("European/Other","other_euro")]
+
+# ---- base filter (unadjusted, all ages, both sexes, real regions), applied per chunk ----
+base = read_nzhs(
+    IN,
+    columns=["health_region", "year_to"] + value_cols + [f for _, f in eth_cols],
+    where={
+        "indicator":        lambda s: s.str.contains(r"(overw[_ ]?obese|overweight.*obese|^obese$)", case=False),
+        "age_standardised": lambda s: s.str.lower().eq("no"),
+        "agegroup":         lambda s: s.str.lower().isin({"all ages","total"}),
+        "gender":           lambda s: s.str.lower().isin({"all","both","male and female","total"}),
+        "health_region":    lambda s: s.str.strip().ne("All"),
+    },
+)
+print("Matched rows:", len(base))
+base["year_to_num"] = pd.Series(year_end(base["year_to"]), index=base.index).fillna(-1)
 pieces = []
 
 for label, flag_col in eth_cols:
@@ -39,21 +48,18 @@ for label, flag_col in eth_cols:
         print(f"⚠️ Missing ethnicity flag column: {flag_col} — skipping")
         continue
 
-    take = base.loc[base[flag_col].apply(lambda v: str(v).strip() != "" and truthy(v)),
-                    ["health_region","year_to", rate_col] + ([lo_col] if lo_col else []) + ([hi_col] if hi_col else [])].copy()
+    keep = ["health_region","year_to","year_to_num"] + value_cols
+    take = base.loc[truthy(base[flag_col]), keep].copy()
     # If that yields nothing (some files have non-yes values), fall back to "not null"
     if take.empty:
-        take = base.loc[base[flag_col].notna(),
-                        ["health_region","year_to", rate_col] + ([lo_col] if lo_col else []) + ([hi_col] if hi_col else [])].copy()
+        take = base.loc[base[flag_col].notna(), keep].copy()
     if take.empty:
         print(f"ℹ️ No rows found for {label} after filters — skipping.")
         continue
 
     # For each region, keep the latest available year (years may differ by ethnicity)
-    take["year_to_str"] = take["year_to"].astype(str)
-    take["year_to_num"] = take["year_to_str"].str.extract(r"(\d{2})(?:\D*)$")[0].astype(float).fillna(-1)
-    idx = take.groupby("health_region")["year_to_num"].idxmax()
-    take = take.loc[idx].drop(columns=["year_to_num","year_to_str"]).copy()
+    idx = take.groupby("health_region", observed=True)["year_to_num"].idxmax()
+    take = take.loc[idx].drop(columns=["year_to_num"]).copy()
     take["ethnicity"] = label
 
     rename = {rate_col: "obesity_rate"}
@@ -67,25 +73,20 @@ out = pd.concat(pieces, ignore_index=True) if pieces else pd.DataFrame(
     columns=["health_region","year_to","ethnicity","obesity_rate"]
 )
 
-# Normalise region names to short form (right side after " | ")
-def short_region(s):
-    s = str(s)
-    parts = [p.strip() for p in s.split("|")]
-    return parts[-1] if len(parts) >= 2 else s.strip()
-
-out["health_region"] = out["health_region"].map(short_region)
+# Canonical Health NZ region names ("Northern | Te Tai Tokerau" -> "Te Tai Tokerau")
+out = encode(out, "health_region").drop(columns="health_region_code")
 
 # Order + save
 cols = ["health_region","year_to","ethnicity","obesity_rate"]
 for c in ["obesity_rate_low","obesity_rate_high"]:
     if c in out.columns: cols.append(c)
 out = out[cols].sort_values(["health_region","ethnicity"])
-out.to_csv(OUT, index=False)
+save(out, OUT)
 
 print(f"\n✅ Saved ethnicity-level obesity data → {OUT}  (rows: {len(out)})")
-print("Regions found:", sorted(out["health_region"].unique()))
+print("Regions found:", sorted(out["health_region"].dropna().unique()))
 if not out.empty:
     print("\nCounts by region × ethnicity:")
-    print(out.groupby(["health_region","ethnicity"]).size().unstack(fill_value=0))
+    print(out.groupby(["health_region","ethnicity"], observed=True).size().unstack(fill_value=0))
 else:
     print("\n…no rows matched (consider relaxing filters further).")
@@ -6,6 +6,9 @@
 import os, re
 import pandas as pd
 
+from geo_registry import codes, names
+from storage import save
+
 SRC = "data_raw/adult_unadjusted_topic_body_size_includes_obesity.csv"
 OUT = "data_proc/obesity_by_region_ethnicity.csv"
 
@@ -90,16 +93,8 @@ if col_eth in sub.columns:
 else:
     sub["ethnicity"] = "All"
 
-# Region cleanups (collapse long names to short like Te Manawa Taki)
-sub["health_region"] = sub[col_region].astype(str)
-# Tidy common variants
-sub["health_region"] = (
-    sub["health_region"]
-      .str.replace(r"^Central.*Ikaroa.*$", "Te Ikaroa", regex=True)
-      .str.replace(r"^Midland.*Manawa.*Taki.*$", "Te Manawa Taki", regex=True)
-      .str.replace(r"^Northern.*Taitokerau.*$", "Taitokerau", regex=True)
-      .str.replace(r"^Southern.*Waipounamu.*$", "Te Waipounamu", regex=True)
-)
+# Region names -> canonical Health NZ region (geo_registry resolves every known alias)
+sub["health_region"] = names(codes(sub[col_region], "health_region"), "health_region")
 
 # Keep the latest year
 sub = sub[sub[col_year] == latest_year].copy()
@@ -113,10 +108,9 @@ out = out.dropna(subset=["health_region","obesity_rate"])
 
 # Print quick sanity
 print(f"Latest year found: {latest_year}")
-print("Regions:", sorted(out["health_region"].unique()))
+print("Regions:", sorted(out["health_region"].dropna().unique()))
 print("Ethnicities:", sorted(out["ethnicity"].unique()))
-print(out.groupby(["health_region","ethnicity"]).size().rename("rows"))
+print(out.groupby(["health_region","ethnicity"], observed=True).size().rename("rows"))
 
-os.makedirs("data_proc", exist_ok=True)
-out.to_csv(OUT, index=False)
+save(out, OUT)
 print(f"✅ Saved ethnicity-level obesity data → {OUT}  (rows: {len(out)})")
\ No newline at end of file
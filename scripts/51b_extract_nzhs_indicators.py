@@ -0,0 +1,49 @@
+# scripts/51b_extract_nzhs_indicators.py
+# One scan of the NZ Health Survey export -> every indicator in the spec, every survey
+# year, as a tidy long table partitioned by indicator (nzhs_io.py):
+#   data_proc/nzhs_indicators/indicator=<key>/part.parquet
+#   columns: indicator_label, health_region, ethnicity, year_to, year_end, measure,
+#            value, value_low, value_high
+#
+#   python scripts/51b_extract_nzhs_indicators.py
+#   python scripts/51b_extract_nzhs_indicators.py --src data_raw/nzhs_all_topics.csv --spec my_indicators.csv
+#   python scripts/51b_extract_nzhs_indicators.py --only diabetes sleep
+#
+# Read a slice later with:  read_indicators(["overweight_obese"], columns=[...])
+
+import argparse
+import time
+from pathlib import Path
+
+from nzhs_io import NZHS_CSV, extract_indicators, load_indicator_spec, write_indicator_store
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--src", type=Path, default=NZHS_CSV, help="NZHS data-explorer CSV export")
+    ap.add_argument("--spec", type=Path, help="indicator table CSV: key, pattern (default: nzhs_io.INDICATORS)")
+    ap.add_argument("--only", nargs="+", help="subset of spec keys")
+    ap.add_argument("--full", action="store_true", help="drop partitions of indicators not in this run")
+    args = ap.parse_args()
+
+    spec = load_indicator_spec(args.spec)
+    if args.only:
+        spec = spec[spec["key"].isin(args.only)]
+    if spec.empty:
+        raise SystemExit("No indicators selected.")
+
+    t0 = time.perf_counter()
+    tidy = extract_indicators(spec, args.src)
+    print(f"→ Scanned {args.src.name} in {time.perf_counter() - t0:.1f}s  rows kept={len(tidy):,}")
+
+    for key in sorted(set(spec["key"]) - set(tidy["indicator"].astype(str))):
+        print(f"⚠️ No rows matched indicator '{key}'")
+    for p in write_indicator_store(tidy, full=args.full):
+        print(f"✅ Wrote {p.relative_to(p.parents[2])}")
+    if len(tidy):
+        print(tidy.groupby(["indicator", "year_to"], observed=True).size()
+                  .unstack(fill_value=0).to_string())
+
+
+if __name__ == "__main__":
+    main()
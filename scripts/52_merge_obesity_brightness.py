@@ -1,48 +1,35 @@
 # scripts/52_merge_obesity_brightness.py
-import pandas as pd
-from pathlib import Path
+from geo_registry import encode, merge
+from storage import load, save
 
 OBES = "data_proc/obesity_by_region_ethnicity.csv"
 BRGT = "data_proc/brightness_by_health_region.csv"   # if you generated it earlier
 OUT  = "data_proc/obesity_vs_brightness_by_region.csv"
 
-Path("data_proc").mkdir(parents=True, exist_ok=True)
-
-def norm_region(s: str) -> str:
-    s = str(s).strip()
-    if "Tai Tokerau" in s or "Northern" in s:
-        return "Te Tai Tokerau"
-    if "Manawa Taki" in s or "Midland" in s:
-        return "Te Manawa Taki"
-    if "Ikaroa" in s or "Central" in s:
-        return "Te Ikaroa"
-    if "Waipounamu" in s or "Southern" in s:
-        return "Te Waipounamu"
-    return s
-
-ob = pd.read_csv(OBES)
+ob = load(OBES)
 if "health_region" not in ob.columns:
     raise SystemExit("obesity file missing health_region — re-run 51_clean_obesity_by_region.py")
 
-ob["health_region"] = ob["health_region"].apply(norm_region)
+ob = encode(ob, "health_region")
 
-br = pd.read_csv(BRGT)
+br = load(BRGT)
 if "health_region" not in br.columns:
     raise SystemExit("brightness file missing health_region. Create it as data_proc/brightness_by_health_region.csv")
 
-br["health_region"] = br["health_region"].apply(norm_region)
+br = encode(br, "health_region")
 
 # show coverage
-print("Obesity regions:", sorted(ob["health_region"].unique()))
-print("Brightness regions:", sorted(br["health_region"].unique()))
+print("Obesity regions:", sorted(ob["health_region"].dropna().unique()))
+print("Brightness regions:", sorted(br["health_region"].dropna().unique()))
 
-m = ob.merge(br, on="health_region", how="left")
+# integer join on the registry code (names are already canonical on both sides)
+m = merge(ob, br, "health_region")
 
 # sanity: which regions lost brightness?
-missing = m[m["radiance_mean"].isna()]["health_region"].unique().tolist()
+missing = m[m["radiance_mean"].isna()]["health_region"].dropna().unique().tolist()
 if missing:
     print("⚠️ Missing brightness for regions:", missing,
-          "\nIf you see 'Te Tai Tokerau' here, regenerate the brightness file so it includes that region.")
+          "\nRegenerate data_proc/brightness_by_health_region.csv (50) so it includes them.")
 
-m.to_csv(OUT, index=False)
+save(m, OUT)
 print(f"✅ Saved merged dataset → {OUT}  (rows: {len(m)})")
\ No newline at end of file
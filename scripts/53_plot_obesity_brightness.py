@@ -1,10 +1,11 @@
-import pandas as pd
 import matplotlib.pyplot as plt
 from pathlib import Path
 
+from storage import load
+
 IN = "data_proc/obesity_vs_brightness_by_region.csv"
 
-df = pd.read_csv(IN)
+df = load(IN)
 
 # Drop blanks and "All" ethnicity
 df = df.dropna(subset=["radiance_mean", "ethnicity", "obesity_rate"])
@@ -13,7 +14,7 @@ df = df[df["ethnicity"].ne("All")].copy()
 # Check for duplicates
 print("Unique regions:", df["health_region"].nunique())
 print("Unique ethnicities:", df["ethnicity"].unique())
-print(df.groupby("ethnicity")["radiance_mean"].describe())
+print(df.groupby("ethnicity", observed=True)["radiance_mean"].describe())
 
 # Scatter plot
 plt.figure(figsize=(8, 6))
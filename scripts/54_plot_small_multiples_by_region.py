@@ -4,11 +4,13 @@ import pandas as pd
 import matplotlib.pyplot as plt
 from pathlib import Path
 
+from storage import load
+
 IN = "data_proc/obesity_vs_brightness_by_region.csv"
 OUT = "data_proc/obesity_vs_brightness_small_multiples.png"
 
 # ---------- load & tidy ----------
-df = pd.read_csv(IN)
+df = load(IN)
 
 # Keep the four Health NZ regions; drop the national 'All' rollup if present
 df = df[df["health_region"].ne("All")].copy()
@@ -1,106 +1,186 @@
 #cat > scripts/61_clean_lawa_air.py <<'PY'
+# Incremental: each LAWA download (a full 2016–present re-export) is merged into the
+# partitioned daily store (data_proc/lawa_daily, see lawa_io.py), and only the
+# site-years with new or revised days are recomputed in the summary CSVs.
+# Hourly exports are reduced to calendar-day means (>= 18 of 24 hours) plus each
+# day's highest rolling-24h mean before they reach the store (air_stats.py).
+# Pollution episodes (runs of consecutive exceedance days) and the coverage-aware
+# monthly / seasonal / annual means are re-derived from the whole store on every
+# run that changes it.
+#
+#   python scripts/61_clean_lawa_air.py               # merge + update summaries
+#   python scripts/61_clean_lawa_air.py --full        # wipe the store, rebuild everything
+#   python scripts/61_clean_lawa_air.py --daily-csv   # also export air_daily_clean.csv
+#   python scripts/61_clean_lawa_air.py --full --thresholds my_limits.csv   # other standards (air_stats.py)
+import argparse
+import shutil
+
 import pandas as pd
 from pathlib import Path
 
+from air_stats import (MIN_HOURS, episode_rollup, episodes, exceedance_table, hourly_to_daily,
+                       is_subdaily, load_thresholds, period_means)
+from geo_registry import codes
+from lawa_io import STORE_DIR, load_lawa, merge_into_store, read_store
+from panel_store import upsert
+from storage import exists, load, save
+
 SRC = "data_raw/lawa_air-quality-download-data_2016-2024.xlsx"
 OUT_DAILY = "data_proc/air_daily_clean.csv"
 OUT_ANNUAL_SITE = "data_proc/air_annual_by_site.csv"
 OUT_ANNUAL_REGION = "data_proc/air_annual_by_region.csv"
 OUT_THRESH = "data_proc/air_thresholds_by_site.csv"
+OUT_EPISODES = "data_proc/air_episodes_by_site.csv"
+OUT_EPISODES_REGION = "data_proc/air_episodes_by_region_year.csv"
+OUT_PERIODS_SITE = "data_proc/air_periods_by_site.csv"
+OUT_PERIODS_REGION = "data_proc/air_periods_by_region.csv"
+OUT_PERIOD_MATRIX = "data_proc/air_site_period_matrix.csv"
+
+INDICATORS = ["PM10", "PM2.5"]
+PANEL_COLS = {"PM2.5": "pm25_ugm3", "PM10": "pm10_ugm3"}     # region means in the analysis panel
+PANEL_FREQS = ["season", "year"]
+SITE_KEY = ["lawa_site_id", "indicator", "year"]
+REGION_KEY = ["region", "indicator", "year"]
+
+
+# ---------- summaries ----------
+def site_year_summary(daily: pd.DataFrame) -> pd.DataFrame:
+    # Per-site, per-year (mean, days captured, %missing relative to full year)
+    site_year = (daily
+        .groupby(["region","site_name","lawa_site_id","indicator","year"], as_index=False, observed=True)
+        .agg(
+            mean_ugm3=("value_ugm3","mean"),
+            days_measured=("value_ugm3","count"),
+            first_date=("sample_date","min"),
+            last_date=("sample_date","max"),
+        )
+    )
+    # Approx coverage vs 365
+    site_year["pct_coverage"] = (site_year["days_measured"] / 365 * 100).round(1)
+    return site_year
+
 
-# WHO 2021 daily guidelines (µg/m³). Adjust if you prefer other limits.
-WHO_PM25_DAILY = 15.0
-WHO_PM10_DAILY = 45.0
-# NZ NES (common reference in NZ): PM10 24-hr = 50 µg/m³
-NES_PM10_DAILY = 50.0
-
-print("Loading…", SRC)
-xls = pd.ExcelFile(SRC, engine="openpyxl")
-# The sheet name you saw:
-sheet = "Monitoring dataset "
-df = xls.parse(sheet)
-
-# Standardize column names
-df = df.rename(columns={
-    "Region": "region",
-    "Agency": "agency",
-    "Town": "town",
-    "Site Name": "site_name",
-    "LAWA Site ID": "lawa_site_id",
-    "Site ID": "site_id",
-    "Latitude": "lat",
-    "Longitude": "lon",
-    "Site Type": "site_type",
-    "Indicator": "indicator",
-    "Sample Date": "sample_date",
-    "Concentration (ug/m3)": "value_ugm3",
-})
-
-# Keep PM10 & PM2.5 only, drop NA
-df = df[df["indicator"].isin(["PM10","PM2.5"])].copy()
-df["sample_date"] = pd.to_datetime(df["sample_date"], errors="coerce")
-df = df.dropna(subset=["sample_date","value_ugm3"])
-
-# Ensure numeric
-df["value_ugm3"] = pd.to_numeric(df["value_ugm3"], errors="coerce")
-df = df.dropna(subset=["value_ugm3"])
-
-# Minimal tidy daily table
-keep_cols = ["region","agency","town","site_name","lawa_site_id","site_id",
-             "lat","lon","site_type","indicator","sample_date","value_ugm3"]
-daily = df[keep_cols].sort_values(["region","site_name","indicator","sample_date"])
-
-Path("data_proc").mkdir(parents=True, exist_ok=True)
-daily.to_csv(OUT_DAILY, index=False)
-print(f"✅ Wrote {OUT_DAILY}  rows={len(daily):,}")
-
-# --- Annual summaries ---
-daily["year"] = daily["sample_date"].dt.year
-
-# Per-site, per-year (mean, days captured, %missing relative to full year)
-site_year = (daily
-    .groupby(["region","site_name","lawa_site_id","indicator","year"], as_index=False)
-    .agg(
-        mean_ugm3=("value_ugm3","mean"),
-        days_measured=("value_ugm3","count"),
-        first_date=("sample_date","min"),
-        last_date=("sample_date","max"),
+def region_year_summary(site_year: pd.DataFrame) -> pd.DataFrame:
+    # Region-year (mean of site means to avoid over-weighting sites with more samples)
+    return (site_year
+        .groupby(["region","indicator","year"], as_index=False, observed=True)
+        .agg(mean_ugm3=("mean_ugm3","mean"),
+             n_sites=("site_name","nunique"))
     )
-)
-# Approx coverage vs 365
-site_year["pct_coverage"] = (site_year["days_measured"] / 365 * 100).round(1)
-site_year.to_csv(OUT_ANNUAL_SITE, index=False)
-print(f"✅ Wrote {OUT_ANNUAL_SITE}  rows={len(site_year):,}")
-
-# Region-year (mean of site means to avoid over-weighting sites with more samples)
-region_year = (site_year
-    .groupby(["region","indicator","year"], as_index=False)
-    .agg(mean_ugm3=("mean_ugm3","mean"),
-         n_sites=("site_name","nunique"))
-    .sort_values(["region","indicator","year"])
-)
-region_year.to_csv(OUT_ANNUAL_REGION, index=False)
-print(f"✅ Wrote {OUT_ANNUAL_REGION}  rows={len(region_year):,}")
-
-# --- Threshold exceedances (daily) by site-year ---
-def limits_for(ind):
-    if ind == "PM2.5":
-        return {"who_daily": WHO_PM25_DAILY}
-    if ind == "PM10":
-        return {"who_daily": WHO_PM10_DAILY, "nes_daily": NES_PM10_DAILY}
-    return {}
-
-rows = []
-for (reg, site, lawasid, ind, yr), g in daily.groupby(["region","site_name","lawa_site_id","indicator","year"]):
-    lims = limits_for(ind)
-    out = {
-        "region": reg, "site_name": site, "lawa_site_id": lawasid,
-        "indicator": ind, "year": yr, "days_measured": len(g)
-    }
-    for label, thr in lims.items():
-        out[f"exceed_{label}"] = int((g["value_ugm3"] > thr).sum())
-    rows.append(out)
-
-thresh = pd.DataFrame(rows).sort_values(["region","site_name","indicator","year"])
-thresh.to_csv(OUT_THRESH, index=False)
-print(f"✅ Wrote {OUT_THRESH}  rows={len(thresh):,}")
\ No newline at end of file
+
+
+# ---------- incremental replace ----------
+def plain(df: pd.DataFrame) -> pd.DataFrame:
+    """Categoricals -> str so fresh rows line up with rows read back from the stored table."""
+    cats = df.select_dtypes("category").columns
+    return df.astype({c: str for c in cats})
+
+
+def panel_rows(region_p: pd.DataFrame) -> pd.DataFrame:
+    """Seasonal and annual region means as regional-council panel rows (one column per pollutant)."""
+    r = plain(region_p[region_p["freq"].isin(PANEL_FREQS)])
+    wide = (r.pivot_table(index=["region", "period"], columns="indicator", values="mean_ugm3")
+              .rename(columns=PANEL_COLS).reset_index())
+    wide.columns.name = None
+    wide.insert(0, "zone_code", codes(wide.pop("region"), "regional_council"))
+    return wide.assign(geo_level="regional_council", ethnicity="Total")
+
+
+def replace_rows(path: str, fresh: pd.DataFrame, keys: pd.DataFrame, sort_cols: list,
+                 full: bool) -> pd.DataFrame:
+    """Drop rows of `path` matching `keys`, add `fresh`, write back sorted."""
+    fresh = plain(fresh)
+    if full or not exists(path):
+        out = fresh
+    else:
+        old = plain(load(path))
+        k = list(keys.columns)
+        hit = old[k].merge(plain(keys).drop_duplicates(), on=k, how="left", indicator=True)["_merge"] == "both"
+        out = pd.concat([old[~hit.to_numpy()], fresh], ignore_index=True)
+    out = out.sort_values(sort_cols).reset_index(drop=True)
+    save(out, path)
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--full", action="store_true", help="rebuild the daily store and all summaries")
+    ap.add_argument("--daily-csv", action="store_true", help=f"also write {OUT_DAILY}")
+    ap.add_argument("--min-hours", type=int, default=MIN_HOURS, help="hourly data: valid hours per 24-h mean")
+    ap.add_argument("--thresholds", type=Path, help="threshold table CSV (default: air_stats.THRESHOLDS); use with --full")
+    args = ap.parse_args()
+
+    print("Loading…", SRC)
+    # parsed once into a typed Parquet cache (normalised column names) by lawa_io;
+    # PM10 & PM2.5 only, filtered in the read rather than after loading everything
+    df = load_lawa(SRC, indicators=INDICATORS)
+    if is_subdaily(df):
+        print(f"→ Hourly data: {len(df):,} rows → daily / rolling-24h means")
+        df = hourly_to_daily(df, min_hours=args.min_hours)
+
+    if args.full and STORE_DIR.exists():
+        shutil.rmtree(STORE_DIR)
+    touched, _ = merge_into_store(df)
+    full = args.full or not all(exists(p) for p in (OUT_ANNUAL_SITE, OUT_ANNUAL_REGION, OUT_THRESH))
+
+    if args.daily_csv:
+        keep_cols = ["region","agency","town","site_name","lawa_site_id","site_id",
+                     "lat","lon","site_type","indicator","sample_date","value_ugm3"]
+        daily_all = read_store(INDICATORS)
+        keep_cols += [c for c in ("n_hours", "max_rolling24h_ugm3") if c in daily_all.columns]
+        daily_all = daily_all[keep_cols].sort_values(["region","site_name","indicator","sample_date"])
+        daily_all.to_csv(OUT_DAILY, index=False)
+        print(f"✅ Wrote {OUT_DAILY}  rows={len(daily_all):,}")
+
+    if touched.empty and not full:
+        print("✔️ No new or revised days; summaries unchanged.")
+        return
+
+    # --- daily rows for the affected site-years only ---
+    if full:
+        daily = read_store(INDICATORS)
+    else:
+        daily = read_store(sorted(touched["indicator"].unique()), sorted(touched["year"].unique()))
+        daily = daily.merge(touched, on=SITE_KEY, how="inner")
+    print(f"→ Recomputing {daily.groupby(SITE_KEY, observed=True).ngroups:,} site-years "
+          f"from {len(daily):,} daily rows")
+
+    Path("data_proc").mkdir(parents=True, exist_ok=True)
+    fresh_site = site_year_summary(daily)
+    site_year = replace_rows(OUT_ANNUAL_SITE, fresh_site, touched,
+                           ["region","site_name","lawa_site_id","indicator","year"], full)
+    print(f"✅ Wrote {OUT_ANNUAL_SITE}  rows={len(site_year):,}")
+
+    # region-years that contain an affected site-year, from the updated site table
+    region_keys = plain(fresh_site[REGION_KEY].drop_duplicates())
+    sub = site_year.merge(region_keys, on=REGION_KEY, how="inner")
+    region_year = replace_rows(OUT_ANNUAL_REGION, region_year_summary(sub), region_keys,
+                               ["region","indicator","year"], full)
+    print(f"✅ Wrote {OUT_ANNUAL_REGION}  rows={len(region_year):,}")
+
+    # --- Threshold exceedances (daily) by site-year ---
+    thresholds = load_thresholds(args.thresholds)
+    thresh = replace_rows(OUT_THRESH, exceedance_table(daily, thresholds), touched,
+                          ["region","site_name","indicator","year","lawa_site_id"], full)
+    print(f"✅ Wrote {OUT_THRESH}  rows={len(thresh):,}")
+
+    # --- Whole-store products: episodes + coverage-aware period means ---
+    store = daily if full else read_store(INDICATORS)
+    eps = episodes(store, thresholds)
+    eps = plain(eps).sort_values(["region","site_name","indicator","label","start"])
+    save(eps, OUT_EPISODES)
+    print(f"✅ Wrote {OUT_EPISODES}  episodes={len(eps):,}")
+    roll = episode_rollup(eps).sort_values(["region","indicator","label","year"])
+    save(roll, OUT_EPISODES_REGION)
+    print(f"✅ Wrote {OUT_EPISODES_REGION}  rows={len(roll):,}")
+
+    site_p, region_p, matrix = period_means(store)
+    for out, tbl in ((OUT_PERIODS_SITE, site_p), (OUT_PERIODS_REGION, region_p), (OUT_PERIOD_MATRIX, matrix)):
+        save(plain(tbl), out)
+        print(f"✅ Wrote {out}  rows={len(tbl):,}")
+    n = upsert(panel_rows(region_p), source="lawa_pm")
+    print(f"✅ Panel: rewrote {n} regional_council partition(s)")
+
+
+if __name__ == "__main__":
+    main()
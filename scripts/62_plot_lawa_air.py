@@ -1,14 +1,15 @@
 #cat > scripts/62_plot_lawa_air.py <<'PY'
-import pandas as pd
 import matplotlib.pyplot as plt
 from pathlib import Path
 
+from storage import load
+
 REG = "data_proc/air_annual_by_region.csv"
-df = pd.read_csv(REG)
+df = load(REG)
 
 # pivot: one line per region for each indicator
 for ind in ["PM2.5","PM10"]:
-    sub = df[df["indicator"]==ind].copy()
+    sub = df[df["indicator"]==ind].astype({"region": str})
     if sub.empty: 
         continue
     piv = sub.pivot(index="year", columns="region", values="mean_ugm3").sort_index()
@@ -1,37 +1,27 @@
 import pandas as pd
 import plotly.express as px
-import plotly.io as pio
 from pathlib import Path
 
+from lawa_io import load_lawa
+from site_assets import write_html
+
 IN_XLS = "data_raw/lawa_air-quality-download-data_2016-2024.xlsx"
 
 print("Loading LAWA data …")
-xls = pd.ExcelFile(IN_XLS, engine="openpyxl")
-# pick the “Monitoring dataset” sheet (or the first sheet if renamed)
-sheet = [s for s in xls.sheet_names if "monitor" in s.lower() or "dataset" in s.lower()]
-sheet = sheet[0] if sheet else xls.sheet_names[0]
-df = xls.parse(sheet)
-
-# Tidy columns
-df = df.rename(columns={
-    "Region": "region",
-    "Indicator": "indicator",
-    "Sample Date": "sample_date",
-    "Concentration (ug/m3)": "value",
-    "Latitude": "lat",
-    "Longitude": "lon",
-})
+# 2023 rows for PM10 / PM2.5 only, filtered in the read
+df = load_lawa(IN_XLS, columns=["region", "indicator", "value_ugm3", "lat", "lon"],
+               indicators=["PM10", "PM2.5"], start="2023-01-01", end="2024-01-01")
+df = df.rename(columns={"value_ugm3": "value"})
 
-# Keep 2023 rows for PM10 / PM2.5 and valid coords
-df["sample_date"] = pd.to_datetime(df["sample_date"], errors="coerce")
-df = df[df["sample_date"].dt.year == 2023]
-df = df[df["indicator"].isin(["PM10", "PM2.5"])]
+# Keep valid coords
 df = df.dropna(subset=["region", "lat", "lon", "value"])
 
 # Region stats (mean value per indicator) + simple region centroid from site coords
-centroids = df.groupby("region", as_index=False)[["lat", "lon"]].mean()
-vals = df.pivot_table(index=["region"], columns="indicator", values="value", aggfunc="mean").reset_index()
+centroids = df.groupby("region", as_index=False, observed=True)[["lat", "lon"]].mean()
+vals = df.pivot_table(index=["region"], columns="indicator", values="value", aggfunc="mean",
+                      observed=True).reset_index()
 g = pd.merge(vals, centroids, on="region", how="left")
+g.columns = [str(c) for c in g.columns]   # categorical indicator -> plain column names
 
 # Fill if one of the pollutants is missing
 for col in ["PM10", "PM2.5"]:
@@ -61,12 +51,14 @@ fig.update_layout(
 # Save
 Path("docs").mkdir(exist_ok=True)
 out_html = "docs/air_pm_map_2023.html"
-pio.write_html(fig, out_html, include_plotlyjs="cdn", full_html=True)
+write_html(fig, out_html)
 print(f"✅ Wrote {out_html}")
 
-# Optional PNG (requires kaleido)
+# Optional PNG (requires kaleido; failures are reported, not raised)
 try:
-    pio.write_image(fig, "docs/air_pm_map_2023.png", width=1400, height=800, scale=2, engine="kaleido")
-    print("🖼️ Wrote docs/air_pm_map_2023.png")
-except Exception as e:
+    from fig_export import ExportError, export_images
+    export_images([(fig, "docs/air_pm_map_2023.png", 1400, 800, 2)])
+except ImportError as e:
     print("ℹ️ PNG export skipped:", e)
+except ExportError as e:
+    print("⚠️ PNG export failed:", e)
@@ -0,0 +1,66 @@
+# scripts/64_air_trends.py
+# Which monitoring sites are getting cleaner? Seasonal Mann–Kendall + Sen's slope on
+# every (site, indicator) monthly series at once (see trends.py).
+#
+# Input : data_proc/air_periods_by_site.csv (from 61; monthly means with >= 75% coverage)
+# Output: data_proc/air_trends_by_site.csv — joins to air_annual_by_site.csv on
+#         region, site_name, lawa_site_id, indicator
+#
+#   python scripts/64_air_trends.py
+#   python scripts/64_air_trends.py --alpha 0.1 --min-years 8
+
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+from storage import exists, load, save
+from trends import seasonal_mann_kendall, series_cube
+
+IN_CSV = Path("data_proc/air_periods_by_site.csv")
+OUT_CSV = Path("data_proc/air_trends_by_site.csv")
+SITE_COLS = ["region", "site_name", "lawa_site_id", "indicator"]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--alpha", type=float, default=0.05)
+    ap.add_argument("--min-years", type=int, default=5, help="years with data needed for a test")
+    args = ap.parse_args()
+
+    if not exists(IN_CSV):
+        raise SystemExit(f"Missing {IN_CSV}. Run scripts/61_clean_lawa_air.py first.")
+    per = load(IN_CSV, columns=SITE_COLS + ["freq", "period", "valid", "mean_ugm3"])
+    monthly = per[(per["freq"] == "month") & per["valid"]].copy()
+    monthly["year"] = monthly["period"].str[:4].astype(int)
+    monthly["month"] = monthly["period"].str[5:7].astype(int)
+
+    keys, years, X = series_cube(monthly, SITE_COLS, "year", "month", "mean_ugm3")
+    print(f"→ {len(keys)} series × {len(years)} years ({years[0]}–{years[-1]}) × 12 months")
+    r = seasonal_mann_kendall(X)
+
+    has = ~np.isnan(X).all(axis=2)                      # (series, years)
+    out = keys.assign(
+        first_year=years[has.argmax(axis=1)],
+        last_year=years[len(years) - 1 - has[:, ::-1].argmax(axis=1)],
+        n_years=r["n_years"], n_months=r["n_obs"],
+        S=r["S"], Z=r["Z"], p_value=r["p_value"], p_value_uncorrected=r["p_value_uncorrected"],
+        sen_slope_ugm3_per_yr=r["sen_slope"],
+    )
+    out["pct_per_yr"] = 100 * out["sen_slope_ugm3_per_yr"] / np.nanmedian(X.reshape(len(X), -1), axis=1)
+
+    enough = out["n_years"] >= args.min_years
+    sig = enough & (out["p_value"] < args.alpha)
+    out["trend"] = np.select(
+        [~enough, sig & (out["sen_slope_ugm3_per_yr"] < 0), sig & (out["sen_slope_ugm3_per_yr"] > 0)],
+        ["insufficient data", "improving", "worsening"], default="no significant trend")
+    out.loc[~enough, ["Z", "p_value", "p_value_uncorrected"]] = np.nan
+
+    out = out.sort_values(SITE_COLS).reset_index(drop=True)
+    save(out, OUT_CSV)
+    print(f"✅ Wrote {OUT_CSV}  rows={len(out):,}")
+    print(out["trend"].value_counts().to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+# scripts/65_interpolate_pm_surface.py
+# Annual PM surface from the monitoring sites, on the VIIRS grid, so PM exposure gets
+# the same TA and health-region geometry as night lights (zonal.py).
+#
+# Input : data_proc/air_periods_by_site.csv (from 61; valid annual site means)
+#         site coordinates from the LAWA cache (lawa_io), VIIRS annual raster as grid
+# Output: data_proc/pm_surface/{indicator}_{method}_{year}.tif  (float32, NaN = no data)
+#         data_proc/pm_surface/pm_by_ta_{year}.csv, pm_by_health_region_{year}.csv
+#
+# IDW (power 2, k nearest sites found with a KD-tree in NZTM metres) is the default.
+# Cells with no site within --max-km are left empty rather than extrapolated.
+# Rows are interpolated in blocks, so a national grid takes seconds per year.
+# --method kriging fits ordinary kriging instead (needs pykrige; much slower).
+#
+#   python scripts/65_interpolate_pm_surface.py --year 2023
+#   python scripts/65_interpolate_pm_surface.py --year 2023 --indicator PM2.5 --max-km 100
+#   python scripts/65_interpolate_pm_surface.py --year 2023 --method kriging
+
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import rasterio
+from pyproj import Transformer
+from scipy.spatial import cKDTree
+
+from lawa_io import load_lawa
+from storage import exists, load, save
+from zonal import to_health_region, zonal_means
+
+PERIODS_CSV = Path("data_proc/air_periods_by_site.csv")
+VIIRS_TIF_PATTERN = "data_raw/viirs_annual_{year}.tif"
+OUT_DIR = Path("data_proc/pm_surface")
+METRIC_CRS = "EPSG:2193"          # NZTM, metres
+BLOCK_ROWS = 256
+
+
+# ---------- inputs ----------
+def site_means(year: int, indicator: str) -> pd.DataFrame:
+    """Valid annual means for one indicator-year with site lon/lat."""
+    if not exists(PERIODS_CSV):
+        raise SystemExit(f"Missing {PERIODS_CSV}. Run scripts/61_clean_lawa_air.py first.")
+    per = load(PERIODS_CSV, columns=["lawa_site_id", "indicator", "freq", "period", "valid", "mean_ugm3"])
+    per = per[(per["freq"] == "year") & per["valid"]
+              & (per["period"] == str(year)) & (per["indicator"] == indicator)]
+
+    coords = (load_lawa(columns=["lawa_site_id", "lat", "lon"])
+              .dropna().astype({"lawa_site_id": str})
+              .groupby("lawa_site_id", as_index=False)[["lat", "lon"]].mean())
+    return per.astype({"lawa_site_id": str}).merge(coords, on="lawa_site_id", how="inner")[["lawa_site_id", "lon", "lat", "mean_ugm3"]]
+
+
+def grid_tif(year: int) -> Path:
+    """The VIIRS raster for `year`, else the latest one on disk (same grid every year)."""
+    p = Path(VIIRS_TIF_PATTERN.format(year=year))
+    if p.exists():
+        return p
+    avail = sorted(Path("data_raw").glob("viirs_annual_*.tif"))
+    if not avail:
+        raise SystemExit("No data_raw/viirs_annual_*.tif to take the grid from.")
+    print(f"ℹ️ No {p}; using the grid of {avail[-1]}")
+    return avail[-1]
+
+
+# ---------- interpolation ----------
+def idw(tree: cKDTree, values: np.ndarray, xy: np.ndarray, k: int, power: float,
+        max_dist: float) -> np.ndarray:
+    """Inverse-distance weighted mean of the k nearest sites within max_dist."""
+    k = min(k, len(values))
+    d, i = tree.query(xy, k=k, distance_upper_bound=max_dist)
+    d, i = d.reshape(len(xy), k), i.reshape(len(xy), k)
+    found = np.isfinite(d)
+    v = values[np.where(found, i, 0)]
+    with np.errstate(divide="ignore"):
+        w = np.where(found, 1.0 / np.maximum(d, 1.0) ** power, 0.0)   # clamp: cell on a site
+    wsum = w.sum(axis=1)
+    with np.errstate(invalid="ignore"):
+        return np.where(wsum > 0, (w * v).sum(axis=1) / wsum, np.nan)
+
+
+def interpolate(sites: pd.DataFrame, src, method: str, k: int, power: float,
+                max_km: float) -> np.ndarray:
+    to_m = Transformer.from_crs("EPSG:4326", METRIC_CRS, always_xy=True)
+    grid_to_m = Transformer.from_crs(src.crs, METRIC_CRS, always_xy=True)
+    sx, sy = to_m.transform(sites["lon"].to_numpy(), sites["lat"].to_numpy())
+    values = sites["mean_ugm3"].to_numpy(dtype="float64")
+    tree = cKDTree(np.column_stack([sx, sy]))
+    max_dist = max_km * 1000
+
+    if method == "kriging":
+        try:
+            from pykrige.ok import OrdinaryKriging
+        except ImportError:
+            raise SystemExit("--method kriging needs pykrige (pip install pykrige).")
+        ok = OrdinaryKriging(sx, sy, values, variogram_model="spherical")
+
+    out = np.full((src.height, src.width), np.nan, dtype="float32")
+    cols = np.arange(src.width) + 0.5
+    for r0 in range(0, src.height, BLOCK_ROWS):
+        rows = np.arange(r0, min(r0 + BLOCK_ROWS, src.height)) + 0.5
+        cc, rr = np.meshgrid(cols, rows)
+        gx, gy = src.transform * (cc.ravel(), rr.ravel())             # cell centres
+        mx, my = grid_to_m.transform(gx, gy)
+        xy = np.column_stack([mx, my])
+
+        if method == "kriging":
+            near = np.isfinite(tree.query(xy, k=1, distance_upper_bound=max_dist)[0])
+            block = np.full(len(xy), np.nan)
+            if near.any():
+                block[near], _ = ok.execute("points", xy[near, 0], xy[near, 1])
+        else:
+            block = idw(tree, values, xy, k, power, max_dist)
+        out[r0:r0 + len(rows)] = block.reshape(len(rows), src.width)
+    return out
+
+
+def write_surface(arr: np.ndarray, src, path: Path) -> None:
+    profile = src.profile.copy()
+    profile.update(driver="GTiff", count=1, dtype="float32", nodata=np.nan, compress="deflate")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with rasterio.open(path, "w", **profile) as dst:
+        dst.write(arr, 1)
+
+
+# ---------- main ----------
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--year", type=int, required=True)
+    ap.add_argument("--indicator", choices=["PM2.5", "PM10"], action="append",
+                    help="default: both")
+    ap.add_argument("--method", choices=["idw", "kriging"], default="idw")
+    ap.add_argument("--k", type=int, default=8, help="IDW: nearest sites per cell")
+    ap.add_argument("--power", type=float, default=2.0, help="IDW: distance exponent")
+    ap.add_argument("--max-km", type=float, default=150.0, help="leave cells farther than this from any site empty")
+    args = ap.parse_args()
+
+    tif = grid_tif(args.year)
+    ta_parts = []
+    for ind in args.indicator or ["PM2.5", "PM10"]:
+        sites = site_means(args.year, ind)
+        if len(sites) < 3:
+            print(f"⚠️ {ind} {args.year}: only {len(sites)} valid site means; skipped")
+            continue
+        with rasterio.open(tif) as src:
+            arr = interpolate(sites, src, args.method, args.k, args.power, args.max_km)
+            out_tif = OUT_DIR / f"{ind}_{args.method}_{args.year}.tif"
+            write_surface(arr, src, out_tif)
+        print(f"🖼️ {out_tif}  sites={len(sites)}  covered={np.isfinite(arr).mean():.0%} of cells")
+
+        ta = zonal_means(out_tif, drop_negative=False)
+        ta_parts.append(ta.rename(columns={"mean": "value_ugm3"}).assign(indicator=ind))
+
+    if not ta_parts:
+        raise SystemExit("Nothing interpolated.")
+    ta = pd.concat(ta_parts, ignore_index=True).assign(year=args.year, method=args.method)
+    hr = pd.concat([to_health_region(g, "value_ugm3").assign(indicator=ind)
+                    for ind, g in ta.groupby("indicator")], ignore_index=True)
+    hr = hr.assign(year=args.year, method=args.method)
+
+    for name, tbl in ((f"pm_by_ta_{args.year}.csv", ta), (f"pm_by_health_region_{args.year}.csv", hr)):
+        save(tbl, OUT_DIR / name)
+        print(f"✅ Wrote {OUT_DIR / name}  rows={len(tbl):,}")
+
+
+if __name__ == "__main__":
+    main()
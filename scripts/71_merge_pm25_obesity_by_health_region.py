@@ -1,7 +1,26 @@
-import re
+# scripts/71_merge_pm25_obesity_by_health_region.py
+# Air quality × obesity by Health NZ region.
+#   data_proc/air_obesity_panel_by_health_region.csv  every survey year × ethnicity, with the
+#       PM2.5 / PM10 of the matching period (periods.align: a 2020/21 survey year gets the
+#       overlap-weighted mean of calendar 2020 and 2021)
+#   data_proc/air_obesity_by_health_region_2023.csv   the latest-survey × 2023 snapshot (app)
+#   data_proc/panel (panel_store.py)  the multi-year panel's obesity + PM columns at
+#       health_region level, keyed by survey year and ethnicity (source "air_obesity")
+#
+#   python scripts/71_merge_pm25_obesity_by_health_region.py
+#   python scripts/71_merge_pm25_obesity_by_health_region.py --window-months 36   # 3-year exposure
+#   python scripts/71_merge_pm25_obesity_by_health_region.py --how nearest --tolerance-years 2
+import argparse
 from pathlib import Path
 import pandas as pd
 
+from geo_registry import encode, merge
+from lawa_io import load_lawa
+from nzhs_io import read_indicators
+from panel_store import upsert
+from periods import align
+from storage import load, save
+
 ROOT = Path(__file__).resolve().parents[1]
 DATA_RAW  = ROOT / "data_raw"
 DATA_PROC = ROOT / "data_proc"
@@ -10,41 +29,91 @@ LAWA_XLS   = DATA_RAW / "lawa_air-quality-download-data_2016-2024.xlsx"
 RC2HR_CSV  = DATA_RAW / "regional_council_to_health_region.csv"
 OBE_CSV    = DATA_PROC / "obesity_by_region_ethnicity.csv"
 OUT_CSV    = DATA_PROC / "air_obesity_by_health_region_2023.csv"
+OUT_PANEL  = DATA_PROC / "air_obesity_panel_by_health_region.csv"
+SNAPSHOT_YEAR = 2023
+POLLUTANTS = {"PM2.5": "pm25_ugm3", "PM10": "pm10_ugm3"}
+PANEL_COLS = ["obesity_rate", "obesity_rate_low", "obesity_rate_high", *POLLUTANTS.values()]
+
+
+def pm_by_health_region() -> pd.DataFrame:
+    """Annual PM means per health region × year, one column per pollutant."""
+    df = load_lawa(LAWA_XLS, columns=["region", "indicator", "sample_date", "value_ugm3"],
+                   indicators=list(POLLUTANTS))
+    df["year"] = df["sample_date"].dt.year
+    annual = (df.groupby(["region", "year", "indicator"], as_index=False, observed=True)["value_ugm3"]
+                .mean())
+    annual["region"] = annual["region"].astype(str)
+    annual["indicator"] = annual["indicator"].astype(str)
+
+    # Regional Council -> Health Region (integer registry codes)
+    lut = encode(encode(pd.read_csv(RC2HR_CSV), "region", "regional_council"), "health_region")
+    pm = merge(encode(annual, "region", "regional_council"),
+               lut[["regional_council_code", "health_region", "health_region_code"]], "regional_council")
+    pm = pm[pm["health_region_code"] >= 0].astype({"health_region_code": "int64"})
+    pm_hr = (pm.groupby(["health_region_code", "health_region", "year", "indicator"],
+                        as_index=False, observed=True)["value_ugm3"].mean())
+    wide = (pm_hr.pivot_table(index=["health_region_code", "health_region", "year"], columns="indicator",
+                              values="value_ugm3", observed=True)
+                 .rename(columns=POLLUTANTS).reset_index())
+    wide.columns.name = None
+    for c in POLLUTANTS.values():
+        if c not in wide.columns:
+            wide[c] = float("nan")
+    return wide
 
-# --- Load LAWA and build annual means ---
-xls = pd.ExcelFile(LAWA_XLS, engine="openpyxl")
-sheet = next((s for s in xls.sheet_names if re.search(r"(data|monitor|dataset|pm|meas|observ)", s, re.I)), xls.sheet_names[0])
-df = xls.parse(sheet)
-df.columns = [c.strip() for c in df.columns]
 
-col_region = [c for c in df.columns if c.lower() in ("region","regional council","council")][0]
-col_ind    = [c for c in df.columns if "indicator" in c.lower()][0]
-col_date   = [c for c in df.columns if "sample date" in c.lower()][0]
-col_value  = [c for c in df.columns if "concentration" in c.lower()][0]
+def obesity_panel() -> pd.DataFrame:
+    """Every survey year from the NZHS indicator store (51b), else the latest-year CSV (51)."""
+    obe = read_indicators(["overweight_obese"])
+    if len(obe):
+        obe = (obe[obe["health_region"].notna()]
+                  .rename(columns={"value": "obesity_rate", "value_low": "obesity_rate_low",
+                                   "value_high": "obesity_rate_high"})
+                  [["health_region", "year_to", "ethnicity", "obesity_rate", "obesity_rate_low", "obesity_rate_high"]])
+        obe = obe.astype({"health_region": str, "year_to": str, "ethnicity": str})
+    else:
+        print(f"ℹ️ No NZHS indicator store; using {OBE_CSV.name} (latest survey year only)")
+        obe = load(OBE_CSV).astype({"health_region": str, "year_to": str, "ethnicity": str})
+    obe = encode(obe, "health_region")
+    return obe[obe["health_region_code"] != 0]                 # regions only, not the NZ total
 
-df[col_date] = pd.to_datetime(df[col_date], errors="coerce")
-df["year"]   = df[col_date].dt.year
 
-annual = (df.groupby([col_region,"year",col_ind], as_index=False)[col_value]
-            .mean()
-            .rename(columns={col_region:"region", col_ind:"indicator", col_value:"value_ugm3"}))
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--how", choices=["overlap", "nearest"], default="overlap")
+    ap.add_argument("--lag-months", type=int, default=0, help="overlap: shift the exposure window back")
+    ap.add_argument("--window-months", type=int, help="overlap: fixed window ending at the survey period's end")
+    ap.add_argument("--min-coverage", type=float, default=0.5, help="overlap: share of the window with PM data")
+    ap.add_argument("--tolerance-years", type=float, default=1.0, help="nearest: max distance between periods")
+    args = ap.parse_args()
 
-pm = (annual[(annual["indicator"].str.contains("PM2.5", case=False, regex=False)) & (annual["year"]==2023)]
-        .copy()[["region","value_ugm3"]])
+    pm_hr = pm_by_health_region()
+    values = list(POLLUTANTS.values())
 
-# --- Map Regional Council -> Health Region and aggregate ---
-lut = pd.read_csv(RC2HR_CSV)
-pm = pm.merge(lut, on="region", how="left")
-pm_hr = pm.groupby("health_region", as_index=False)["value_ugm3"].mean().rename(columns={"value_ugm3":"pm25_ugm3_2023"})
+    # --- multi-year panel ---
+    panel = align(obesity_panel(), pm_hr.drop(columns="health_region"), on=["health_region_code"],
+                  values=values, left_period="year_to", right_period="year", how=args.how,
+                  tolerance=pd.Timedelta(days=round(365.25 * args.tolerance_years)),
+                  lag_months=args.lag_months, window_months=args.window_months,
+                  min_coverage=args.min_coverage)
+    panel = panel.sort_values(["health_region", "ethnicity", "year_to"])
+    save(panel, OUT_PANEL)
+    print(f"✅ Wrote {OUT_PANEL}  (rows: {len(panel)}, survey years: {panel['year_to'].nunique()})")
+    rows = (panel.rename(columns={"health_region_code": "zone_code", "year_to": "period"})
+                 [["zone_code", "period", "ethnicity"] + [c for c in PANEL_COLS if c in panel.columns]])
+    n = upsert(rows.assign(geo_level="health_region"), source="air_obesity")
+    print(f"✅ Panel: rewrote {n} health_region partition(s)")
 
-# --- Load obesity (ethnicity-level) and join ---
-obe = pd.read_csv(OBE_CSV)  # columns: health_region, year_to, ethnicity, obesity_rate, ...
-obe23 = obe.copy()  # 2020/21 snapshot; you can filter if you add more years later
+    # --- latest survey × SNAPSHOT_YEAR PM2.5 (what the app's equity lens reads) ---
+    snap = (pm_hr[pm_hr["year"] == SNAPSHOT_YEAR][["health_region_code", "health_region", "pm25_ugm3"]]
+              .rename(columns={"pm25_ugm3": f"pm25_ugm3_{SNAPSHOT_YEAR}"}))
+    obe = encode(load(OBE_CSV), "health_region")  # health_region, year_to, ethnicity, obesity_rate, ...
+    merged = (merge(obe, snap, "health_region")
+                    .dropna(subset=[f"pm25_ugm3_{SNAPSHOT_YEAR}"]))
+    save(merged, OUT_CSV)
+    print(f"✅ Wrote {OUT_CSV}  (rows: {len(merged)})")
+    print(merged.head())
 
-merged = (obe23.merge(pm_hr, on="health_region", how="left")
-                .dropna(subset=["pm25_ugm3_2023"]))
 
-OUT_CSV.parent.mkdir(parents=True, exist_ok=True)
-merged.to_csv(OUT_CSV, index=False)
-print(f"✅ Wrote {OUT_CSV}  (rows: {len(merged)})")
-print(merged.head())
\ No newline at end of file
+if __name__ == "__main__":
+    main()
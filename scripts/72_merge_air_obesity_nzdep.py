@@ -2,16 +2,21 @@
 from pathlib import Path
 import pandas as pd
 
+from geo_registry import encode, merge
+from panel_store import upsert
+from storage import exists, load, save
+
 AIR_OBE = Path("data_proc/air_obesity_by_health_region_2023.csv")
 NZDEP   = Path("data_raw/nzdep_by_health_region.csv")
 OUT     = Path("data_proc/air_obesity_deprivation_2023.csv")
+NZDEP_PERIOD = "2018"    # NZDep2018 (census-based)
 
-if not AIR_OBE.exists():
+if not exists(AIR_OBE):
     raise FileNotFoundError(f"Missing {AIR_OBE}")
 if not NZDEP.exists():
     raise FileNotFoundError(f"Missing {NZDEP} (run the template step & fill values)")
 
-ao  = pd.read_csv(AIR_OBE)
+ao  = encode(load(AIR_OBE), "health_region")
 dep = pd.read_csv(NZDEP)
 
 # basic sanity
@@ -21,9 +26,14 @@ if miss:
     raise ValueError(f"{NZDEP} missing columns: {miss}")
 
 # keep only needed dep columns
-dep = dep[["health_region","nzdep_9_10_share"]].copy()
+dep = encode(dep[["health_region","nzdep_9_10_share"]], "health_region")
+
+# zone-level indicator in the analysis panel; the app attaches it to every period/ethnicity
+upsert(dep.rename(columns={"health_region_code": "zone_code"})[["zone_code", "nzdep_9_10_share"]]
+          .assign(geo_level="health_region", period=NZDEP_PERIOD, ethnicity="Total"),
+       source="nzdep")
 
-m = (ao.merge(dep, on="health_region", how="left")
+m = (merge(ao, dep, "health_region")
        .sort_values(["health_region","ethnicity"]))
 
 # quick checks
@@ -31,7 +41,6 @@ if m["nzdep_9_10_share"].isna().any():
     missing_regions = m.loc[m["nzdep_9_10_share"].isna(),"health_region"].unique()
     print("⚠️ NZDep missing for:", missing_regions)
 
-OUT.parent.mkdir(parents=True, exist_ok=True)
-m.to_csv(OUT, index=False)
+save(m, OUT)
 print(f"✅ Wrote {OUT}  (rows: {len(m)})")
 print(m.head(8))
\ No newline at end of file
@@ -1,8 +1,14 @@
 # scripts/73_plot_air_obesity_deprivation.py
+# Latest survey year from the analysis panel (panel_store.py: PM matched to the survey
+# period, NZDep attached per region); falls back to the 2023 snapshot CSV from 72.
 from pathlib import Path
 import pandas as pd
 import plotly.express as px
-import plotly.io as pio
+
+from fig_export import export_images
+from panel_store import attach, read_panel
+from site_assets import write_html
+from storage import load
 
 IN   = Path("data_proc/air_obesity_deprivation_2023.csv")
 OUTD = Path("data_proc")
@@ -11,15 +17,25 @@ DOCS = Path("docs")
 OUTD.mkdir(parents=True, exist_ok=True)
 DOCS.mkdir(parents=True, exist_ok=True)
 
-df = pd.read_csv(IN)
+panel = read_panel("health_region", ["obesity_rate", "pm25_ugm3"]).dropna(subset=["obesity_rate"])
+if len(panel):
+    survey = max(panel["period"])
+    df = attach(panel[panel["period"] == survey], "health_region", "nzdep_9_10_share")
+    df = df.rename(columns={"zone": "health_region"}).astype({"health_region": str, "ethnicity": str})
+    pm_period = survey
+    print(f"→ Analysis panel, survey year {survey}")
+else:
+    df = (load(IN).rename(columns={"pm25_ugm3_2023": "pm25_ugm3"})
+            .astype({"health_region": str, "ethnicity": str}))
+    survey, pm_period = "2020/21", "2023"
 
 # ---- tidy / guards ----
-need = ["health_region", "ethnicity", "pm25_ugm3_2023", "obesity_rate", "nzdep_9_10_share"]
+need = ["health_region", "ethnicity", "pm25_ugm3", "obesity_rate", "nzdep_9_10_share"]
 missing_cols = [c for c in need if c not in df.columns]
 if missing_cols:
     raise SystemExit(f"❌ Missing columns in {IN}: {missing_cols}")
 
-df = df.dropna(subset=["pm25_ugm3_2023", "obesity_rate", "nzdep_9_10_share"]).copy()
+df = df.dropna(subset=["pm25_ugm3", "obesity_rate", "nzdep_9_10_share"]).copy()
 
 # Nice display columns
 df["obesity_pct"] = df["obesity_rate"] * 100.0
@@ -33,22 +49,22 @@ c_label = "NZDep (Deciles 9–10, % of pop.)"
 # ---------- (A) Overall scatter ----------
 fig_all = px.scatter(
     df,
-    x="pm25_ugm3_2023",
+    x="pm25_ugm3",
     y="obesity_pct",
     color="nzdep_9_10_share",
     color_continuous_scale="Viridis",
     hover_data={
         "health_region": True,
         "ethnicity": True,
-        "pm25_ugm3_2023": ":.2f",
+        "pm25_ugm3": ":.2f",
         "obesity_pct": ":.1f",
         "dep_pct": ":.1f",
         "nzdep_9_10_share": False,  # hide raw proportion in tooltip
     },
     symbol="health_region",
-    title="Air pollution × Obesity × Deprivation (2023 • 2020/21)",
+    title=f"Air pollution × Obesity × Deprivation ({pm_period} • {survey})",
     labels={
-        "pm25_ugm3_2023": x_label,
+        "pm25_ugm3": x_label,
         "obesity_pct": y_label,
         "nzdep_9_10_share": c_label,
         "health_region": "Health region",
@@ -65,9 +81,7 @@ fig_all.update_layout(
 # Save
 png_all  = OUTD / "air_obesity_dep_scatter_2023.png"
 html_all = DOCS / "air_obesity_dep_scatter_2023.html"
-fig_all.write_image(png_all.as_posix(), width=1400, height=900, scale=2, engine="kaleido")
-pio.write_html(fig_all, file=html_all.as_posix(), include_plotlyjs="cdn", full_html=True)
-print(f"✅ Saved overall scatter → {png_all}")
+write_html(fig_all, html_all)
 print(f"✅ Saved interactive → {html_all}")
 
 # ---------- (B) Small multiples by ethnicity ----------
@@ -76,7 +90,7 @@ df["ethnicity"] = pd.Categorical(df["ethnicity"], categories=order_eth, ordered=
 
 fig_fac = px.scatter(
     df.sort_values(["ethnicity", "health_region"]),
-    x="pm25_ugm3_2023",
+    x="pm25_ugm3",
     y="obesity_pct",
     color="nzdep_9_10_share",
     color_continuous_scale="Viridis",
@@ -85,7 +99,7 @@ fig_fac = px.scatter(
     facet_col_wrap=2,  # 2 columns layout
     hover_data={
         "health_region": True,
-        "pm25_ugm3_2023": ":.2f",
+        "pm25_ugm3": ":.2f",
         "obesity_pct": ":.1f",
         "dep_pct": ":.1f",
         "nzdep_9_10_share": False,
@@ -93,7 +107,7 @@ fig_fac = px.scatter(
     },
     title="PM₂.₅ vs Obesity — faceted by Ethnicity (colour = NZDep 9–10 share)",
     labels={
-        "pm25_ugm3_2023": x_label,
+        "pm25_ugm3": x_label,
         "obesity_pct": y_label,
         "nzdep_9_10_share": c_label,
         "health_region": "Health region",
@@ -110,9 +124,13 @@ fig_fac.update_layout(
 # Save
 png_fac  = OUTD / "air_obesity_dep_facets_by_ethnicity_2023.png"
 html_fac = DOCS / "air_obesity_dep_facets_by_ethnicity_2023.html"
-fig_fac.write_image(png_fac.as_posix(), width=1600, height=1100, scale=2, engine="kaleido")
-pio.write_html(fig_fac, file=html_fac.as_posix(), include_plotlyjs="cdn", full_html=True)
-print(f"✅ Saved facets → {png_fac}")
+write_html(fig_fac, html_fac)
 print(f"✅ Saved interactive → {html_fac}")
 
+# ---------- static PNGs (rendered in parallel, skipped if unchanged) ----------
+export_images([
+    (fig_all, png_all, 1400, 900, 2),
+    (fig_fac, png_fac, 1600, 1100, 2),
+])
+
 print("\nTip: Publish the interactive HTML via GitHub Pages (already set to /docs).")
\ No newline at end of file
@@ -0,0 +1,85 @@
+# scripts/74_association_stats.py
+# Strength and uncertainty of the region-level associations the app plots:
+# obesity vs PM2.5 / PM10 / night-lights per ethnicity (and all ethnicities pooled),
+# as r, slope and r partial on NZDep, with cluster-bootstrap CIs (regions resampled)
+# and permutation p-values (assoc_stats.py). Output is cached for the app:
+#   data_proc/association_stats.csv
+#
+#   python scripts/74_association_stats.py
+#   python scripts/74_association_stats.py --survey 2020/21 --n-boot 100000 --n-perm 100000
+#
+# Input: the analysis panel (panel_store.py) for one survey year; without a panel,
+# the committed 2023 snapshot (72) plus brightness_by_health_region.csv (50).
+import argparse
+import time
+from pathlib import Path
+
+from assoc_stats import association_table
+from geo_registry import encode, merge
+from panel_store import attach, read_panel
+from storage import exists, load, save
+
+ROOT = Path(__file__).resolve().parents[1]
+DATA_PROC = ROOT / "data_proc"
+SNAPSHOT = DATA_PROC / "air_obesity_deprivation_2023.csv"
+BRIGHTNESS = DATA_PROC / "brightness_by_health_region.csv"
+OUT = DATA_PROC / "association_stats.csv"
+
+OUTCOME = "obesity_rate"
+EXPOSURES = ["pm25_ugm3", "pm10_ugm3", "radiance_mean"]
+CONTROL = "nzdep_9_10_share"
+
+
+def load_inputs(survey: str | None) -> tuple:
+    """(rows: health_region_code, ethnicity, outcome, exposures, control; survey label)"""
+    panel = read_panel("health_region", [OUTCOME, "pm25_ugm3", "pm10_ugm3"]).dropna(subset=[OUTCOME])
+    if len(panel):
+        survey = survey or max(panel["period"])
+        df = panel[panel["period"] == survey]
+        for col in ("radiance_mean", CONTROL):
+            df = attach(df, "health_region", col)
+        df = df.rename(columns={"zone_code": "health_region_code", "zone": "health_region"})
+        print(f"→ Analysis panel, survey year {survey}")
+    else:
+        print(f"ℹ️ No analysis panel; using {SNAPSHOT.name} + {BRIGHTNESS.name}")
+        df = encode(load(SNAPSHOT).rename(columns={"pm25_ugm3_2023": "pm25_ugm3"}), "health_region")
+        if exists(BRIGHTNESS):
+            df = merge(df, encode(load(BRIGHTNESS), "health_region"), "health_region")
+        survey = str(df["year_to"].iloc[0])
+    df = df[df["health_region_code"] > 0]                      # regions only, not the NZ total
+    return df.astype({"ethnicity": str}), survey
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--survey", help="NZHS survey year in the panel (default: latest)")
+    ap.add_argument("--n-boot", type=int, default=100_000)
+    ap.add_argument("--n-perm", type=int, default=100_000)
+    ap.add_argument("--ci", type=float, default=0.95)
+    ap.add_argument("--seed", type=int, default=42)
+    args = ap.parse_args()
+
+    df, survey = load_inputs(args.survey)
+    if df.empty:
+        raise SystemExit("No obesity rows to analyse (run 71 / 72 first).")
+    control = CONTROL if CONTROL in df.columns and df[CONTROL].notna().any() else None
+    if control is None:
+        print(f"⚠️ No {CONTROL}; partial associations skipped")
+
+    t0 = time.perf_counter()
+    tab = association_table(df, EXPOSURES, OUTCOME, by="ethnicity", cluster="health_region_code",
+                            control=control, n_boot=args.n_boot, n_perm=args.n_perm,
+                            ci=args.ci, seed=args.seed)
+    tab.insert(0, "survey", survey)
+    print(f"→ {tab[['ethnicity', 'exposure']].drop_duplicates().shape[0]} associations "
+          f"in {time.perf_counter() - t0:.1f}s")
+
+    save(tab, OUT)
+    print(f"✅ Wrote {OUT}  (rows: {len(tab)})")
+    show = tab[tab["stat"] == "r"][["ethnicity", "exposure", "n_clusters", "estimate",
+                                    "ci_low", "ci_high", "p_perm"]]
+    print(show.to_string(index=False, float_format=lambda v: f"{v:.3f}"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+# scripts/80_build_docs_site.py
+# Tidy the docs/ site after the page scripts (30, 31, 32, 63, 73) have written
+# their thin HTML via site_assets.write_html:
+#   - drop assets no page references any more (old hashes, deleted pages)
+#   - report page weight: what each page downloads vs what is shared/cached
+#
+# Usage:
+#   python scripts/80_build_docs_site.py            # prune + report
+#   python scripts/80_build_docs_site.py --dry-run  # report only
+
+import argparse
+import json
+from pathlib import Path
+
+from site_assets import ASSET_DIR
+
+DOCS = Path("docs")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--root", type=Path, default=DOCS)
+    ap.add_argument("--dry-run", action="store_true")
+    args = ap.parse_args()
+
+    asset_dir = args.root / ASSET_DIR
+    man_path = asset_dir / "manifest.json"
+    if not man_path.exists():
+        raise SystemExit(f"No {man_path}. Run the page scripts first (e.g. scripts/31_single_map_toggle.py).")
+    man = json.loads(man_path.read_text())
+
+    # pages that were deleted since they were last written
+    gone = [p for p in man if not (args.root / p).exists()]
+    for p in gone:
+        print(f"   page gone: {p}")
+        del man[p]
+
+    referenced = {a for assets in man.values() for a in assets}
+    stale = [p for p in [*asset_dir.glob("*.json"), *asset_dir.glob("*.js")]
+             if p.name != "manifest.json" and p.name not in referenced]
+    for p in stale:
+        print(f"   {'would remove' if args.dry_run else 'removing'} {p.name} ({p.stat().st_size / 1e3:.0f} kB)")
+        if not args.dry_run:
+            p.unlink()
+    if not args.dry_run:
+        man_path.write_text(json.dumps(man, indent=2, sort_keys=True))
+
+    # ---- page weight report ----
+    size = lambda name: (asset_dir / name).stat().st_size if (asset_dir / name).exists() else 0  # noqa: E731
+    users = {}
+    for page, assets in man.items():
+        for a in assets:
+            users.setdefault(a, []).append(page)
+
+    print(f"\n{'page':<48}{'html':>8}{'own':>10}{'shared':>10}")
+    for page, assets in sorted(man.items()):
+        html_kb = (args.root / page).stat().st_size / 1e3
+        own = sum(size(a) for a in assets if len(users[a]) == 1) / 1e3
+        shared = sum(size(a) for a in assets if len(users[a]) > 1) / 1e3
+        print(f"{page:<48}{html_kb:>7.1f}k{own:>9.1f}k{shared:>9.1f}k")
+
+    total_unique = sum(size(a) for a in users) / 1e6
+    total_inline = sum(size(a) for assets in man.values() for a in assets) / 1e6
+    print(f"\n✅ {len(man)} pages, {len(users)} assets: {total_unique:.2f} MB on disk "
+          f"(would be {total_inline:.2f} MB if every page inlined its own copy)")
+
+
+if __name__ == "__main__":
+    main()
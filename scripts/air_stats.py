@@ -0,0 +1,324 @@
+# scripts/air_stats.py
+# Vectorised air-quality statistics over the LAWA daily table (see 61_clean_lawa_air.py).
+#
+#   from air_stats import THRESHOLDS, exceedance_table, hourly_to_daily
+#   thresh = exceedance_table(daily)            # one row per site-year
+#   daily = hourly_to_daily(hourly)             # hourly LAWA export -> daily table
+#   eps = episodes(daily); episode_rollup(eps)  # runs of consecutive exceedance days
+#   site, region, matrix = period_means(daily)  # monthly / seasonal / annual, coverage-aware
+#
+# Thresholds are a table, not code: one row per (indicator, averaging period, limit)
+# with a short `label` used in the output column names. Pass your own DataFrame or
+# a CSV with the same columns (load_thresholds) to change standards.
+#
+# Periods:
+#   24h          compared with each daily (calendar-day) mean (counts days over the limit)
+#   24h_rolling  compared with each day's highest rolling-24h mean (hourly data; falls
+#                back to the daily mean when the table has no max_rolling24h_ugm3)
+#   annual       compared with the group (site-year) mean
+#
+# Output per group: days_measured, then for every label
+#   exceed_<label>           days (24h) or 0/1 (annual) over the limit
+#   max_exceed_<label>       largest amount over the limit, µg/m³ (NaN if never over)
+#   first_exceed_day_<label> days from the group's first measurement to the first
+#                            exceedance (24h only; NaN if never over)
+# Labels that don't apply to a group's indicator are NaN, as before.
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+GROUP = ["region", "site_name", "lawa_site_id", "indicator", "year"]
+PERIODS = ("24h", "24h_rolling", "annual")
+MIN_HOURS = 18          # valid hours needed for a 24-hour mean (calendar day or rolling window)
+SERIES = ["lawa_site_id", "indicator"]
+
+# period_means(): a site-period mean only counts if measured days / calendar days
+# reaches this share; regional means weight valid site means by that coverage.
+MIN_COVERAGE = {"month": 0.75, "season": 0.75, "year": 0.75}
+SEASON_OF_MONTH = np.array(["DJF", "DJF", "MAM", "MAM", "MAM", "JJA", "JJA", "JJA", "SON", "SON", "SON", "DJF"])
+SEASON_START = {"DJF": -1, "MAM": 2, "JJA": 5, "SON": 8}   # first month (0 = Jan) of the season
+
+# WHO 2021 daily guidelines (µg/m³); NZ NES PM10 24-hr = 50 µg/m³. Adjust if you prefer other limits.
+THRESHOLDS = pd.DataFrame(
+    [
+        ("PM2.5", "24h", 15.0, "who_daily", "WHO 2021 air quality guideline"),
+        ("PM10",  "24h", 45.0, "who_daily", "WHO 2021 air quality guideline"),
+        ("PM10",  "24h", 50.0, "nes_daily", "NZ National Environmental Standard"),
+    ],
+    columns=["indicator", "period", "limit_ugm3", "label", "standard"],
+)
+
+
+def load_thresholds(path: Path | None = None) -> pd.DataFrame:
+    """Threshold table from CSV (indicator, period, limit_ugm3, label[, standard]) or the default."""
+    if path is None:
+        return THRESHOLDS
+    t = pd.read_csv(path)
+    missing = {"indicator", "period", "limit_ugm3", "label"} - set(t.columns)
+    if missing:
+        raise ValueError(f"{path}: missing threshold columns {sorted(missing)}")
+    bad = set(t["period"]) - set(PERIODS)
+    if bad:
+        raise ValueError(f"{path}: unsupported averaging period(s) {sorted(bad)}; expected {PERIODS}")
+    return t
+
+
+def exceedance_table(daily: pd.DataFrame, thresholds: pd.DataFrame = THRESHOLDS,
+                     by: list = GROUP, value: str = "value_ugm3",
+                     date: str = "sample_date") -> pd.DataFrame:
+    """Exceedance counts / magnitude / timing for every group in one grouped pass.
+    `by` must include "indicator" (limits are looked up per group).
+    Rows with a missing group key are left out, as groupby would."""
+    daily = daily.dropna(subset=by)
+    gb = daily.groupby(by, observed=True, sort=True)
+    size = gb.size()
+    codes = gb.ngroup().to_numpy()
+    out = size.rename("days_measured").reset_index()
+    ind_g = out["indicator"].astype(str).to_numpy()
+
+    vals = daily[value].to_numpy(dtype="float64")
+    days = daily[date].to_numpy(dtype="datetime64[D]").astype("int64")
+
+    # per-row columns for every 24h label, aggregated together below
+    labels = list(dict.fromkeys(thresholds["label"]))
+    lim_g, cols, aggs = {}, {"_days": days, "_v": vals}, {"_first": ("_days", "min"), "_mean": ("_v", "mean")}
+    for lab in labels:
+        t = thresholds[thresholds["label"] == lab]
+        limit = pd.Series(t["limit_ugm3"].to_numpy(dtype="float64"), index=t["indicator"].astype(str))
+        lim_g[lab] = limit.reindex(ind_g).to_numpy()            # NaN where label doesn't apply
+        if t["period"].iloc[0] == "annual":
+            continue
+        src = vals
+        if t["period"].iloc[0] == "24h_rolling" and "max_rolling24h_ugm3" in daily:
+            src = daily["max_rolling24h_ugm3"].to_numpy(dtype="float64")
+        over = src - lim_g[lab][codes]
+        hit = over > 0
+        cols[f"_hit_{lab}"] = hit
+        cols[f"_over_{lab}"] = np.where(hit, over, np.nan)
+        cols[f"_day_{lab}"] = np.where(hit, days, np.nan)
+        aggs[f"_hit_{lab}"] = (f"_hit_{lab}", "sum")
+        aggs[f"_over_{lab}"] = (f"_over_{lab}", "max")
+        aggs[f"_day_{lab}"] = (f"_day_{lab}", "min")
+
+    g = pd.DataFrame(cols).groupby(codes, sort=True).agg(**aggs).reset_index(drop=True)
+
+    extra = {}
+    for lab in labels:
+        lim = pd.Series(lim_g[lab])
+        applies = lim.notna().to_numpy()
+        if f"_hit_{lab}" not in g:                              # annual: group mean vs limit
+            over = g["_mean"] - lim
+            count = (over > 0).astype("float64")
+            max_over = over.where(over > 0)
+            first = pd.Series(np.nan, index=g.index)
+        else:
+            count = g[f"_hit_{lab}"].astype("float64")
+            max_over = g[f"_over_{lab}"]
+            first = g[f"_day_{lab}"] - g["_first"]
+        count = count.where(applies).to_numpy()
+        out[f"exceed_{lab}"] = count.astype("int64") if applies.all() else count
+        extra[f"max_exceed_{lab}"] = max_over.where(applies).to_numpy()
+        extra[f"first_exceed_day_{lab}"] = first.where(applies).to_numpy()
+    return out.assign(**extra)
+
+
+# ---------- hourly -> daily ----------
+def is_subdaily(df: pd.DataFrame, date: str = "sample_date") -> bool:
+    """True if any timestamp carries a time of day (i.e. hourly rather than daily data)."""
+    d = df[date].dropna()
+    return bool((d != d.dt.normalize()).any())
+
+
+def hourly_to_daily(hourly: pd.DataFrame, min_hours: int = MIN_HOURS, value: str = "value_ugm3",
+                    date: str = "sample_date", series: list = SERIES) -> pd.DataFrame:
+    """
+    Calendar-day means plus each day's highest rolling-24h mean, per site series.
+    Works on one sorted array for all series (no per-site loop): duplicate hours keep
+    the last value, rolling windows end at each observed hour and their sums come
+    from a cumulative sum + searchsorted, and day aggregates from reduceat over day
+    boundaries. Days with fewer than `min_hours`
+    valid hours are dropped; rolling windows with fewer are ignored.
+    Returns the input's other columns (taken from each series' first row) with
+    sample_date = day, value_ugm3 = daily mean, n_hours, max_rolling24h_ugm3.
+    """
+    df = hourly.dropna(subset=[value, date, *series])          # no series key -> no group code
+    if df.empty:
+        return df.assign(n_hours=pd.Series(dtype="int64"), max_rolling24h_ugm3=pd.Series(dtype="float64"))
+    s = df.groupby(series, observed=True, sort=False).ngroup().to_numpy().astype("int64")
+    h = df[date].to_numpy(dtype="datetime64[h]").astype("int64")
+    v = df[value].to_numpy(dtype="float64")
+
+    # series in the high bits, hours in the low bits -> one sortable key
+    t = (s << 32) + (h - h.min())
+    order = np.argsort(t, kind="stable")          # stable: the last duplicate hour wins
+    s, h, v, t = s[order], h[order], v[order], t[order]
+    last = np.r_[t[1:] != t[:-1], True]
+    s, h, v, t, rows = s[last], h[last], v[last], t[last], order[last]
+
+    # rolling 24h: hours (h-23 .. h) of the same series
+    cs = np.r_[0.0, np.cumsum(v)]
+    i = np.arange(len(t))
+    left = np.searchsorted(t, t - 23, side="left")
+    n24 = i + 1 - left
+    roll = np.where(n24 >= min_hours, (cs[i + 1] - cs[left]) / n24, np.nan)
+
+    # calendar days
+    day = np.floor_divide(h, 24)
+    dkey = (s << 32) + (day - day.min())
+    starts = np.flatnonzero(np.r_[True, dkey[1:] != dkey[:-1]])
+    n_hours = np.diff(np.r_[starts, len(dkey)])
+    mean = np.add.reduceat(v, starts) / n_hours
+    rmax = np.fmax.reduceat(roll, starts)
+    ok = n_hours >= min_hours
+
+    meta = [c for c in df.columns if c not in (value, date)]
+    out = df.iloc[rows[starts]][meta].reset_index(drop=True)
+    out[date] = pd.to_datetime(day[starts].astype("datetime64[D]"))
+    out[value] = mean
+    out["n_hours"] = n_hours
+    out["max_rolling24h_ugm3"] = rmax
+    if (~ok).any():
+        print(f"   dropped {int((~ok).sum()):,} incomplete days (< {min_hours} valid hours)")
+    return out[ok].reset_index(drop=True)
+
+
+# ---------- episodes ----------
+def _limit_per_row(indicator: pd.Series, limit: dict) -> np.ndarray:
+    """Per-row limit via the indicator's category codes (NaN where no limit applies)."""
+    cat = pd.Categorical(indicator)
+    lut = np.array([limit.get(str(c), np.nan) for c in cat.categories] + [np.nan], dtype="float64")
+    return lut[cat.codes]            # code -1 (missing) -> trailing NaN
+
+
+def episodes(daily: pd.DataFrame, thresholds: pd.DataFrame = THRESHOLDS, series: list = SERIES,
+             value: str = "value_ugm3", date: str = "sample_date") -> pd.DataFrame:
+    """
+    Runs of consecutive calendar days over the limit, per site series and 24h label.
+    Run-length encoding over one sorted (series, day) array: linear after the sort,
+    no per-site loop. A day without a measurement ends a run.
+    One row per episode: series/site columns, label, start, end, length_days,
+    peak_ugm3, mean_ugm3.
+    """
+    meta = [c for c in ("region", "site_name", *series) if c in daily.columns]
+    daily = daily.dropna(subset=series)                         # ngroup() gives no code to null keys
+    s = daily.groupby(series, observed=True, sort=False).ngroup().to_numpy().astype("int64")
+    day = daily[date].to_numpy(dtype="datetime64[D]").astype("int64")
+    t = (s << 32) + (day - (day.min() if len(day) else 0))
+    order = np.argsort(t, kind="stable")
+
+    out = []
+    for lab in dict.fromkeys(thresholds["label"]):
+        th = thresholds[thresholds["label"] == lab]
+        period = th["period"].iloc[0]
+        if period == "annual":
+            continue
+        col = "max_rolling24h_ugm3" if period == "24h_rolling" and "max_rolling24h_ugm3" in daily else value
+        lim = _limit_per_row(daily["indicator"], dict(zip(th["indicator"].astype(str), th["limit_ugm3"])))
+        v = daily[col].to_numpy(dtype="float64")
+        idx = order[(v[order] - lim[order]) > 0]          # exceedance days, sorted
+        if not len(idx):
+            continue
+        tk = t[idx]
+        starts = np.flatnonzero(np.r_[True, np.diff(tk) != 1])
+        length = np.diff(np.r_[starts, len(idx)])
+        vv = v[idx]
+        ep = daily.iloc[idx[starts]][meta].reset_index(drop=True)
+        ep["label"] = lab
+        ep["start"] = daily[date].to_numpy()[idx[starts]].astype("datetime64[D]")
+        ep["end"] = daily[date].to_numpy()[idx[starts + length - 1]].astype("datetime64[D]")
+        ep["length_days"] = length
+        ep["peak_ugm3"] = np.maximum.reduceat(vv, starts)
+        ep["mean_ugm3"] = np.add.reduceat(vv, starts) / length
+        out.append(ep)
+    cols = meta + ["label", "start", "end", "length_days", "peak_ugm3", "mean_ugm3"]
+    return pd.concat(out, ignore_index=True) if out else pd.DataFrame(columns=cols)
+
+
+def episode_rollup(eps: pd.DataFrame, by: tuple = ("region", "indicator", "label")) -> pd.DataFrame:
+    """Episodes per region/indicator/label and year of the episode start."""
+    eps = eps.assign(year=pd.to_datetime(eps["start"]).dt.year, _single=eps["length_days"] == 1)
+    return (eps.groupby([*by, "year"], as_index=False, observed=True)
+               .agg(n_episodes=("length_days", "size"),
+                    episode_days=("length_days", "sum"),
+                    single_day=("_single", "sum"),
+                    longest_days=("length_days", "max"),
+                    mean_length_days=("length_days", "mean"),
+                    peak_ugm3=("peak_ugm3", "max"),
+                    n_sites=("lawa_site_id", "nunique")))
+
+
+# ---------- monthly / seasonal / annual ----------
+def _month_days(ym: np.ndarray, n: int = 1) -> np.ndarray:
+    """Calendar days in the n months starting at absolute month index ym (= year*12 + month0)."""
+    start = (ym - 1970 * 12).astype("datetime64[M]")
+    return ((start + n).astype("datetime64[D]") - start.astype("datetime64[D]")).astype("int64")
+
+
+def period_means(daily: pd.DataFrame, min_coverage: dict = MIN_COVERAGE,
+                 site_cols: tuple = ("region", "site_name", "lawa_site_id", "indicator"),
+                 value: str = "value_ugm3", date: str = "sample_date") -> tuple:
+    """
+    Monthly, seasonal (DJF/MAM/JJA/SON; December counts towards the next year's DJF)
+    and annual means per site series, from one grouped pass over the daily rows
+    (site-month sums/counts), rolled up to seasons and years.
+    Returns (site, region, matrix):
+      site    long: site cols, freq, period, mean_ugm3, days_measured, days_in_period,
+              coverage, valid (coverage >= min_coverage[freq])
+      region  coverage-weighted mean of valid site means per region/indicator/period
+      matrix  site × period table of valid means (columns: months, then seasons, then years)
+    """
+    site_cols = list(site_cols)
+    d = daily[date]
+    ym = (d.dt.year * 12 + d.dt.month - 1).rename("_ym")
+    m = (daily.groupby(site_cols + [ym], observed=True)[value]
+              .agg(["sum", "count"]).reset_index())
+    m["_ym"] = m["_ym"].astype("int64")
+    ymv = m["_ym"].to_numpy()
+
+    season = SEASON_OF_MONTH[ymv % 12]
+    s_year = (ymv + 1) // 12                                   # Dec -> next year's DJF
+    s_start = s_year * 12 + pd.Series(season).map(SEASON_START).to_numpy()
+    levels = {
+        "month": (ymv, [f"{y}-{mo:02d}" for y, mo in zip(ymv // 12, ymv % 12 + 1)], _month_days(ymv)),
+        "season": (s_start, [f"{y}-{se}" for y, se in zip(s_year, season)], _month_days(s_start, 3)),
+        "year": (ymv // 12 * 12, [str(y) for y in ymv // 12], _month_days(ymv // 12 * 12, 12)),
+    }
+
+    parts = []
+    for freq, (key, label, ndays) in levels.items():
+        p = (m[site_cols + ["sum", "count"]]
+             .assign(_key=key, period=label, days_in_period=ndays)
+             .groupby(site_cols + ["_key", "period", "days_in_period"], as_index=False, observed=True)
+             [["sum", "count"]].sum())
+        p["freq"] = freq
+        parts.append(p)
+    site = pd.concat(parts, ignore_index=True)
+    site["mean_ugm3"] = site["sum"] / site["count"]
+    site["days_measured"] = site["count"].astype("int64")
+    site["coverage"] = (site["days_measured"] / site["days_in_period"]).clip(upper=1.0)
+    site["valid"] = site["coverage"] >= site["freq"].map(min_coverage).astype("float64")
+    order = {"month": 0, "season": 1, "year": 2}
+    site = (site.assign(_f=site["freq"].map(order))
+                .sort_values(site_cols + ["_f", "_key"])
+                .drop(columns=["sum", "count", "_f"]))
+
+    v = site[site["valid"]]
+    w = v.assign(_wm=v["mean_ugm3"] * v["coverage"])
+    region = (w.groupby(["region", "indicator", "freq", "_key", "period"], as_index=False, observed=True)
+                .agg(_wm=("_wm", "sum"), _w=("coverage", "sum"),
+                     n_sites=("lawa_site_id", "nunique"), mean_coverage=("coverage", "mean")))
+    region["mean_ugm3"] = region["_wm"] / region["_w"]
+    region = (region.assign(_f=region["freq"].map(order))
+                    .sort_values(["region", "indicator", "_f", "_key"])
+                    [["region", "indicator", "freq", "period", "mean_ugm3", "n_sites", "mean_coverage"]]
+                    .reset_index(drop=True))
+
+    cols = v.assign(_f=v["freq"].map(order)).sort_values(["_f", "_key"])["period"].unique()
+    matrix = (v.pivot_table(index=site_cols, columns="period", values="mean_ugm3", observed=True)
+               .reindex(columns=cols).reset_index())
+    matrix.columns.name = None
+    site = site[site_cols + ["freq", "period", "mean_ugm3", "days_measured", "days_in_period",
+                             "coverage", "valid"]].reset_index(drop=True)
+    return site, region, matrix
@@ -0,0 +1,160 @@
+# scripts/assoc_stats.py
+# Association between a region-level exposure (PM, night-lights) and an outcome
+# (obesity rate) with only a handful of regions: cluster bootstrap CIs and
+# permutation p-values, evaluated for every resample at once.
+#
+#   from assoc_stats import association
+#   res = association(df, x="pm25_ugm3", y="obesity_rate", cluster="health_region_code",
+#                     control="nzdep_9_10_share", n_boot=100_000, n_perm=100_000)
+#   res["r"]   # {"estimate", "ci_low", "ci_high", "p_perm", ...}
+#
+# Statistics (weighted, so one formula serves the observed data and every resample):
+#   r          Pearson correlation
+#   slope      OLS slope of y on x
+#   partial_r  correlation of x and y after regressing both on `control` (NZDep)
+#
+# Bootstrap: whole clusters (regions) are drawn with replacement; a resample is a
+# row of cluster counts, broadcast to rows as weights, so a (n_boot, n_rows) weight
+# matrix gives every resample's statistics in a few array reductions. Permutation:
+# the exposure is shuffled between clusters (it is constant within a region), one
+# permutation per row of a (n_perm, n_clusters) index matrix. When the number of
+# distinct resamples / permutations is no larger than asked for (4 regions: 256
+# bootstrap draws, 24 permutations) they are enumerated and the results are exact.
+# Resamples whose statistic is undefined (all mass on one region) are ignored and
+# counted in boot_valid.
+
+import itertools
+import math
+
+import numpy as np
+import pandas as pd
+
+STATS = ["r", "slope", "partial_r"]
+BLOCK = 20_000                       # resamples evaluated per array pass
+
+
+def _stats(x: np.ndarray, y: np.ndarray, w: np.ndarray, z: np.ndarray | None) -> dict:
+    """Weighted r / slope / partial_r along the last axis; x, y, z, w broadcast to (B, n)."""
+    sw = w.sum(axis=-1, keepdims=True)
+
+    def centre(v):
+        return v - (w * v).sum(axis=-1, keepdims=True) / sw
+
+    def ss(a, b):
+        return (w * a * b).sum(axis=-1)
+
+    # sums of squares this small relative to the data are rounding noise (a resample
+    # that puts all its weight on too few regions) and make the statistic undefined
+    tiny = 1e-9 * np.var(x) * x.shape[-1]
+    dx, dy = centre(x), centre(y)
+    sxx, syy, sxy = ss(dx, dx), ss(dy, dy), ss(dx, dy)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        out = {"r": np.where(sxx > tiny, sxy / np.sqrt(sxx * syy), np.nan),
+               "slope": np.where(sxx > tiny, sxy / sxx, np.nan)}
+        if z is not None:
+            dz = centre(z)
+            szz = ss(dz, dz)[..., None]
+            rx = dx - ss(dx, dz)[..., None] / szz * dz
+            ry = dy - ss(dy, dz)[..., None] / szz * dz
+            rxx = ss(rx, rx)
+            out["partial_r"] = np.where(rxx > tiny, ss(rx, ry) / np.sqrt(rxx * ss(ry, ry)), np.nan)
+    return out
+
+
+def bootstrap_counts(n_clusters: int, n_boot: int, rng: np.random.Generator) -> tuple:
+    """(counts[B, G], exact): how often each cluster is drawn in each resample."""
+    G = n_clusters
+    if G ** G <= n_boot:
+        draws = np.array(list(itertools.product(range(G), repeat=G)), dtype="int64")
+        exact = True
+    else:
+        draws = rng.integers(0, G, size=(n_boot, G))
+        exact = False
+    B = len(draws)
+    flat = (draws + G * np.arange(B)[:, None]).ravel()
+    return np.bincount(flat, minlength=B * G).reshape(B, G).astype("float64"), exact
+
+
+def permutations(n_clusters: int, n_perm: int, rng: np.random.Generator) -> tuple:
+    """(index[P, G], exact): cluster permutations, all of them if there are few enough."""
+    G = n_clusters
+    if math.factorial(G) <= n_perm:
+        return np.array(list(itertools.permutations(range(G))), dtype="int64"), True
+    return rng.permuted(np.tile(np.arange(G), (n_perm, 1)), axis=1), False
+
+
+def association(df: pd.DataFrame, x: str, y: str, cluster: str, control: str | None = None,
+                n_boot: int = 10_000, n_perm: int = 10_000, ci: float = 0.95,
+                seed: int = 42) -> dict:
+    """Per statistic: estimate, ci_low, ci_high, p_perm, boot_valid (+ run metadata)."""
+    cols = [x, y, cluster] + ([control] if control else [])
+    d = df[cols].dropna()
+    cl_codes, cl_uniq = pd.factorize(d[cluster])
+    G = len(cl_uniq)
+    xv, yv = d[x].to_numpy("float64"), d[y].to_numpy("float64")
+    zv = d[control].to_numpy("float64") if control else None
+    x_cl = pd.Series(xv).groupby(cl_codes).agg(["min", "max"])
+    if not np.allclose(x_cl["min"], x_cl["max"]):
+        raise ValueError(f"{x} must be constant within each {cluster} (a cluster-level exposure)")
+    x_cl = x_cl["min"].to_numpy()
+
+    meta = {"n_obs": len(d), "n_clusters": G}
+    stats = STATS if control else STATS[:2]
+    if G < 3:
+        return {s: {**meta, "estimate": np.nan} for s in stats}
+    rng = np.random.default_rng(seed)
+    obs = _stats(xv, yv, np.ones_like(xv), zv)
+
+    counts, boot_exact = bootstrap_counts(G, n_boot, rng)
+    boot = {s: [] for s in stats}
+    for i in range(0, len(counts), BLOCK):
+        r = _stats(xv, yv, counts[i:i + BLOCK][:, cl_codes], zv)
+        for s in stats:
+            boot[s].append(r[s])
+
+    perm, perm_exact = permutations(G, n_perm, rng)
+    ge = {s: 0 for s in stats}
+    n_valid = {s: 0 for s in stats}
+    for i in range(0, len(perm), BLOCK):
+        xp = x_cl[perm[i:i + BLOCK]][:, cl_codes]              # exposure shuffled between clusters
+        r = _stats(xp, yv, np.ones_like(xv), zv)
+        for s in stats:
+            v = r[s][~np.isnan(r[s])]
+            ge[s] += int((np.abs(v) >= np.abs(obs[s]) - 1e-12).sum())
+            n_valid[s] += len(v)
+
+    a = (1 - ci) / 2
+    out = {}
+    for s in stats:
+        b = np.concatenate(boot[s])
+        ok = ~np.isnan(b)
+        lo, hi = np.quantile(b[ok], [a, 1 - a]) if ok.any() else (np.nan, np.nan)
+        if perm_exact:
+            p = ge[s] / n_valid[s] if n_valid[s] else np.nan
+        else:
+            p = (ge[s] + 1) / (n_valid[s] + 1)
+        out[s] = {**meta, "estimate": float(obs[s]), "ci_low": float(lo), "ci_high": float(hi),
+                  "p_perm": float(p), "n_boot": len(b), "boot_valid": float(ok.mean()),
+                  "boot_exact": boot_exact, "n_perm": len(perm), "perm_exact": perm_exact}
+    return out
+
+
+def association_table(df: pd.DataFrame, exposures: list, outcome: str, by: str, cluster: str,
+                      control: str | None = None, pooled: str | None = "All", **kw) -> pd.DataFrame:
+    """
+    association() for every `by` group × exposure (plus all groups pooled as `pooled`,
+    where clusters hold several rows), as long rows: by, exposure, outcome, stat, ...
+    """
+    groups = [(g, sub) for g, sub in df.groupby(by, observed=True, sort=True)]
+    if pooled:
+        groups.append((pooled, df))
+    rows = []
+    for g, sub in groups:
+        for x in exposures:
+            if x not in sub.columns or sub[x].isna().all():
+                continue
+            res = association(sub, x, outcome, cluster, control, **kw)
+            for stat, r in res.items():
+                rows.append({by: g, "exposure": x, "outcome": outcome, "stat": stat,
+                             "control": control if stat == "partial_r" else None, **r})
+    return pd.DataFrame(rows)
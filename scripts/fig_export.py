@@ -0,0 +1,143 @@
+# scripts/fig_export.py
+# Batch static export of plotly figures through a pool of warm kaleido renderers.
+#
+#   from fig_export import export_images
+#   export_images([
+#       (fig_all, "data_proc/air_obesity_dep_scatter_2023.png", 1400, 900, 2),
+#       (fig_fac, "data_proc/air_obesity_dep_facets_by_ethnicity_2023.png", 1600, 1100, 2),
+#   ])
+#
+# kaleido renders in its own headless-browser subprocess, so the pool is a set of
+# threads that each own one warm kaleido scope (started with a throwaway render) and
+# reuse it for every job. A batch pays the browser start-up once per worker instead
+# of once per figure, and no extra Python processes are spawned (the numbered
+# scripts have no __main__ guard). Outputs whose figure spec + size are unchanged
+# since the last export are skipped (hashes in <out dir>/.figcache.json).
+
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import BrokenExecutor, ThreadPoolExecutor
+from pathlib import Path
+
+import plotly.io as pio
+from kaleido.scopes.plotly import PlotlyScope
+
+CACHE_NAME = ".figcache.json"
+
+_local = threading.local()
+_POOL = None
+_POOL_SIZE = 0
+_POOL_BROKEN = False          # set when a worker failed to start (e.g. kaleido couldn't launch)
+
+
+class ExportError(RuntimeError):
+    """Raised by export_images when any figure in the batch failed to render."""
+
+
+# ---------- renderer side ----------
+def _scope() -> PlotlyScope:
+    if not hasattr(_local, "scope"):
+        # same plotly.js / MathJax bundles plotly.io configures for its own scope
+        ref = pio.kaleido.scope
+        _local.scope = PlotlyScope(plotlyjs=ref.plotlyjs, mathjax=ref.mathjax)
+    return _local.scope
+
+
+def _warm():
+    _scope().transform({"data": [{"type": "scatter", "x": [0], "y": [0]}], "layout": {}},
+                       format="png", width=10, height=10)
+
+
+def _render(spec: str, path: str, width: int, height: int, scale: float) -> float:
+    t0 = time.perf_counter()
+    fmt = Path(path).suffix.lstrip(".").lower() or "png"
+    img = _scope().transform(json.loads(spec), format=fmt, width=width, height=height, scale=scale)
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    Path(path).write_bytes(img)
+    return time.perf_counter() - t0
+
+
+# ---------- caller side ----------
+def _pool(n: int) -> ThreadPoolExecutor:
+    """One pool per process, reused across calls; grown if a bigger batch comes along."""
+    global _POOL, _POOL_SIZE, _POOL_BROKEN
+    if _POOL is None or n > _POOL_SIZE or _POOL_BROKEN:
+        if _POOL is not None:
+            _POOL.shutdown()
+        _POOL = ThreadPoolExecutor(max_workers=n, initializer=_warm, thread_name_prefix="kaleido")
+        _POOL_SIZE, _POOL_BROKEN = n, False
+    return _POOL
+
+
+def spec_hash(spec: str, width: int, height: int, scale: float) -> str:
+    h = hashlib.sha256(spec.encode("utf-8"))
+    h.update(f"|{width}x{height}@{scale}".encode())
+    return h.hexdigest()[:16]
+
+
+def _load_cache(d: Path) -> dict:
+    p = d / CACHE_NAME
+    return json.loads(p.read_text()) if p.exists() else {}
+
+
+def export_images(jobs, workers: int | None = None, force: bool = False) -> list:
+    """
+    jobs: iterable of (fig, path, width, height, scale).
+    Returns one dict per job: path, status ('rendered' | 'cached'), seconds, error.
+    Every job is attempted; if any failed, ExportError is raised after the rest are saved.
+    """
+    global _POOL_BROKEN
+    todo, results, caches = [], [], {}
+    for fig, path, width, height, scale in jobs:
+        path = Path(path)
+        spec = pio.to_json(fig, validate=False)
+        key = spec_hash(spec, width, height, scale)
+        cache = caches.setdefault(path.parent, _load_cache(path.parent))
+        rec = {"path": path.as_posix(), "hash": key, "seconds": 0.0, "error": None}
+        if not force and path.exists() and cache.get(path.name) == key:
+            rec["status"] = "cached"
+        else:
+            rec["status"] = "pending"
+            todo.append((rec, (spec, path.as_posix(), width, height, scale)))
+        results.append(rec)
+
+    if todo:
+        n = max(1, min(len(todo), workers or os.cpu_count() or 1, 8))
+        t0 = time.perf_counter()
+        pool = _pool(n)
+        futs = [(rec, pool.submit(_render, *args)) for rec, args in todo]
+        for rec, fut in futs:
+            try:
+                rec["seconds"] = fut.result()
+                rec["status"] = "rendered"
+                caches[Path(rec["path"]).parent][Path(rec["path"]).name] = rec["hash"]
+            except BrokenExecutor as e:                        # worker start-up failed: new pool next call
+                _POOL_BROKEN = True
+                rec["status"], rec["error"] = "failed", str(e)
+            except Exception as e:   # one bad figure shouldn't sink the rest of the batch
+                rec["status"], rec["error"] = "failed", str(e)
+        wall = time.perf_counter() - t0
+    else:
+        wall = 0.0
+
+    for d, cache in caches.items():
+        if d.exists():
+            (d / CACHE_NAME).write_text(json.dumps(cache, indent=2, sort_keys=True))
+
+    for rec in results:
+        if rec["status"] == "rendered":
+            print(f"🖼️ {rec['path']}  ({rec['seconds']:.1f}s)")
+        elif rec["status"] == "cached":
+            print(f"✔️ {rec['path']}  (unchanged, skipped)")
+        else:
+            print(f"⚠️ {rec['path']}  failed: {rec['error']}")
+    if todo:
+        busy = sum(r["seconds"] for r in results)
+        print(f"   exported {len(todo)} figure(s) in {wall:.1f}s wall / {busy:.1f}s render time")
+    failed = [r["path"] for r in results if r["status"] == "failed"]
+    if failed:
+        raise ExportError(f"{len(failed)} of {len(results)} figure(s) failed to export: {failed}")
+    return results
@@ -0,0 +1,159 @@
+# scripts/geo_assign.py
+# Put lon/lat points into every registered geography at once (TA, regional council,
+# health region, ...), vectorised for millions of points.
+#
+#   from geo_assign import assign
+#   zones = assign(df["lon"], df["lat"])        # ta_code, ta_name, regional_council_code, ..., health_region
+#   df = df.join(zones)
+#
+# Each polygon layer is burned once into a zone-label raster (cached under
+# data_proc/cache/geo_labels, keyed by the boundary file's fingerprint). A point is
+# looked up by array indexing; only points in cells a boundary passes through are
+# resolved exactly against the polygons with a shapely STRtree, so results match a
+# point-in-polygon test while the bulk of points never touch geometry.
+# Longitudes are handled on 0–360° so the Chatham Islands sit next to the mainland.
+
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import shapely
+from rasterio.features import rasterize
+from rasterio.transform import from_origin
+from shapely.geometry import shape
+
+from lawa_io import CACHE_DIR, fingerprint
+from geo_registry import GEOGRAPHIES, TA_HR_LUT
+
+LABEL_DIR = CACHE_DIR / "geo_labels"
+RES_DEG = 0.005                     # ~450 m × 550 m cells over NZ
+
+# lookup layers: name -> (polygon layer joined on its zone name, LUT csv, LUT key, LUT value)
+DERIVED = {
+    "health_region": ("ta", TA_HR_LUT, "ta_name", "health_region"),
+}
+
+_ZONES = {}                          # name -> loaded Zones (per process)
+
+
+def _lon360(xy: np.ndarray) -> np.ndarray:
+    return np.column_stack([np.mod(xy[:, 0], 360), xy[:, 1]])
+
+
+class Zones:
+    """One polygon layer: label raster + boundary cells + lazily built STRtree."""
+
+    def __init__(self, name: str, res: float = RES_DEG):
+        path, code_prop, name_prop = GEOGRAPHIES[name]
+        with open(path) as f:
+            feats = json.load(f)["features"]
+        self.name = name
+        self.geoms = shapely.transform([shape(ft["geometry"]) for ft in feats], _lon360)
+        self.codes = np.array([str(ft["properties"][code_prop]).zfill(3 if name == "ta" else 2)
+                               for ft in feats], dtype=object)
+        self.names = np.array([str(ft["properties"].get(name_prop, "")).strip() for ft in feats],
+                              dtype=object)
+        self._tree = None
+
+        cache = LABEL_DIR / f"{name}_{res:g}_{fingerprint(Path(path))}.npz"
+        if cache.exists():
+            z = np.load(cache)
+            self.labels, self.edge, (self.x0, self.y0, self.res) = z["labels"], z["edge"], z["origin"]
+        else:
+            self._burn(res)
+            LABEL_DIR.mkdir(parents=True, exist_ok=True)
+            np.savez_compressed(cache, labels=self.labels, edge=self.edge,
+                                origin=np.array([self.x0, self.y0, self.res]))
+
+    def _burn(self, res: float) -> None:
+        minx, miny, maxx, maxy = shapely.total_bounds(self.geoms)
+        self.x0, self.y0, self.res = float(np.floor(minx / res) * res), float(np.ceil(maxy / res) * res), res
+        shape_ = (int(np.ceil((self.y0 - miny) / res)), int(np.ceil((maxx - self.x0) / res)))
+        transform = from_origin(self.x0, self.y0, res, res)
+        self.labels = rasterize(((g, i + 1) for i, g in enumerate(self.geoms)), out_shape=shape_,
+                                transform=transform, fill=0, dtype="int32")
+        self.edge = rasterize(((b, 1) for b in shapely.boundary(self.geoms)), out_shape=shape_,
+                              transform=transform, fill=0, all_touched=True, dtype="uint8").astype(bool)
+
+    @property
+    def tree(self) -> shapely.STRtree:
+        if self._tree is None:
+            self._tree = shapely.STRtree(self.geoms)
+        return self._tree
+
+    def lookup(self, lon: np.ndarray, lat: np.ndarray) -> np.ndarray:
+        """Polygon index per point (-1 outside every polygon)."""
+        x = np.mod(lon, 360)
+        col = np.floor((x - self.x0) / self.res).astype("int64")
+        row = np.floor((self.y0 - lat) / self.res).astype("int64")
+        h, w = self.labels.shape
+        inside = (row >= 0) & (row < h) & (col >= 0) & (col < w) & np.isfinite(x) & np.isfinite(lat)
+
+        idx = np.full(len(x), -1, dtype="int64")
+        r, c = row[inside], col[inside]
+        idx[inside] = self.labels[r, c] - 1
+
+        exact = np.flatnonzero(inside)[self.edge[r, c]]
+        if len(exact):
+            idx[exact] = -1
+            pts = shapely.points(x[exact], lat[exact])
+            hit_pt, hit_geom = self.tree.query(pts, predicate="intersects")
+            first = np.unique(hit_pt, return_index=True)[1]          # shared edge -> first polygon
+            idx[exact[hit_pt[first]]] = hit_geom[first]
+        return idx
+
+
+def _take(values: np.ndarray, idx: np.ndarray) -> pd.Categorical:
+    """values[idx] as a categorical (missing where idx < 0 or the value is NaN)."""
+    cats, inv = np.unique(pd.Series(values).fillna("").astype(str).to_numpy(), return_inverse=True)
+    empty = np.flatnonzero(cats == "")
+    codes = np.where(idx >= 0, inv[np.maximum(idx, 0)], -1)
+    if len(empty):
+        codes[codes == empty[0]] = -1
+    return pd.Categorical.from_codes(codes, categories=cats)
+
+
+def zones(name: str) -> Zones:
+    if name not in _ZONES:
+        _ZONES[name] = Zones(name)
+    return _ZONES[name]
+
+
+def available() -> list:
+    """Registered polygon layers whose boundary file is on disk."""
+    return [g for g, (path, *_) in GEOGRAPHIES.items() if Path(path).exists()]
+
+
+def assign(lon, lat, geographies: list | None = None) -> pd.DataFrame:
+    """
+    Zone codes/names for each point in every requested geography (default: all
+    available), index-aligned with `lon` when it is a Series. Empty where a
+    point falls outside a layer.
+    """
+    index = lon.index if isinstance(lon, pd.Series) else None
+    lon = np.asarray(lon, dtype="float64")
+    lat = np.asarray(lat, dtype="float64")
+    wanted = geographies or available() + list(DERIVED)
+
+    out = {}
+    need = set(wanted) | {DERIVED[d][0] for d in wanted if d in DERIVED}
+    for g in [g for g in GEOGRAPHIES if g in need]:
+        if not Path(GEOGRAPHIES[g][0]).exists():
+            print(f"ℹ️ No boundaries for {g} ({GEOGRAPHIES[g][0]}); skipped")
+            continue
+        z = zones(g)
+        idx = z.lookup(lon, lat)
+        for col, vals in ((f"{g}_code", z.codes), (f"{g}_name", z.names)):
+            out[col] = _take(vals, idx)
+
+    for d in [d for d in wanted if d in DERIVED]:
+        base, lut_path, key, value = DERIVED[d]
+        if f"{base}_name" in out:
+            lut = pd.read_csv(lut_path)
+            names = out[f"{base}_name"]
+            mapped = pd.Series(names.categories).str.strip().map(dict(zip(lut[key].str.strip(), lut[value])))
+            out[d] = _take(mapped.to_numpy(dtype=object), names.codes)
+
+    keep = [c for c in out if c in wanted or c.rsplit("_", 1)[0] in wanted]
+    return pd.DataFrame({c: out[c] for c in keep}, index=index)
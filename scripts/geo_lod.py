@@ -0,0 +1,112 @@
+# scripts/geo_lod.py
+# Pick the right level of detail from the boundary pyramid built by
+# scripts/16_build_geometry_lod.py, so map builders only ship the geometry
+# the current zoom can actually show.
+#
+#   from geo_lod import load_layer
+#   gj = load_layer("ta", zoom=4.9)                     # whole of NZ
+#   gj = load_layer("ta", zoom=10, center=(-36.85, 174.76))  # Auckland only
+
+import json
+import math
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+LOD_DIR = ROOT / "data_raw" / "geometry_lod"
+
+# What to use when the pyramid hasn't been built yet (the original 5% mapshaper file)
+FALLBACK = {
+    "ta": ROOT / "data_raw" / "ta2025_ms_5pct.geojson",
+}
+
+# Mapbox GL / plotly mapbox use 512px tiles -> metres per pixel at zoom 0 on the equator
+M_PER_PX_Z0 = 78271.517
+NZ_CENTER = (-41.3, 174.7)   # (lat, lon)
+
+
+def manifest_path(layer: str) -> Path:
+    return LOD_DIR / f"{layer}_lod.json"
+
+
+def load_manifest(layer: str) -> dict | None:
+    p = manifest_path(layer)
+    if not p.exists():
+        return None
+    with open(p) as f:
+        return json.load(f)
+
+
+def metres_per_pixel(zoom: float, lat: float = NZ_CENTER[0]) -> float:
+    return M_PER_PX_Z0 * math.cos(math.radians(lat)) / 2 ** zoom
+
+
+def pick_level(layer: str, zoom: float, lat: float = NZ_CENTER[0],
+               px_tolerance: float = 1.0, scale: float = 1.0) -> dict | None:
+    """
+    Return the manifest entry with the fewest bytes whose simplification
+    interval is still below `px_tolerance` screen pixels at this zoom.
+    `scale` is the export scale (e.g. 2 for a retina PNG). None if no pyramid.
+    """
+    man = load_manifest(layer)
+    if not man:
+        return None
+    allowed_m = metres_per_pixel(zoom, lat) * px_tolerance / scale
+    levels = man["levels"]
+    ok = [lv for lv in levels if lv["interval_m"] <= allowed_m]
+    if not ok:
+        # zoomed in past the finest level -> finest is the best we have
+        return min(levels, key=lambda lv: lv["interval_m"])
+    return min(ok, key=lambda lv: lv["bytes"])
+
+
+def view_bbox(center: tuple, zoom: float, width_px: int = 1200, height_px: int = 700) -> tuple:
+    """Approximate (min_lon, min_lat, max_lon, max_lat) visible for a mapbox view."""
+    lat, lon = center
+    half_w_m = metres_per_pixel(zoom, lat) * width_px / 2
+    half_h_m = metres_per_pixel(zoom, lat) * height_px / 2
+    dlat = half_h_m / 111_320
+    dlon = half_w_m / (111_320 * max(math.cos(math.radians(lat)), 1e-6))
+    return (lon - dlon, lat - dlat, lon + dlon, lat + dlat)
+
+
+def _feature_bbox(geom: dict) -> tuple:
+    xs, ys = [], []
+
+    def _walk(c):
+        if c and isinstance(c[0], (float, int)):
+            xs.append(c[0]); ys.append(c[1])
+        else:
+            for q in c:
+                _walk(q)
+
+    _walk(geom["coordinates"])
+    return (min(xs), min(ys), max(xs), max(ys)) if xs else None
+
+
+def clip_to_bbox(gj: dict, bbox: tuple) -> dict:
+    """Drop features whose bbox doesn't touch `bbox` (no geometry is cut)."""
+    x0, y0, x1, y1 = bbox
+    keep = []
+    for feat in gj["features"]:
+        fb = feat.get("bbox") or (_feature_bbox(feat["geometry"]) if feat.get("geometry") else None)
+        if fb and fb[0] <= x1 and fb[2] >= x0 and fb[1] <= y1 and fb[3] >= y0:
+            keep.append(feat)
+    return {**gj, "features": keep}
+
+
+def load_layer(layer: str, zoom: float, center: tuple | None = None,
+               px_tolerance: float = 1.0, scale: float = 1.0,
+               width_px: int = 1200, height_px: int = 700) -> dict:
+    """
+    Load the smallest GeoJSON level that is good enough for `zoom`.
+    If `center` is given and the view doesn't cover the whole country,
+    features outside the visible extent are dropped too.
+    """
+    lat = center[0] if center else NZ_CENTER[0]
+    lv = pick_level(layer, zoom, lat=lat, px_tolerance=px_tolerance, scale=scale)
+    path = LOD_DIR / lv["file"] if lv else FALLBACK[layer]
+    with open(path) as f:
+        gj = json.load(f)
+    if center is not None:
+        gj = clip_to_bbox(gj, view_bbox(center, zoom, width_px, height_px))
+    return gj
@@ -0,0 +1,191 @@
+# scripts/geo_registry.py
+# One place that knows what every region label in our sources means. Health NZ
+# regions, regional councils and TAs each get a canonical name and a stable integer
+# code, and every spelling we have met ("Northern | Te Tai Tokerau", "Taitokerau",
+# "Manawatu-Wanganui Region", ...) resolves to it.
+#
+#   from geo_registry import encode
+#   df = encode(df, "health_region")            # canonical categorical + health_region_code
+#   m = a.merge(b, on="health_region_code")     # integer join, no string cleaning
+#
+# Labels are resolved once per distinct value (a few dozen), not per row: an exact
+# lookup on a normalised key (case, macrons, punctuation, a trailing "Region"), then
+# one compiled whole-word alias regex. Values that resolve to nothing, or to two
+# different zones, are reported rather than silently dropped from a join.
+#
+# Codes: health regions 1–4 (0 = New Zealand total), regional councils and TAs use
+# the Stats NZ 2025 codes.
+
+import json
+import re
+import unicodedata
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+TA_GEOJSON = ROOT / "data_raw" / "ta2025_ms_5pct.geojson"
+TA_HR_LUT = ROOT / "data_raw" / "ta_to_health_region.csv"
+CODE_PROP, NAME_PROP = "TA2025_V1_", "TA2025_V_2"
+# polygon layers: name -> (boundary file, code property, name property)
+# (field names follow the 10-character shapefile truncation of the mapshaper exports)
+GEOGRAPHIES = {
+    "ta": (TA_GEOJSON, CODE_PROP, NAME_PROP),
+    "regional_council": (ROOT / "data_raw" / "rc2025_ms_5pct.geojson", "REGC2025_V", "REGC2025_1"),
+}
+
+# level -> code -> (canonical name, aliases matched as whole words, aliases matched exactly)
+REGISTRY = {
+    "health_region": {
+        0: ("New Zealand", [], ["all", "new zealand", "nz", "total", "national"]),
+        1: ("Te Tai Tokerau", ["te tai tokerau", "tai tokerau", "taitokerau", "northern"], []),
+        2: ("Te Manawa Taki", ["te manawa taki", "manawa taki", "midland"], []),
+        3: ("Te Ikaroa", ["te ikaroa", "ikaroa", "central"], []),
+        4: ("Te Waipounamu", ["te waipounamu", "waipounamu", "southern", "south island"], []),
+    },
+    "regional_council": {
+        1:  ("Northland", ["northland"], []),
+        2:  ("Auckland", ["auckland"], []),
+        3:  ("Waikato", ["waikato"], []),
+        4:  ("Bay of Plenty", ["bay of plenty"], []),
+        5:  ("Gisborne", ["gisborne", "tairawhiti"], []),
+        6:  ("Hawke's Bay", ["hawke s bay", "hawkes bay"], []),
+        7:  ("Taranaki", ["taranaki"], []),
+        8:  ("Manawatū-Whanganui", ["manawatu whanganui", "manawatu wanganui", "horizons"], []),
+        9:  ("Wellington", ["wellington", "greater wellington"], []),
+        12: ("West Coast", ["west coast"], []),
+        13: ("Canterbury", ["canterbury", "environment canterbury"], []),
+        14: ("Otago", ["otago"], []),
+        15: ("Southland", ["southland", "environment southland"], []),
+        16: ("Tasman", ["tasman"], []),
+        17: ("Nelson", ["nelson"], []),
+        18: ("Marlborough", ["marlborough"], []),
+        99: ("Area Outside Region", [], ["area outside region"]),
+    },
+}
+_TA_SUFFIX = re.compile(r" (district|city)$")
+_RESOLVERS = {}
+
+
+def load_ta(path: Path = TA_GEOJSON) -> tuple:
+    """(features, {ta_code_str: ta_name})"""
+    with open(path) as f:
+        gj = json.load(f)
+    code_to_name = {
+        str(f["properties"][CODE_PROP]).zfill(3): f["properties"].get(NAME_PROP, "")
+        for f in gj["features"]
+    }
+    return gj["features"], code_to_name
+
+
+def norm_key(s: str) -> str:
+    """'Manawatū-Whanganui Region ' -> 'manawatu whanganui'."""
+    s = unicodedata.normalize("NFKD", str(s))
+    s = "".join(ch for ch in s if not unicodedata.combining(ch)).casefold()
+    s = re.sub(r"[^a-z0-9]+", " ", s).strip()
+    return re.sub(r" region$", "", s)
+
+
+def _ta_entries() -> dict:
+    _, code_to_name = load_ta()
+    out = {}
+    for code, name in code_to_name.items():
+        k = norm_key(name)
+        out[int(code)] = (name.strip(), [], [k, _TA_SUFFIX.sub("", k)])
+    return out
+
+
+def entries(level: str) -> dict:
+    if level == "ta":
+        return _ta_entries()
+    if level not in REGISTRY:
+        raise KeyError(f"Unknown geography level '{level}'; expected one of {list(REGISTRY) + ['ta']}")
+    return REGISTRY[level]
+
+
+class _Resolver:
+    def __init__(self, level: str):
+        ents = entries(level)
+        self.level = level
+        self.codes = np.array(sorted(ents), dtype="int64")
+        self.dtype = pd.CategoricalDtype([ents[c][0] for c in self.codes])
+        self.exact = {}
+        words = {}
+        for code, (name, search, exact) in ents.items():
+            for a in [norm_key(name), *exact]:
+                self.exact[a] = code
+            for a in search:
+                words[norm_key(a)] = code
+        self.words = words
+        alts = sorted(words, key=len, reverse=True)
+        self.rx = re.compile(r"\b(" + "|".join(map(re.escape, alts)) + r")\b") if alts else None
+
+    def one(self, label) -> int:
+        """Code for a single label; -1 unresolved, -2 ambiguous."""
+        k = norm_key(label)
+        if k in self.exact:
+            return self.exact[k]
+        if k in self.words:
+            return self.words[k]
+        hits = {self.words[m] for m in self.rx.findall(k)} if self.rx else set()
+        return hits.pop() if len(hits) == 1 else (-2 if hits else -1)
+
+
+def resolver(level: str) -> _Resolver:
+    if level not in _RESOLVERS:
+        _RESOLVERS[level] = _Resolver(level)
+    return _RESOLVERS[level]
+
+
+def codes(values, level: str, warn: bool = True) -> np.ndarray:
+    """Integer code per value (-1 where unresolved); resolved once per distinct value."""
+    r = resolver(level)
+    idx, uniq = pd.factorize(pd.Series(values), use_na_sentinel=True)
+    uc = np.array([r.one(u) for u in uniq], dtype="int64")
+    if warn:
+        for bad, what in ((-1, "unknown"), (-2, "ambiguous")):
+            labels = sorted(str(u) for u, c in zip(uniq, uc) if c == bad)
+            if labels:
+                print(f"⚠️ {level}: {what} label(s) {labels} (add to geo_registry.REGISTRY)")
+    return np.append(np.maximum(uc, -1), -1)[idx]          # NaN (idx -1) -> -1
+
+
+def names(code_arr, level: str) -> pd.Categorical:
+    """Canonical names (categorical in code order) for an array of codes."""
+    r = resolver(level)
+    code_arr = np.asarray(code_arr, dtype="int64")
+    pos = np.searchsorted(r.codes, code_arr)
+    ok = (code_arr >= 0) & (pos < len(r.codes)) & (r.codes[np.minimum(pos, len(r.codes) - 1)] == code_arr)
+    return pd.Categorical.from_codes(np.where(ok, pos, -1), dtype=r.dtype)
+
+
+def encode(df: pd.DataFrame, col: str, level: str | None = None, warn: bool = True) -> pd.DataFrame:
+    """
+    Replace `col` with canonical names (categorical with the level's fixed categories,
+    so frames from different sources concat/join cleanly) and add `<level>_code`.
+    """
+    level = level or col
+    c = codes(df[col], level, warn)
+    return df.assign(**{col: names(c, level), f"{level}_code": c})
+
+
+def merge(left: pd.DataFrame, right: pd.DataFrame, level: str, how: str = "left") -> pd.DataFrame:
+    """
+    Join two encode()d frames on `<level>_code` (columns both frames carry, such as
+    the canonical name, are taken from the left). Unresolved rows (-1) never match
+    each other, and left zones with no partner on the right are reported.
+    """
+    key = f"{level}_code"
+    right = right[right[key] >= 0]
+    right = right.drop(columns=[c for c in right.columns if c in left.columns and c != key])
+    lost = np.unique(left.loc[~left[key].isin(right[key]) & (left[key] >= 0), key])
+    if len(lost):
+        print(f"⚠️ {level}: no match for {list(names(lost, level))}")
+    return left.merge(right, on=key, how=how)
+
+
+def table(level: str) -> pd.DataFrame:
+    """code, name for every zone of a level."""
+    r = resolver(level)
+    return pd.DataFrame({f"{level}_code": r.codes, level: pd.Categorical(r.dtype.categories, dtype=r.dtype)})
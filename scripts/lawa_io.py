@@ -0,0 +1,311 @@
+# scripts/lawa_io.py
+# One place to read the LAWA air-quality workbook. The Excel file is parsed once
+# into a typed Parquet cache keyed by a fingerprint of the workbook; every later
+# read (61, 63, 71, the app) is a column-projected Parquet read.
+#
+#   from lawa_io import load_lawa
+#   df = load_lawa()                                    # all columns
+#   df = load_lawa(columns=["region", "indicator", "sample_date", "value_ugm3"])
+#
+#   df = load_lawa(indicators=["PM10", "PM2.5"], start="2023-01-01", end="2024-01-01")
+#
+# Columns (normalised): region, agency, town, site_name, lawa_site_id, site_id,
+# lat, lon, site_type, indicator, sample_date, value_ugm3. Text columns are
+# categoricals, so group with observed=True.
+#
+# The workbook is never loaded whole: stream_lawa() walks the sheet in openpyxl
+# read-only mode, drops rows that fail the indicator filter as it goes, and yields
+# typed DataFrame chunks of at most `chunk_rows` rows; write_parquet() appends them
+# to a ParquetWriter. Peak memory is one chunk, however big the (hourly) export is.
+#
+# Daily store (used by 61): data_proc/lawa_daily/indicator=<ind>/year=<yyyy>/part.parquet.
+# merge_into_store() folds a new (full re-export) download into it, de-duplicating on
+# (lawa_site_id, indicator, sample_date); revised values are appended to
+# lawa_daily/revisions.csv, and partitions whose slice of the download is unchanged
+# since the last ingest are not read or rewritten at all.
+
+import hashlib
+import json
+import re
+import time
+from pathlib import Path
+
+import openpyxl
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+ROOT = Path(__file__).resolve().parents[1]
+LAWA_XLSX = ROOT / "data_raw" / "lawa_air-quality-download-data_2016-2024.xlsx"
+CACHE_DIR = ROOT / "data_proc" / "cache"
+STORE_DIR = ROOT / "data_proc" / "lawa_daily"
+STORE_MANIFEST = STORE_DIR / "_manifest.json"
+REVISIONS_CSV = STORE_DIR / "revisions.csv"
+KEY = ["lawa_site_id", "indicator", "sample_date"]
+
+SCHEMA_VERSION = 2   # bump when normalisation changes so old caches are ignored
+
+# normalised name -> accepted header spellings (lower-case, stripped)
+COLUMN_ALIASES = {
+    "region":       ("region", "regional council", "council"),
+    "agency":       ("agency",),
+    "town":         ("town",),
+    "site_name":    ("site name",),
+    "lawa_site_id": ("lawa site id",),
+    "site_id":      ("site id",),
+    "lat":          ("latitude", "lat"),
+    "lon":          ("longitude", "lon", "long"),
+    "site_type":    ("site type",),
+    "indicator":    ("indicator",),
+    "sample_date":  ("sample date", "sampledate", "date"),
+    "value_ugm3":   ("concentration (ug/m3)", "concentration", "value"),
+}
+CHUNK_ROWS = 200_000
+CATEGORICAL = ["region", "agency", "town", "site_name", "lawa_site_id", "site_id", "site_type", "indicator"]
+SHEET_RE = re.compile(r"(data|monitor|dataset|pm|meas|observ)", re.I)
+
+ARROW_TYPES = {c: pa.dictionary(pa.int32(), pa.string()) for c in CATEGORICAL}
+ARROW_TYPES.update({"lat": pa.float64(), "lon": pa.float64(),
+                    "sample_date": pa.timestamp("us"), "value_ugm3": pa.float64()})
+
+
+def fingerprint(path: Path) -> str:
+    """Cheap but content-aware: size + mtime + hash of the first/last MB."""
+    st = path.stat()
+    h = hashlib.sha256(f"{st.st_size}|{st.st_mtime_ns}|v{SCHEMA_VERSION}".encode())
+    with open(path, "rb") as f:
+        h.update(f.read(1 << 20))
+        if st.st_size > 1 << 20:
+            f.seek(-(1 << 20), 2)
+            h.update(f.read())
+    return h.hexdigest()[:16]
+
+
+def pick_sheet(sheet_names: list) -> str:
+    """The "Monitoring dataset " sheet, else the first data-looking one, else the first."""
+    for rx in (re.compile(r"(monitor|dataset)", re.I), SHEET_RE):
+        pref = [s for s in sheet_names if rx.search(s)]
+        if pref:
+            return pref[0]
+    return sheet_names[0]
+
+
+def column_map(headers) -> dict:
+    """{raw header: normalised name} for every header we recognise."""
+    out = {}
+    for raw in headers:
+        key = str(raw).strip().lower()
+        for norm, aliases in COLUMN_ALIASES.items():
+            if key in aliases and norm not in out.values():
+                out[raw] = norm
+                break
+    missing = {"region", "indicator", "sample_date", "value_ugm3"} - set(out.values())
+    if missing:
+        raise ValueError(f"LAWA workbook is missing columns for: {sorted(missing)} (headers: {list(headers)})")
+    return out
+
+
+def coerce_types(df: pd.DataFrame) -> pd.DataFrame:
+    """Cast a frame with normalised column names to the cache dtypes."""
+    for c in CATEGORICAL:
+        if c in df.columns:
+            df[c] = df[c].astype("string").str.strip().astype("category")
+    if "sample_date" in df.columns:
+        df["sample_date"] = pd.to_datetime(df["sample_date"], errors="coerce")
+    for c in ("value_ugm3", "lat", "lon"):
+        if c in df.columns:
+            df[c] = pd.to_numeric(df[c], errors="coerce").astype("float64")
+    return df
+
+
+def cache_path(path: Path) -> Path:
+    return CACHE_DIR / f"lawa_{fingerprint(path)}.parquet"
+
+
+# ---------- streaming reader ----------
+def stream_lawa(path: Path = LAWA_XLSX, indicators: list | None = None, start=None, end=None,
+                columns: list | None = None, chunk_rows: int = CHUNK_ROWS):
+    """
+    Yield typed, normalised chunks of the workbook without loading the sheet.
+    indicators: keep only these; start/end: keep sample_date in [start, end);
+    columns: normalised names to keep (filter columns are read regardless).
+    """
+    wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        ws = wb[pick_sheet(wb.sheetnames)]
+        rows = ws.iter_rows(values_only=True)
+        header = next(rows)
+        cmap = column_map([h for h in header if h is not None])
+        wanted = set(columns or COLUMN_ALIASES) | {"indicator", "sample_date"}
+        idx = {cmap[h]: i for i, h in enumerate(header) if h in cmap and cmap[h] in wanted}
+        names = list(idx)
+        take = [idx[n] for n in names]
+        i_ind = idx["indicator"]
+        keep_ind = {str(x).strip() for x in indicators} if indicators else None
+        start = pd.Timestamp(start) if start is not None else None
+        end = pd.Timestamp(end) if end is not None else None
+
+        buf = []
+        for row in rows:
+            if keep_ind is not None and (row[i_ind] is None or str(row[i_ind]).strip() not in keep_ind):
+                continue
+            buf.append([row[i] for i in take])
+            if len(buf) >= chunk_rows:
+                yield _typed_chunk(buf, names, start, end, columns)
+                buf = []
+        if buf:
+            yield _typed_chunk(buf, names, start, end, columns)
+    finally:
+        wb.close()
+
+
+def _typed_chunk(buf: list, names: list, start, end, columns: list | None) -> pd.DataFrame:
+    df = coerce_types(pd.DataFrame.from_records(buf, columns=names))
+    if start is not None:
+        df = df[df["sample_date"] >= start]
+    if end is not None:
+        df = df[df["sample_date"] < end]
+    if columns:
+        df = df[[c for c in columns if c in df.columns]]
+    return df.reset_index(drop=True)
+
+
+def write_parquet(chunks, out: Path) -> int:
+    """Append typed chunks to one Parquet file (atomically replaced); returns row count."""
+    out = Path(out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    tmp = out.with_suffix(".tmp")
+    writer, n = None, 0
+    try:
+        for df in chunks:
+            if writer is None:
+                schema = pa.schema([(c, ARROW_TYPES[c]) for c in df.columns])
+                writer = pq.ParquetWriter(tmp, schema)
+            writer.write_table(pa.Table.from_pandas(df, schema=schema, preserve_index=False))
+            n += len(df)
+    finally:
+        if writer is not None:
+            writer.close()
+    if writer is None:
+        raise ValueError(f"No rows to write for {out}")
+    tmp.replace(out)
+    return n
+
+
+# ---------- cache ----------
+def build_cache(path: Path = LAWA_XLSX) -> Path:
+    out = cache_path(path)
+    n = write_parquet(stream_lawa(path), out)
+    # drop caches of older downloads
+    for old in CACHE_DIR.glob("lawa_*.parquet"):
+        if old != out:
+            old.unlink()
+    print(f"✅ Cached {path.name} → {out.relative_to(ROOT)}  rows={n:,}")
+    return out
+
+
+def load_lawa(path: Path = LAWA_XLSX, columns: list | None = None, indicators: list | None = None,
+              start=None, end=None, refresh: bool = False) -> pd.DataFrame:
+    """Filtered, column-projected read of the cache (built on first use)."""
+    path = Path(path)
+    if not path.exists():
+        raise FileNotFoundError(f"Missing LAWA workbook: {path}")
+    cache = cache_path(path)
+    if refresh or not cache.exists():
+        cache = build_cache(path)
+    filters = []
+    if indicators:
+        filters.append(("indicator", "in", list(indicators)))
+    if start is not None:
+        filters.append(("sample_date", ">=", pd.Timestamp(start)))
+    if end is not None:
+        filters.append(("sample_date", "<", pd.Timestamp(end)))
+    df = pd.read_parquet(cache, columns=columns, filters=filters or None)
+    # chunks carry their own dictionaries -> restore sorted, used-only categories
+    for c in df.columns.intersection(CATEGORICAL):
+        cats = df[c].cat.remove_unused_categories().cat.categories
+        df[c] = df[c].cat.set_categories(sorted(cats))
+    return df
+
+
+# ---------- daily store ----------
+def partition_path(indicator: str, year: int) -> Path:
+    return STORE_DIR / f"indicator={indicator}" / f"year={int(year)}" / "part.parquet"
+
+
+def read_store(indicators: list | None = None, years: list | None = None,
+               columns: list | None = None) -> pd.DataFrame:
+    """Daily rows from the partitions matching indicators/years (None = all)."""
+    parts = []
+    for p in sorted(STORE_DIR.glob("indicator=*/year=*/part.parquet")):
+        ind = p.parent.parent.name.split("=", 1)[1]
+        yr = int(p.parent.name.split("=", 1)[1])
+        if (indicators and ind not in indicators) or (years and yr not in years):
+            continue
+        df = pd.read_parquet(p, columns=[c for c in columns if c not in ("indicator", "year")] if columns else None)
+        parts.append(df.assign(indicator=ind, year=yr))
+    if not parts:
+        return pd.DataFrame(columns=(columns or list(COLUMN_ALIASES) + ["year"]))
+    df = pd.concat(parts, ignore_index=True)
+    df = coerce_types(df)
+    return df[columns] if columns else df
+
+
+def _slice_hash(df: pd.DataFrame) -> str:
+    df = df.sort_values(KEY).reset_index(drop=True)
+    return hashlib.sha256(pd.util.hash_pandas_object(df.astype(str), index=False).values.tobytes()).hexdigest()[:16]
+
+
+def merge_into_store(df: pd.DataFrame) -> tuple:
+    """
+    Fold normalised daily rows into the partitioned store.
+    Returns (touched, revisions): touched = distinct (lawa_site_id, indicator, year)
+    with added or revised rows; revisions = rows whose value changed.
+    """
+    df = df.dropna(subset=KEY + ["value_ugm3"])
+    n_in = len(df)
+    df = df.drop_duplicates(KEY, keep="last")
+    if len(df) < n_in:
+        print(f"   dropped {n_in - len(df):,} duplicate rows in the download")
+    df = df.assign(year=df["sample_date"].dt.year)
+
+    man = json.loads(STORE_MANIFEST.read_text()) if STORE_MANIFEST.exists() else {}
+    touched, revisions = [], []
+    for (ind, yr), new in df.groupby(["indicator", "year"], observed=True):
+        name = f"{ind}/{yr}"
+        new = new.drop(columns=["year"]).assign(indicator=str(ind))
+        h = _slice_hash(new)
+        if man.get(name, {}).get("hash") == h:
+            continue
+        path = partition_path(ind, yr)
+        if path.exists():
+            old = pd.read_parquet(path).assign(indicator=str(ind))
+            m = new.merge(old[KEY + ["value_ugm3"]], on=KEY, how="left", suffixes=("", "_old"), indicator=True)
+            added = m["_merge"] == "left_only"
+            revised = (m["_merge"] == "both") & ((m["value_ugm3"] - m["value_ugm3_old"]).abs() > 1e-9)
+            changed = m[added | revised]
+            revisions.append(m.loc[revised, ["region", "site_name"] + KEY + ["value_ugm3_old", "value_ugm3"]])
+            merged = pd.concat([old, new], ignore_index=True).drop_duplicates(KEY, keep="last")
+        else:
+            changed, merged = new, new
+        merged = coerce_types(merged.sort_values(KEY).drop(columns=["indicator"]).reset_index(drop=True))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        merged.to_parquet(path, index=False)
+        man[name] = {"hash": h, "rows": len(merged), "updated": time.strftime("%Y-%m-%d %H:%M:%S")}
+        if len(changed):
+            touched.append(changed[["lawa_site_id"]].drop_duplicates().assign(indicator=str(ind), year=int(yr)))
+        print(f"   {name}: {len(changed):,} new/revised rows → {path.relative_to(ROOT)}")
+
+    STORE_DIR.mkdir(parents=True, exist_ok=True)
+    STORE_MANIFEST.write_text(json.dumps(man, indent=2, sort_keys=True))
+
+    revs = pd.concat(revisions, ignore_index=True) if revisions else pd.DataFrame()
+    if len(revs):
+        revs = revs.rename(columns={"value_ugm3_old": "old_value", "value_ugm3": "new_value"})
+        revs["ingested_at"] = time.strftime("%Y-%m-%d %H:%M:%S")
+        revs.to_csv(REVISIONS_CSV, mode="a", header=not REVISIONS_CSV.exists(), index=False)
+        print(f"⚠️ {len(revs):,} revised values logged → {REVISIONS_CSV.relative_to(ROOT)}")
+    cols = ["lawa_site_id", "indicator", "year"]
+    touched = pd.concat(touched, ignore_index=True) if touched else pd.DataFrame(columns=cols)
+    touched["lawa_site_id"] = touched["lawa_site_id"].astype(str)
+    return touched[cols], revs
@@ -0,0 +1,253 @@
+# scripts/nzhs_io.py
+# Read NZ Health Survey data-explorer exports in bounded memory. The full multi-topic
+# export runs to GBs, so it is never loaded whole:
+#
+#   from nzhs_io import read_nzhs, truthy, year_end
+#   df = read_nzhs(columns=["indicator", "health_region", "year_to", "proportion"],
+#                  where={"indicator": lambda s: s.str.contains("obese", case=False),
+#                         "health_region": lambda s: s.str.strip().ne("All")})
+#
+# read_nzhs() streams the CSV in chunks with a column projection, text columns as
+# categoricals, and applies the `where` predicates to each chunk before it is kept.
+# Predicates (and truthy() / year_end()) run on a column's distinct values only —
+# a few dozen labels — and are broadcast to rows through the category codes, so no
+# per-row Python runs however many rows there are.
+#
+# Indicator store: extract_indicators() scans the export once for every indicator in
+# a declarative table (INDICATORS, or a CSV with key, pattern[, measure]) and returns a
+# tidy long table — indicator × health_region × ethnicity × year_to with CIs, every
+# survey year. write_indicator_store() writes it to
+# data_proc/nzhs_indicators/indicator=<key>/part.parquet; read_indicators() reads
+# only the indicators (and columns) asked for.
+
+import re
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from geo_registry import codes, names
+
+ROOT = Path(__file__).resolve().parents[1]
+NZHS_CSV = ROOT / "data_raw" / "adult_unadjusted_topic_body_size_includes_obesity.csv"
+INDICATOR_DIR = ROOT / "data_proc" / "nzhs_indicators"
+
+CHUNK_ROWS = 500_000
+CATEGORICAL = ["indicator", "topic", "population", "age_standardised", "agegroup", "gender",
+               "health_region", "year", "year_to", "māori", "pacific", "asian", "other_euro",
+               "ethnicity", "nzdep", "disability"]
+NUMERIC = ["proportion", "proportion_low", "proportion_high", "mean", "mean_low", "mean_high",
+           "n", "sample_size"]
+TRUTHY = {"yes", "y", "true", "1", "t"}
+YEAR_RE = re.compile(r"(\d{4}|\d{2})\D*$")
+
+# key -> regex on the export's indicator label (case-insensitive; first match wins)
+INDICATORS = pd.DataFrame(
+    [
+        ("overweight_obese",  r"overw[_ ]?obese|overweight.*obese"),
+        ("obese",             r"^obese"),
+        ("physically_active", r"physically active"),
+        ("sleep",             r"sleep"),
+        ("diabetes",          r"diabetes"),
+    ],
+    columns=["key", "pattern"],
+)
+# prioritised-ethnicity flag column -> label; rows with no flag set are "Total"
+ETHNICITY_FLAGS = {"māori": "Māori", "pacific": "Pacific", "asian": "Asian", "other_euro": "European/Other"}
+
+
+def or_blank(pred):
+    """Filter predicate that also keeps rows where the column is blank (NaN)."""
+    def keep(s):
+        return pred(s)
+    keep.blank = True
+    return keep
+
+
+# the population slice every indicator is extracted for; nzdep/disability breakdown rows
+# would otherwise be read as a region's "Total"
+BASE_FILTER = {
+    "age_standardised": lambda s: s.str.lower().eq("no"),
+    "agegroup":         lambda s: s.str.lower().isin({"all ages", "total"}),
+    "gender":           lambda s: s.str.lower().isin({"all", "both", "male and female", "total"}),
+    "nzdep":            or_blank(lambda s: s.str.strip().str.lower().isin({"all", "total"})),
+    "disability":       or_blank(lambda s: s.str.strip().str.lower().isin({"all", "total"})),
+}
+TIDY_KEY = ["indicator", "health_region", "ethnicity", "year_to"]
+TIDY_COLS = ["indicator", "indicator_label", "health_region", "ethnicity", "year_to", "year_end",
+             "measure", "value", "value_low", "value_high"]
+TIDY_CATEGORICAL = ["indicator", "indicator_label", "health_region", "ethnicity", "year_to", "measure"]
+
+
+def on_values(s: pd.Series, func, na=None) -> np.ndarray:
+    """func(distinct values as a str Series) broadcast back to the rows of `s`; NaN rows get
+    `na` (default False for masks, NaN otherwise)."""
+    if not isinstance(s.dtype, pd.CategoricalDtype):
+        s = s.astype("category")
+    res = np.asarray(func(pd.Series(s.cat.categories.astype(str))))
+    fill = na if na is not None else (False if res.dtype == bool else np.nan)
+    return np.append(res, fill)[s.cat.codes.to_numpy()]       # code -1 (NaN) -> fill
+
+
+def truthy(s: pd.Series) -> np.ndarray:
+    """Row mask: value reads as yes/true/1 (blank and NaN are false)."""
+    return on_values(s, lambda v: v.str.strip().str.lower().isin(TRUTHY).to_numpy())
+
+
+def year_end(s: pd.Series) -> np.ndarray:
+    """Last year of labels like '2023/24', '2021-2023' or 2019, as a float (NaN if none)."""
+    def parse(v):
+        y = v.str.extract(YEAR_RE, expand=False).astype(float).to_numpy()
+        return np.where(y < 100, 2000 + y, y)
+    return on_values(s, parse)
+
+
+def _dtypes(cols: list) -> dict:
+    dt = {c: "category" for c in CATEGORICAL if c in cols}
+    dt.update({c: "float64" for c in NUMERIC if c in cols})
+    return dt
+
+
+def header(path: Path = NZHS_CSV) -> list:
+    return list(pd.read_csv(path, nrows=0, encoding="utf-8").columns)
+
+
+def stream_nzhs(path: Path = NZHS_CSV, columns: list | None = None, where: dict | None = None,
+                chunk_rows: int = CHUNK_ROWS):
+    """Yield filtered, typed chunks. Requested columns missing from the file are reported."""
+    path = Path(path)
+    cols_in_file = header(path)
+    where = where or {}
+    wanted = list(dict.fromkeys((columns or cols_in_file) + list(where)))
+    missing = [c for c in wanted if c not in cols_in_file]
+    if missing:
+        print(f"⚠️ {path.name}: no column(s) {missing}")
+    if any(c in missing for c in where):
+        raise KeyError(f"filter column(s) not in {path.name}: {[c for c in where if c in missing]}")
+    use = [c for c in wanted if c in cols_in_file]
+    proj = [c for c in use if columns is None or c in columns]
+
+    for chunk in pd.read_csv(path, usecols=use, dtype=_dtypes(use), encoding="utf-8",
+                             chunksize=chunk_rows):
+        keep = np.ones(len(chunk), dtype=bool)
+        for col, pred in where.items():
+            keep &= on_values(chunk[col], pred, na=getattr(pred, "blank", None))
+        if keep.any():
+            yield chunk.loc[keep, proj]
+
+
+def read_nzhs(path: Path = NZHS_CSV, columns: list | None = None, where: dict | None = None,
+              chunk_rows: int = CHUNK_ROWS) -> pd.DataFrame:
+    """Filtered rows of an NZHS export; categorical columns keep a merged category set."""
+    parts = list(stream_nzhs(path, columns, where, chunk_rows))
+    if not parts:
+        return pd.DataFrame(columns=[c for c in (columns or header(path)) if c in header(path)])
+    df = pd.concat(parts, ignore_index=True)
+    for c in df.columns:
+        if all(isinstance(p[c].dtype, pd.CategoricalDtype) for p in parts):
+            df[c] = union_categoricals([p[c] for p in parts], ignore_order=True)
+    return df
+
+
+# ---------- indicator store ----------
+def load_indicator_spec(path: Path | None = None) -> pd.DataFrame:
+    """Indicator table from CSV (key, pattern) or the default."""
+    if path is None:
+        return INDICATORS
+    spec = pd.read_csv(path)
+    missing = {"key", "pattern"} - set(spec.columns)
+    if missing:
+        raise ValueError(f"{path}: missing indicator columns {sorted(missing)}")
+    if spec["key"].duplicated().any():
+        raise ValueError(f"{path}: duplicate indicator keys")
+    return spec
+
+
+def _match_keys(labels: pd.Series, spec: pd.DataFrame) -> np.ndarray:
+    keys = np.full(len(labels), np.nan, dtype=object)
+    for key, pat in zip(spec["key"][::-1], spec["pattern"][::-1]):     # first match wins
+        keys[labels.str.contains(pat, case=False, regex=True).to_numpy()] = key
+    return keys
+
+
+def indicator_key(labels: pd.Series, spec: pd.DataFrame) -> np.ndarray:
+    """Spec key of each indicator label (NaN if no pattern matches)."""
+    return on_values(labels, lambda v: _match_keys(v, spec))
+
+
+def extract_indicators(spec: pd.DataFrame = INDICATORS, path: Path = NZHS_CSV,
+                       chunk_rows: int = CHUNK_ROWS) -> pd.DataFrame:
+    """One pass over the export -> tidy long table (TIDY_COLS) for every spec indicator.
+
+    Raises ValueError if a TIDY_KEY repeats (a breakdown the base filter does not pin down).
+    """
+    cols = header(path)
+    measure = "proportion" if "proportion" in cols else "mean"
+    flags = [f for f in ETHNICITY_FLAGS if f in cols]
+    where = {"indicator": lambda v: pd.notna(_match_keys(v, spec))}
+    where.update({c: f for c, f in BASE_FILTER.items() if c in cols})
+    df = read_nzhs(path, where=where, chunk_rows=chunk_rows,
+                   columns=["indicator", "health_region", "year_to", measure,
+                            f"{measure}_low", f"{measure}_high"] + flags)
+
+    eth = np.full(len(df), "Total", dtype=object)
+    for f in flags[::-1]:                                    # first flag set wins
+        hit = truthy(df[f])
+        if not hit.any():                                    # some files have non-yes values
+            hit = df[f].notna().to_numpy()
+        eth[hit] = ETHNICITY_FLAGS[f]
+
+    tidy = pd.DataFrame({
+        "indicator": indicator_key(df["indicator"], spec),
+        "indicator_label": df["indicator"].astype(str),
+        "health_region": names(codes(df["health_region"], "health_region"), "health_region"),
+        "ethnicity": eth,
+        "year_to": df["year_to"].astype(str),
+        "year_end": year_end(df["year_to"]),
+        "measure": measure,
+        "value": df[measure],
+        "value_low": df.get(f"{measure}_low"),
+        "value_high": df.get(f"{measure}_high"),
+    })
+    dup = tidy.duplicated(TIDY_KEY, keep=False)
+    if dup.any():
+        raise ValueError(f"{Path(path).name}: {int(dup.sum())} rows share an "
+                         f"{'/'.join(TIDY_KEY)} key, e.g.\n"
+                         f"{tidy.loc[dup, TIDY_KEY + ['value']].head(6).to_string(index=False)}")
+    tidy = tidy.astype({c: "category" for c in TIDY_CATEGORICAL})
+    return tidy.sort_values(TIDY_COLS[:5]).reset_index(drop=True)
+
+
+def indicator_path(key: str) -> Path:
+    return INDICATOR_DIR / f"indicator={key}" / "part.parquet"
+
+
+def write_indicator_store(tidy: pd.DataFrame, full: bool = False) -> list:
+    """Replace the partitions of the indicators present in `tidy` (all partitions if full)."""
+    if full and INDICATOR_DIR.exists():
+        shutil.rmtree(INDICATOR_DIR)
+    written = []
+    for key, part in tidy.groupby("indicator", observed=True):
+        p = indicator_path(key)
+        p.parent.mkdir(parents=True, exist_ok=True)
+        part.drop(columns="indicator").to_parquet(p, index=False)
+        written.append(p)
+    return written
+
+
+def read_indicators(keys: list | None = None, columns: list | None = None) -> pd.DataFrame:
+    """Tidy rows for the given indicator keys (None = all), reading only those partitions."""
+    parts = []
+    for p in sorted(INDICATOR_DIR.glob("indicator=*/part.parquet")):
+        key = p.parent.name.split("=", 1)[1]
+        if keys and key not in keys:
+            continue
+        cols = [c for c in columns if c != "indicator"] if columns else None
+        parts.append(pd.read_parquet(p, columns=cols).assign(indicator=key))
+    if not parts:
+        return pd.DataFrame(columns=columns or TIDY_COLS)
+    df = pd.concat(parts, ignore_index=True)
+    df = df.astype({c: "category" for c in TIDY_CATEGORICAL if c in df.columns})
+    return df[columns or TIDY_COLS]
@@ -0,0 +1,166 @@
+# scripts/panel_store.py
+# The analysis panel: one row per (geography level, zone, period, ethnicity), one
+# column per indicator, stored as typed Parquet partitioned by level and period:
+#   data_proc/panel/geo_level=<level>/period=<period>/part.parquet
+#
+#   from panel_store import upsert, read_panel, attach
+#   upsert(df, source="nzhs_obesity")        # df: geo_level, zone_code, period, ethnicity + indicators
+#   df = read_panel("health_region", ["obesity_rate", "pm25_ugm3"], periods=["2020/21"])
+#   df = attach(df, "health_region", "nzdep_9_10_share")   # zone-level value on every row
+#
+# Each source owns its indicator columns at its geography levels (_manifest.json). upsert()
+# replaces only that source's columns, and only in partitions whose slice of the
+# source changed since the last write, so refreshing one source rewrites a handful
+# of small files and leaves every other source's values alone. Zone-level indicators
+# with no ethnicity breakdown use ethnicity "Total".
+# read_panel() prunes partitions by level/period from the paths and pushes zone and
+# ethnicity filters and the column list down into the Parquet reads.
+
+import hashlib
+import json
+from pathlib import Path
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+from geo_registry import names
+
+ROOT = Path(__file__).resolve().parents[1]
+PANEL_DIR = ROOT / "data_proc" / "panel"
+PANEL_MANIFEST = PANEL_DIR / "_manifest.json"
+KEY = ["zone_code", "period", "ethnicity"]          # within a geo_level partition
+META = ["geo_level", "zone", *KEY]
+
+
+def partition_path(level: str, period: str) -> Path:
+    return PANEL_DIR / f"geo_level={level}" / f"period={str(period).replace('/', '_')}" / "part.parquet"
+
+
+def _load_manifest() -> dict:
+    if PANEL_MANIFEST.exists():
+        with open(PANEL_MANIFEST) as f:
+            return json.load(f)
+    return {}
+
+
+def _save_manifest(man: dict) -> None:
+    PANEL_MANIFEST.parent.mkdir(parents=True, exist_ok=True)
+    with open(PANEL_MANIFEST, "w") as f:
+        json.dump(man, f, indent=1, sort_keys=True)
+
+
+def _slice_hash(df: pd.DataFrame) -> str:
+    df = df.sort_values(KEY).reset_index(drop=True)
+    return hashlib.sha256(pd.util.hash_pandas_object(df.astype(str), index=False).values.tobytes()).hexdigest()[:16]
+
+
+def _typed(df: pd.DataFrame) -> pd.DataFrame:
+    return df.astype({"zone_code": "int32", "period": str, "ethnicity": str}).astype(
+        {"zone": "category", "ethnicity": "category"})
+
+
+def _rewrite(path: Path, level: str, drop_cols: list, fresh: pd.DataFrame | None) -> None:
+    """Drop `drop_cols` from a partition, outer-join `fresh` on KEY, write (or delete if empty)."""
+    old = pd.read_parquet(path) if path.exists() else None
+    if old is not None:
+        old = old.drop(columns=[c for c in drop_cols if c in old.columns])
+    if fresh is not None:
+        fresh = fresh.drop(columns=["geo_level"])
+        if old is not None and len(old):
+            old = old.astype({"period": str, "ethnicity": str}).drop(columns="zone")
+            out = old.merge(fresh.drop(columns="zone").astype({"ethnicity": str}), on=KEY, how="outer")
+        else:
+            out = fresh.drop(columns="zone")
+    else:
+        out = old.drop(columns="zone") if old is not None else pd.DataFrame(columns=KEY)
+    values = [c for c in out.columns if c not in KEY]
+    out = out.dropna(subset=values, how="all") if values else out.iloc[0:0]
+    if out.empty:
+        path.unlink(missing_ok=True)
+        return
+    out.insert(0, "zone", names(out["zone_code"], level))
+    out = _typed(out).sort_values(KEY).reset_index(drop=True)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    out.to_parquet(path, index=False)
+
+
+def upsert(df: pd.DataFrame, source: str) -> int:
+    """
+    Write `source`'s indicator columns (everything in df except META) into the panel.
+    Returns the number of partitions rewritten.
+    """
+    missing = {"geo_level", "zone_code", "period", "ethnicity"} - set(df.columns)
+    if missing:
+        raise ValueError(f"panel rows need columns {sorted(missing)}")
+    cols = [c for c in df.columns if c not in META]
+    man = _load_manifest()
+    levels = {f"geo_level={lvl}" for lvl in df["geo_level"].unique()}
+    for other, info in man.items():
+        shared = levels & {rel.split("/", 1)[0] for rel in info["partitions"]}
+        clash = set(cols) & set(info["columns"]) if other != source and shared else set()
+        if clash:
+            raise ValueError(f"column(s) {sorted(clash)} already belong to source '{other}'")
+
+    df = df[df["zone_code"] >= 0].copy()
+    if "zone" not in df.columns:
+        df["zone"] = None
+    df["period"] = df["period"].astype(str)
+    prev = man.get(source, {"columns": [], "partitions": {}})
+    dropped_cols = sorted(set(prev["columns"]) - set(cols))
+    now = {}
+    rewritten = 0
+    for (level, period), part in df.groupby(["geo_level", "period"], observed=True):
+        path = partition_path(level, period)
+        rel = path.relative_to(PANEL_DIR).as_posix()
+        part = part[META + cols].drop_duplicates(KEY, keep="last")
+        now[rel] = _slice_hash(part.drop(columns="zone"))
+        if prev["partitions"].get(rel) == now[rel] and not dropped_cols and path.exists():
+            continue
+        _rewrite(path, level, prev["columns"] + cols, part)
+        rewritten += 1
+    for rel in set(prev["partitions"]) - set(now):              # periods the source no longer has
+        level = rel.split("/", 1)[0].split("=", 1)[1]
+        _rewrite(PANEL_DIR / rel, level, prev["columns"], None)
+        rewritten += 1
+
+    man[source] = {"columns": cols, "partitions": now}
+    _save_manifest(man)
+    return rewritten
+
+
+def read_panel(level: str, columns: list | None = None, periods: list | None = None,
+               zones: list | None = None, ethnicities: list | None = None) -> pd.DataFrame:
+    """Panel rows for one geography level; indicator columns absent from a partition are NaN."""
+    root = PANEL_DIR / f"geo_level={level}"
+    keep = {str(p).replace("/", "_") for p in periods} if periods else None
+    filters = []
+    if zones is not None:
+        filters.append(("zone_code", "in", [int(z) for z in zones]))
+    if ethnicities is not None:
+        filters.append(("ethnicity", "in", list(ethnicities)))
+
+    parts = []
+    for f in sorted(root.glob("period=*/part.parquet")):
+        if keep is not None and f.parent.name.split("=", 1)[1] not in keep:
+            continue
+        have = pq.read_schema(f).names
+        want = ["zone"] + KEY + [c for c in (columns or have) if c in have and c not in KEY + ["zone"]]
+        t = pq.read_table(f, columns=want, filters=filters or None)
+        if t.num_rows:
+            parts.append(t.to_pandas())
+    cols = ["zone"] + KEY + (columns or [])
+    if not parts:
+        return pd.DataFrame(columns=cols)
+    df = pd.concat(parts, ignore_index=True)
+    for c in columns or []:
+        if c not in df.columns:
+            df[c] = float("nan")
+    df = df.astype({"zone": str, "ethnicity": str, "period": str})
+    return df.astype({"zone": "category", "ethnicity": "category"})[cols if columns else df.columns]
+
+
+def attach(df: pd.DataFrame, level: str, column: str, period: str | None = None) -> pd.DataFrame:
+    """Add a zone-level indicator (ethnicity 'Total'; `period` or each zone's latest) to every row."""
+    z = read_panel(level, [column], periods=[period] if period else None, ethnicities=["Total"])
+    z = z.dropna(subset=[column]).sort_values("period").drop_duplicates("zone_code", keep="last")
+    return df.merge(z[["zone_code", column]], on="zone_code", how="left")
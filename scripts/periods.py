@@ -0,0 +1,160 @@
+# scripts/periods.py
+# Reference periods as intervals, and joins between panels whose periods don't line up
+# (NZHS survey years "2020/21" vs calendar-year PM vs a single VIIRS year).
+#
+#   from periods import parse_periods, align
+#   iv = parse_periods(obe["year_to"])            # start, end (end exclusive)
+#   panel = align(obe, pm, on=["health_region_code"], values=["pm25_ugm3"],
+#                 left_period="year_to", right_period="year", how="overlap")
+#
+# Labels understood (parsed once per distinct label):
+#   2023, 2023.0            calendar year
+#   2020/21, 2020/2021      NZHS survey year / NZ financial year (1 July – 30 June)
+#   2020-21, 2020–21        the same, when the second year follows the first; "2011-12" could
+#                           also be December 2011 and is read as the financial year with a warning
+#   FY2021                  financial year ending June 2021
+#   2017/18-2020/21         pooled survey years
+#   2019-2022, 2019–22      pooled calendar years
+#   2023-05                 month          2023-JJA   season (DJF starts in December of the year before)
+#   2023-05-17              day
+#
+# align(how=...):
+#   "nearest"  right period whose midpoint is closest to the left one (within `tolerance`)
+#   "overlap"  mean of right values weighted by days of overlap with the left period,
+#              optionally lagged (`lag_months`) or over a fixed window ending at the
+#              left period's end (`window_months`, e.g. 36 = three years of exposure)
+# Both are whole-table operations (merge_asof / one keyed merge + grouped sums).
+
+import re
+
+import numpy as np
+import pandas as pd
+
+SEASON_START = {"DJF": -1, "MAM": 2, "JJA": 5, "SON": 8}   # first month (0 = Jan), as air_stats
+
+_FY_DASH = re.compile(r"^(?:FY\s*)?(\d{4})\s*[-–]\s*(\d{2})$", re.I)
+_PATTERNS = [
+    # (regex, f(match) -> (first month index, months) or None to try the next pattern)
+    # month index = year * 12 + month0
+    (re.compile(r"^(\d{4})(?:\.0+)?$"),
+     lambda m: (int(m[1]) * 12, 12)),
+    (re.compile(r"^(?:FY\s*)?(\d{4})\s*/\s*(\d{2}|\d{4})$", re.I),
+     lambda m: (int(m[1]) * 12 + 6, 12)),
+    (_FY_DASH,
+     lambda m: (int(m[1]) * 12 + 6, 12) if _next_year(m[1], m[2]) else None),
+    (re.compile(r"^FY\s*(\d{4})$", re.I),
+     lambda m: ((int(m[1]) - 1) * 12 + 6, 12)),
+    (re.compile(r"^(\d{4})\s*/\s*\d{2,4}\s*[-–]\s*(\d{4})\s*/\s*\d{2,4}$"),
+     lambda m: (int(m[1]) * 12 + 6, (int(m[2]) - int(m[1]) + 1) * 12)),
+    (re.compile(r"^(\d{4})-(DJF|MAM|JJA|SON)$", re.I),
+     lambda m: (int(m[1]) * 12 + SEASON_START[m[2].upper()], 3)),
+    (re.compile(r"^(\d{4})-(0[1-9]|1[0-2])$"),
+     lambda m: (int(m[1]) * 12 + int(m[2]) - 1, 1)),
+    (re.compile(r"^(\d{4})\s*[-–]\s*(\d{4}|\d{2})$"),
+     lambda m: (int(m[1]) * 12, (_full_year(m[2], m[1]) - int(m[1]) + 1) * 12)),
+]
+_DAY = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+
+def _full_year(y: str, ref: str) -> int:
+    return int(y) if len(y) == 4 else int(ref[:2] + y)
+
+
+def _next_year(y1: str, yy: str) -> bool:
+    return (int(y1) + 1) % 100 == int(yy)
+
+
+def _ambiguous(label) -> bool:
+    """'2011-12': financial year 2011/12, or December 2011."""
+    m = re.match(r"^(\d{4})-(0[1-9]|1[0-2])$", str(label).strip())
+    return bool(m) and _next_year(m[1], m[2])
+
+
+def _month_start(ym: np.ndarray) -> pd.DatetimeIndex:
+    ym = np.asarray(ym, dtype="int64")
+    return pd.to_datetime({"year": ym // 12, "month": ym % 12 + 1, "day": 1})
+
+
+def _parse_one(label) -> tuple:
+    """(start, end) Timestamps for one label, or (NaT, NaT)."""
+    s = str(label).strip()
+    for rx, f in _PATTERNS:
+        m = rx.match(s)
+        if m and (hit := f(m)) is not None:
+            first, n = hit
+            start, end = _month_start([first, first + n])
+            return start, end
+    if _DAY.match(s):
+        d = pd.Timestamp(s)
+        return d, d + pd.Timedelta(days=1)
+    return pd.NaT, pd.NaT
+
+
+def parse_periods(labels) -> pd.DataFrame:
+    """start / end (exclusive) for each label, index-aligned with `labels`."""
+    labels = pd.Series(labels)
+    idx, uniq = pd.factorize(labels)
+    iv = pd.DataFrame([_parse_one(u) for u in uniq], columns=["start", "end"]).astype("datetime64[ns]")
+    bad = [str(u) for u, s in zip(uniq, iv["start"]) if pd.isna(s)]
+    if bad:
+        print(f"⚠️ Unrecognised period label(s): {sorted(bad)[:10]}")
+    amb = [str(u) for u in uniq if _ambiguous(u)]
+    if amb:
+        print(f"⚠️ Read as July–June financial years, not months: {sorted(amb)[:10]}")
+    nat = pd.DataFrame({"start": [pd.NaT], "end": [pd.NaT]}).astype("datetime64[ns]")
+    out = pd.concat([iv, nat], ignore_index=True).iloc[np.where(idx < 0, len(iv), idx)]
+    return out.set_axis(labels.index)
+
+
+def add_interval(df: pd.DataFrame, col: str, prefix: str = "") -> pd.DataFrame:
+    iv = parse_periods(df[col])
+    return df.assign(**{f"{prefix}start": iv["start"].to_numpy(), f"{prefix}end": iv["end"].to_numpy()})
+
+
+# ---------- joins ----------
+def align(left: pd.DataFrame, right: pd.DataFrame, on: list, values: list,
+          left_period: str = "period", right_period: str = "period", how: str = "overlap",
+          tolerance: pd.Timedelta | None = None, lag_months: int = 0,
+          window_months: int | None = None, min_coverage: float = 0.0) -> pd.DataFrame:
+    """
+    Left rows with `values` from `right` aligned to each left period (NaN where nothing
+    qualifies) plus `<right_period>_matched` (the right period labels used) and, for
+    "overlap", `coverage` (share of the target window covered by right periods).
+    """
+    L = add_interval(left.reset_index(drop=True), left_period, "_l_").assign(_row=lambda d: np.arange(len(d)))
+    R = add_interval(right[on + [right_period] + values], right_period, "_r_").dropna(subset=["_r_start"])
+    matched = f"{right_period}_matched" if right_period != left_period else f"{right_period}_right"
+
+    if how == "nearest":
+        L["_mid"] = L["_l_start"] + (L["_l_end"] - L["_l_start"]) / 2
+        R["_mid"] = R["_r_start"] + (R["_r_end"] - R["_r_start"]) / 2
+        ok = L["_mid"].notna()
+        hit = pd.merge_asof(L.loc[ok, on + ["_mid", "_row"]].sort_values("_mid"),
+                            R[on + ["_mid", right_period] + values].sort_values("_mid"),
+                            on="_mid", by=on, direction="nearest", tolerance=tolerance)
+        got = hit.set_index("_row")[values + [right_period]].rename(columns={right_period: matched})
+    elif how == "overlap":
+        end = L["_l_end"] - pd.DateOffset(months=lag_months)
+        start = end - pd.DateOffset(months=window_months) if window_months else L["_l_start"] - pd.DateOffset(months=lag_months)
+        L["_w_start"], L["_w_end"] = start, end
+        pairs = L[on + ["_row", "_w_start", "_w_end"]].merge(R, on=on, how="inner")
+        ov = (pairs[["_w_end", "_r_end"]].min(axis=1) - pairs[["_w_start", "_r_start"]].max(axis=1)).dt.days
+        pairs = pairs.assign(_w=ov.to_numpy(dtype="float64"))
+        pairs = pairs[pairs["_w"] > 0]
+
+        g = pairs.groupby("_row")
+        got = pd.DataFrame(index=pd.Index(g.size().index, name="_row"))
+        for v in values:
+            w = pairs["_w"].where(pairs[v].notna(), 0.0)
+            got[v] = (w * pairs[v].fillna(0)).groupby(pairs["_row"]).sum() / w.groupby(pairs["_row"]).sum()
+        got[matched] = g[right_period].agg(lambda s: ";".join(sorted(map(str, s.unique()))))
+        window_days = (L.set_index("_row")["_w_end"] - L.set_index("_row")["_w_start"]).dt.days
+        got["coverage"] = (g["_w"].sum() / window_days.reindex(got.index)).clip(upper=1.0)
+        if min_coverage:
+            got.loc[got["coverage"] < min_coverage, values] = np.nan
+    else:
+        raise ValueError(f"how must be 'nearest' or 'overlap', not {how!r}")
+
+    out = L.join(got, on="_row", rsuffix="_right")
+    drop = [c for c in out.columns if c.startswith(("_l_", "_w_")) or c in ("_row", "_mid")]
+    return out.drop(columns=drop)
@@ -0,0 +1,445 @@
+# scripts/run_pipeline.py
+# Run the numbered scripts as a dependency graph: each stage declares the files it
+# reads and writes (STAGES), edges come from matching outputs to inputs, and stages
+# whose dependencies are done run in parallel, each in its own Python process.
+#
+#   python scripts/run_pipeline.py                 # everything that is out of date
+#   python scripts/run_pipeline.py 73 74           # these stages (+ anything upstream that is stale)
+#   python scripts/run_pipeline.py --dry-run       # what would run, and why
+#   python scripts/run_pipeline.py --list          # the graph
+#   python scripts/run_pipeline.py --force 61 -j 4
+#
+# A stage is up to date when the content digests of its inputs and of its code (the
+# script plus the scripts/ modules it imports) match the last successful run and
+# all its outputs exist; stamps live in data_proc/cache/pipeline/stamps.json. Digests
+# are of file contents, so a stage that rewrites identical tables does not wake up
+# its consumers. Inputs that nothing produces and that are missing (raw downloads
+# not on this machine) leave a stage on its existing outputs, or block it and its
+# consumers when it has none. Stages sharing a lock (the analysis panel's
+# read-modify-write, fig_export's per-directory cache) never overlap.
+#
+# Paths are relative to the repo root, may be globs, and a directory means every file
+# under it. data_proc tables are named by their CSV path as in storage.py (the
+# Parquet file next to it counts too). After the run: per-stage timings and the
+# critical path (the chain of dependent stages that bounded the wall time).
+import argparse
+import fnmatch
+import hashlib
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+
+from lawa_io import CACHE_DIR
+from storage import parquet_path
+
+ROOT = Path(__file__).resolve().parents[1]
+SCRIPTS = ROOT / "scripts"
+STATE_DIR = CACHE_DIR / "pipeline"
+STAMPS = STATE_DIR / "stamps.json"
+LOG_DIR = STATE_DIR / "logs"
+
+TA_GEOJSON = "data_raw/ta2025_ms_5pct.geojson"
+TA_LOD = "data_raw/geometry_lod"
+TA_HR_LUT = "data_raw/ta_to_health_region.csv"
+VIIRS_TIFS = "data_raw/viirs_annual_*.tif"
+VIIRS_2021 = "data_raw/viirs_annual_2021.tif"
+VIIRS_STORE = "data_proc/viirs_ta_store"
+VIIRS_TA = "data_proc/viirs_ta_annual_2021_with_names.csv"
+LAWA_XLSX = "data_raw/lawa_air-quality-download-data_2016-2024.xlsx"
+LAWA_CACHE = "data_proc/cache/lawa_*.parquet"          # lawa_io's parsed download
+NZHS_CSV = "data_raw/adult_unadjusted_topic_body_size_includes_obesity.csv"
+PANEL_RC = "data_proc/panel/geo_level=regional_council"
+PANEL_HR = "data_proc/panel/geo_level=health_region"
+PERIODS_SITE = "data_proc/air_periods_by_site.csv"
+SNAPSHOT = "data_proc/air_obesity_by_health_region_2023.csv"
+EQUITY = "data_proc/air_obesity_deprivation_2023.csv"
+BRIGHTNESS = "data_proc/brightness_by_health_region.csv"
+OBESITY = "data_proc/obesity_by_region_ethnicity.csv"
+
+
+class Stage:
+    def __init__(self, name: str, script: str, inputs: list, outputs: list, optional: list = (),
+                 args: list = (), locks: list = ()):
+        self.name, self.script = name, script
+        self.inputs, self.optional, self.outputs = list(inputs), list(optional), list(outputs)
+        self.args, self.locks = list(args), set(locks)
+
+
+# name -> inputs (required / optional) and outputs; 10 (downloads) and 55 (README
+# edit) stay manual, 51_clean_obesity_by_region is superseded by 51.
+STAGES = {s.name: s for s in [
+    # --- VIIRS ---
+    Stage("15", "15_merge_viirs_tiles.py", ["data_raw/viirs_annual_2021-*.tif"], [VIIRS_2021]),
+    Stage("16", "16_build_geometry_lod.py", ["data_raw/ta_2025_gen"], [TA_LOD]),
+    Stage("20", "20_aggregate_viirs_to_ta.py", ["data_raw/ta_2025_gen", VIIRS_2021],
+          ["data_proc/viirs_ta_annual_2021.csv"]),
+    Stage("39", "39_batch_years.py", [VIIRS_TIFS, TA_GEOJSON], [VIIRS_STORE]),
+    Stage("40", "40_concat_years.py", [VIIRS_STORE], ["data_proc/viirs_ta_timeseries_2014_2023.csv", VIIRS_TA],
+          optional=["data_raw/viirs_yearly"]),
+    Stage("38", "38_viirs_timeseries.py", [VIIRS_STORE], ["data_proc/viirs_timeseries_top6.png"]),
+    Stage("41", "41_plot_timeseries.py", ["data_proc/viirs_ta_timeseries_2014_2023.csv"],
+          ["data_proc/timeseries_national.png", "data_proc/timeseries_small_multiples_top12.png"]),
+    Stage("21", "21_render_viirs_tiles.py", [VIIRS_TIFS],
+          ["docs/tiles/viirs/manifest.json", "docs/viirs_pixels_map.html"]),
+    Stage("30", "30_plot_choropleth.py", [VIIRS_TA, TA_GEOJSON], ["docs/ta_brightness_map.html"],
+          optional=[TA_LOD]),
+    Stage("31", "31_single_map_toggle.py", [VIIRS_TA, TA_GEOJSON],
+          ["docs/ta_single_map_toggle.html", "data_proc/ta_brightness_map_1600.png"],
+          optional=[TA_LOD], locks=["figcache"]),
+    Stage("32", "32_dual_maps.py", [VIIRS_TA, TA_GEOJSON], ["docs/ta_dual_maps.html"], optional=[TA_LOD]),
+    Stage("33", "33_build_vector_tiles.py", [VIIRS_TA, TA_GEOJSON],
+          ["docs/tiles/ta/tiles.json", "docs/ta_tiles_map.html"], optional=[TA_LOD]),
+    Stage("35", "35_quick_charts.py", ["data_proc/viirs_ta_annual_2021.csv"],
+          ["data_proc/top15_viirs_2021.png", "data_proc/hist_viirs_2021.png"]),
+    Stage("36", "36_normalize_and_rank.py", [VIIRS_TA, TA_GEOJSON, "data_raw/pop_2023.csv"],
+          ["data_proc/viirs_ta_2021_normalized.csv"]),
+    Stage("36b", "36b_spatial_autocorrelation.py", ["data_proc/viirs_ta_2021_normalized.csv", TA_GEOJSON],
+          ["data_proc/ta_hotspots_2021.csv"]),
+    Stage("37", "37_make_normalized_charts.py", ["data_proc/viirs_ta_2021_normalized.csv"],
+          ["data_proc/top15_abs_radiance.png", "data_proc/top15_radiance_per_km2.png",
+           "data_proc/hist_radiance_mean.png"]),
+    Stage("50", "50_build_brightness_by_region.py", [VIIRS_TA, TA_HR_LUT], [BRIGHTNESS, PANEL_HR],
+          locks=["panel"]),
+    # --- NZHS ---
+    Stage("51", "51_clean_ethnicity_once.py", [NZHS_CSV], [OBESITY]),
+    Stage("51b", "51b_extract_nzhs_indicators.py", [NZHS_CSV], ["data_proc/nzhs_indicators"]),
+    Stage("52", "52_merge_obesity_brightness.py", [OBESITY, BRIGHTNESS],
+          ["data_proc/obesity_vs_brightness_by_region.csv"]),
+    Stage("53", "53_plot_obesity_brightness.py", ["data_proc/obesity_vs_brightness_by_region.csv"],
+          ["data_proc/obesity_vs_brightness_scatter_fixed.png"]),
+    Stage("54", "54_plot_small_multiples_by_region.py", ["data_proc/obesity_vs_brightness_by_region.csv"],
+          ["data_proc/obesity_vs_brightness_small_multiples.png"]),
+    # --- LAWA air ---
+    Stage("61", "61_clean_lawa_air.py", [LAWA_XLSX],
+          ["data_proc/air_annual_by_site.csv", "data_proc/air_annual_by_region.csv",
+           "data_proc/air_thresholds_by_site.csv", "data_proc/air_episodes_by_site.csv",
+           "data_proc/air_episodes_by_region_year.csv", PERIODS_SITE, "data_proc/air_periods_by_region.csv",
+           "data_proc/air_site_period_matrix.csv", "data_proc/lawa_daily", LAWA_CACHE, PANEL_RC],
+          locks=["panel"]),
+    Stage("17", "17_assign_geography.py", [LAWA_CACHE, TA_GEOJSON, "data_raw/rc2025_ms_5pct.geojson"],
+          ["data_proc/lawa_sites_geography.csv"]),
+    Stage("62", "62_plot_lawa_air.py", ["data_proc/air_annual_by_region.csv"],
+          ["data_proc/air_PM25_annual_by_region.png", "data_proc/air_PM10_annual_by_region.png"]),
+    Stage("63", "63_map_air_quality_2023.py", [LAWA_CACHE], ["docs/air_pm_map_2023.html"],
+          locks=["figcache"]),
+    Stage("64", "64_air_trends.py", [PERIODS_SITE], ["data_proc/air_trends_by_site.csv"]),
+    Stage("65", "65_interpolate_pm_surface.py", [PERIODS_SITE, LAWA_CACHE, VIIRS_TIFS, TA_GEOJSON, TA_HR_LUT],
+          ["data_proc/pm_surface"], args=["--year", "2023"]),
+    # --- air × health ---
+    Stage("71", "71_merge_pm25_obesity_by_health_region.py",
+          [LAWA_CACHE, "data_raw/regional_council_to_health_region.csv"],
+          ["data_proc/air_obesity_panel_by_health_region.csv", SNAPSHOT, PANEL_HR],
+          optional=["data_proc/nzhs_indicators", OBESITY], locks=["panel"]),
+    Stage("72", "72_merge_air_obesity_nzdep.py", [SNAPSHOT, "data_raw/nzdep_by_health_region.csv"],
+          [EQUITY, PANEL_HR], locks=["panel"]),
+    Stage("73", "73_plot_air_obesity_deprivation.py", [EQUITY],
+          ["docs/air_obesity_dep_scatter_2023.html", "docs/air_obesity_dep_facets_by_ethnicity_2023.html",
+           "data_proc/air_obesity_dep_scatter_2023.png", "data_proc/air_obesity_dep_facets_by_ethnicity_2023.png"],
+          optional=[PANEL_HR], locks=["figcache"]),
+    Stage("74", "74_association_stats.py", [EQUITY], ["data_proc/association_stats.csv"],
+          optional=[PANEL_HR, BRIGHTNESS]),
+    # --- site ---
+    Stage("80", "80_build_docs_site.py",
+          ["docs/ta_brightness_map.html", "docs/ta_single_map_toggle.html", "docs/ta_dual_maps.html",
+           "docs/air_pm_map_2023.html", "docs/air_obesity_dep_scatter_2023.html",
+           "docs/air_obesity_dep_facets_by_ethnicity_2023.html"], [],
+          optional=["docs/ta_tiles_map.html", "docs/viirs_pixels_map.html"]),
+]}
+
+
+# ---------- graph ----------
+def _matches(output: str, pattern: str) -> bool:
+    return output == pattern or fnmatch.fnmatch(output, pattern) or fnmatch.fnmatch(pattern, output)
+
+
+def upstream(stages: dict, optional: bool = True) -> dict:
+    """name -> names of the stages producing any of its inputs (required ones only if not `optional`)."""
+    deps = {}
+    for s in stages.values():
+        ins = s.inputs + s.optional if optional else s.inputs
+        deps[s.name] = sorted({p.name for p in stages.values() if p is not s
+                               for out in p.outputs for inp in ins if _matches(out, inp)},
+                              key=list(stages).index)
+    return deps
+
+
+def topo_order(deps: dict) -> list:
+    order, state = [], {}
+
+    def visit(n, path):
+        if state.get(n) == "done":
+            return
+        if state.get(n) == "visiting":
+            raise SystemExit(f"❌ Cycle in STAGES: {' → '.join(path + [n])}")
+        state[n] = "visiting"
+        for d in deps[n]:
+            visit(d, path + [n])
+        state[n] = "done"
+        order.append(n)
+
+    for n in deps:
+        visit(n, [])
+    return order
+
+
+def with_upstream(targets: list, deps: dict) -> set:
+    todo, seen = list(targets), set()
+    while todo:
+        n = todo.pop()
+        if n not in seen:
+            seen.add(n)
+            todo.extend(deps[n])
+    return seen
+
+
+# ---------- fingerprints ----------
+def files(pattern: str) -> list:
+    """Files a declared path stands for (glob; directories recursively; CSV tables + their Parquet)."""
+    found = []
+    pats = [pattern] + ([str(parquet_path(pattern))] if pattern.endswith(".csv") else [])
+    for pat in pats:
+        for p in sorted(ROOT.glob(pat)):
+            found += sorted(f for f in p.rglob("*") if f.is_file()) if p.is_dir() else [p]
+    return found
+
+
+class Digests:
+    """Content digests, re-hashed only when a file's size or mtime has changed."""
+
+    def __init__(self, memo: dict):
+        self.memo = memo
+
+    def file(self, path: Path) -> str:
+        st = path.stat()
+        key = str(path.relative_to(ROOT))
+        stamp = f"{st.st_size}|{st.st_mtime_ns}"
+        hit = self.memo.get(key)
+        if hit and hit[0] == stamp:
+            return hit[1]
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+        self.memo[key] = (stamp, h.hexdigest()[:16])
+        return self.memo[key][1]
+
+    def paths(self, pattern: str) -> str | None:
+        """One digest for everything a declared path covers (None if nothing is there)."""
+        fs = files(pattern)
+        if not fs:
+            return None
+        h = hashlib.sha256()
+        for f in fs:
+            h.update(f"{f.relative_to(ROOT)}={self.file(f)};".encode())
+        return h.hexdigest()[:16]
+
+
+def code_files(script: str) -> list:
+    """The script and the scripts/ modules it imports, transitively."""
+    seen, todo = [], [SCRIPTS / script]
+    imp = re.compile(r"^\s*(?:from\s+(\w+)\s+import|import\s+(\w+))", re.M)
+    while todo:
+        p = todo.pop()
+        if p in seen or not p.exists():
+            continue
+        seen.append(p)
+        for a, b in imp.findall(p.read_text(encoding="utf-8")):
+            todo.append(SCRIPTS / f"{a or b}.py")
+    return sorted(seen)
+
+
+def signature(stage: Stage, dig: Digests) -> dict:
+    sig = {"args": stage.args,
+           "code": {str(p.relative_to(ROOT)): dig.file(p) for p in code_files(stage.script)}}
+    sig["inputs"] = {pat: dig.paths(pat) for pat in stage.inputs + stage.optional}
+    return sig
+
+
+def outputs_exist(stage: Stage) -> bool:
+    return all(files(p) for p in stage.outputs)
+
+
+def load_state() -> dict:
+    if STAMPS.exists():
+        return json.loads(STAMPS.read_text())
+    return {"stamps": {}, "digests": {}}
+
+
+def save_state(state: dict) -> None:
+    STATE_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = STAMPS.with_suffix(".tmp")
+    tmp.write_text(json.dumps(state, indent=1, sort_keys=True))
+    os.replace(tmp, STAMPS)
+
+
+def why_stale(stage: Stage, sig: dict, stamp: dict | None) -> str | None:
+    """Reason to run, or None when up to date."""
+    if stamp is None:
+        return "never run"
+    if not outputs_exist(stage):
+        return "missing outputs"
+    if stamp["args"] != sig["args"]:
+        return "arguments changed"
+    code = [p for p in sig["code"] if stamp["code"].get(p) != sig["code"][p]]
+    if code or set(stamp["code"]) != set(sig["code"]):
+        return f"code changed ({', '.join(Path(p).name for p in code) or 'imports'})"
+    changed = [p for p in sig["inputs"] if stamp["inputs"].get(p) != sig["inputs"][p]]
+    if changed:
+        return f"inputs changed ({', '.join(changed)})"
+    return None
+
+
+# ---------- running ----------
+def run_stage(stage: Stage) -> tuple:
+    """(return code, seconds); stdout + stderr go to the stage's log."""
+    LOG_DIR.mkdir(parents=True, exist_ok=True)
+    t0 = time.perf_counter()
+    with open(LOG_DIR / f"{stage.name}.log", "w") as log:
+        rc = subprocess.call([sys.executable, str(SCRIPTS / stage.script), *stage.args],
+                             cwd=ROOT, stdout=log, stderr=subprocess.STDOUT,
+                             env={**os.environ, "MPLBACKEND": os.environ.get("MPLBACKEND", "Agg")})
+    return rc, time.perf_counter() - t0
+
+
+def critical_path(names: list, deps: dict, took: dict) -> tuple:
+    """(stages on the longest chain of dependent stages, its length in seconds)."""
+    finish, prev = {}, {}
+    for n in names:                                              # topological order
+        ds = [d for d in deps[n] if d in finish]
+        best = max(ds, key=finish.get, default=None)
+        finish[n] = (finish[best] if best else 0.0) + took.get(n, 0.0)
+        prev[n] = best
+    if not finish:
+        return [], 0.0
+    n = max(finish, key=finish.get)
+    chain, total = [], finish[n]
+    while n:
+        chain.append(n)
+        n = prev[n]
+    return [n for n in chain[::-1] if n in took], total
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("stages", nargs="*", help="stage names (default: all); stale upstream stages run too")
+    ap.add_argument("-j", "--jobs", type=int, default=os.cpu_count())
+    ap.add_argument("--force", action="store_true", help="run the named stages (or all) even if up to date")
+    ap.add_argument("--dry-run", action="store_true", help="report what is stale without running anything")
+    ap.add_argument("--list", action="store_true", help="print the graph and exit")
+    args = ap.parse_args()
+
+    deps, needs = upstream(STAGES), upstream(STAGES, optional=False)
+    order = topo_order(deps)
+    if args.list:
+        for n in order:
+            s = STAGES[n]
+            print(f"{n:>4}  {s.script:<45} ← {', '.join(deps[n]) or '-'}"
+                  + (f"   [locks: {', '.join(sorted(s.locks))}]" if s.locks else ""))
+        return
+    unknown = [n for n in args.stages if n not in STAGES]
+    if unknown:
+        raise SystemExit(f"Unknown stage(s) {unknown}; see --list")
+    selected = with_upstream(args.stages, deps) if args.stages else set(STAGES)
+    forced = set(args.stages or STAGES) if args.force else set()
+    todo = [n for n in order if n in selected]
+
+    state = load_state()
+    dig = Digests(state["digests"])
+    produced = {out for s in STAGES.values() for out in s.outputs}
+    status, took, reason = {}, {}, {}
+    running, held, sigs, would = {}, set(), {}, set()
+    t_start = time.perf_counter()
+
+    def ready(n):
+        return all(d in status for d in deps[n] if d in selected)
+
+    def hold(n, why):
+        """Can't run: carry on with the outputs already on disk, else block (and so its consumers)."""
+        if outputs_exist(STAGES[n]):
+            status[n], reason[n] = "kept", why
+            print(f"ℹ️  {n:>4} {why}; existing outputs kept")
+        else:
+            status[n], reason[n] = "blocked", why
+            print(f"⏭️  {n:>4} blocked ({why})")
+
+    with ThreadPoolExecutor(max_workers=max(1, args.jobs)) as ex:
+        while len(status) < len(todo):
+            before = len(status)
+            for n in todo:
+                if n in status or n in running.values():
+                    continue
+                s = STAGES[n]
+                stuck = [d for d in needs[n] if d in selected and status.get(d) in ("failed", "blocked")]
+                if stuck:
+                    hold(n, f"upstream {', '.join(stuck)} did not run")
+                    continue
+                if not ready(n) or s.locks & held:
+                    continue
+                sig = signature(s, dig)
+                absent = [p for p in s.inputs if sig["inputs"][p] is None
+                          and not any(_matches(o, p) for o in produced)]
+                if absent and n not in forced:
+                    hold(n, f"no {', '.join(absent)}")
+                    continue
+                why = "forced" if n in forced else why_stale(s, sig, state["stamps"].get(n))
+                stale_up = [d for d in deps[n] if d in would]
+                if why is None and stale_up:                       # dry run: inputs not rewritten yet
+                    why = f"upstream {', '.join(stale_up)} would run"
+                if why is None:
+                    status[n] = "fresh"
+                    continue
+                reason[n] = why
+                if args.dry_run:
+                    status[n] = "ran"                              # downstream sees it as done
+                    would.add(n)
+                    print(f"→ {n:>4} {s.script}  ({why})")
+                    continue
+                print(f"▶️  {n:>4} {s.script}  ({why})")
+                sigs[n] = sig
+                running[ex.submit(run_stage, s)] = n
+                held |= s.locks
+            if not running:
+                if len(status) == before:
+                    raise SystemExit(f"❌ Stuck: {[n for n in todo if n not in status]}")
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for fut in done:
+                n = running.pop(fut)
+                s = STAGES[n]
+                held -= s.locks
+                rc, secs = fut.result()
+                took[n] = secs
+                if rc == 0:
+                    status[n] = "ran"
+                    state["stamps"][n] = sigs[n]                    # inputs as they were when it started
+                    save_state(state)
+                    print(f"✅ {n:>4} {secs:7.1f}s")
+                else:
+                    status[n] = "failed"
+                    tail = (LOG_DIR / f"{n}.log").read_text(errors="replace").splitlines()[-15:]
+                    print(f"❌ {n:>4} exit {rc} after {secs:.1f}s — {LOG_DIR / (n + '.log')}")
+                    print("\n".join("      " + line for line in tail))
+    save_state(state)
+
+    wall = time.perf_counter() - t_start
+    counts = {k: sum(v == k for v in status.values()) for k in ("ran", "fresh", "kept", "blocked", "failed")}
+    print(f"\n{'Would run' if args.dry_run else 'Ran'} {counts['ran']}, up to date {counts['fresh']}, "
+          f"kept {counts['kept']}, blocked {counts['blocked']}, failed {counts['failed']}")
+    if took:
+        chain, length = critical_path(todo, deps, took)
+        print(f"Wall time {wall:.1f}s for {sum(took.values()):.1f}s of stage time "
+              f"(×{sum(took.values()) / max(wall, 1e-9):.1f} parallel)")
+        print(f"Critical path {length:.1f}s: " + " → ".join(f"{n} ({took.get(n, 0):.1f}s)" for n in chain))
+        for n in sorted(took, key=took.get, reverse=True):
+            print(f"  {n:>4} {took[n]:7.1f}s  {STAGES[n].script:<45} {reason.get(n, '')}")
+    if counts["failed"]:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
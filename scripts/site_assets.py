@@ -0,0 +1,122 @@
+# scripts/site_assets.py
+# Write plotly figures as thin HTML pages that fetch their geometry and data from
+# shared, content-hashed JSON assets, instead of baking everything into each page.
+#
+#   from site_assets import write_html
+#   write_html(fig, "docs/ta_single_map_toggle.html")
+#
+# Layout (relative to the page):
+#   assets/geo.<hash>.json      one per distinct GeoJSON (shared by every page/trace using it)
+#   assets/template.<hash>.json the plotly theme, shared by every page
+#   assets/plotly-<ver>.<hash>.min.js  the plotly.js bundled with the Python package
+#   assets/<page>.<hash>.json   figure spec (data + layout) with geojson replaced by {"$asset": ...}
+#   assets/manifest.json        page -> assets it references (used by 80_build_docs_site.py)
+# Hashed names never change content, so browsers/CDNs can cache them indefinitely.
+
+import hashlib
+import html
+import json
+from functools import lru_cache
+from pathlib import Path
+
+import plotly.io as pio
+from plotly.offline import get_plotlyjs, get_plotlyjs_version
+
+ASSET_DIR = "assets"
+
+_PAGE = """<!doctype html>
+<html lang="en">
+<head>
+  <meta charset="utf-8" />
+  <title>{title}</title>
+  <meta name="viewport" content="width=device-width, initial-scale=1" />
+  <script src="{plotly_js}" charset="utf-8"></script>
+  <style>html,body{{margin:0;height:100%}} #fig{{width:100%;height:100%}}</style>
+</head>
+<body>
+<div id="fig"></div>
+<script>
+(async () => {{
+  const get = (u) => fetch(u).then((r) => {{ if (!r.ok) throw new Error(u + " " + r.status); return r.json(); }});
+  const spec = await get("{spec}");
+  // fetch every distinct shared asset once, then bind it back into the traces
+  const isRef = (v) => v && typeof v === "object" && v.$asset;
+  const tpl = spec.layout.template;
+  const refs = [...new Set([...spec.data.map((t) => t.geojson), tpl].filter(isRef).map((v) => v.$asset))];
+  const loaded = Object.fromEntries(await Promise.all(refs.map(async (u) => [u, await get(u)])));
+  for (const t of spec.data) if (isRef(t.geojson)) t.geojson = loaded[t.geojson.$asset];
+  if (isRef(tpl)) spec.layout.template = loaded[tpl.$asset];
+  Plotly.newPlot("fig", spec.data, spec.layout, {{responsive: true}});
+}})();
+</script>
+</body>
+</html>
+"""
+
+
+def _digest(obj) -> tuple:
+    """Canonical JSON text + short sha256 so identical content gets identical names."""
+    text = json.dumps(obj, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return text, hashlib.sha256(text.encode("utf-8")).hexdigest()[:12]
+
+
+def _put(asset_dir: Path, name: str, text: str) -> None:
+    p = asset_dir / name
+    if not p.exists():          # content-addressed: same name == same bytes
+        p.write_text(text, encoding="utf-8")
+
+
+@lru_cache(maxsize=1)
+def _plotly_js() -> tuple:
+    # the plotly.js the figure JSON was written for (not the Python package's version)
+    text = get_plotlyjs()
+    return text, f"plotly-{get_plotlyjs_version()}.{hashlib.sha256(text.encode('utf-8')).hexdigest()[:12]}.min.js"
+
+
+def write_html(fig, out_html, title: str | None = None) -> Path:
+    out_html = Path(out_html)
+    asset_dir = out_html.parent / ASSET_DIR
+    asset_dir.mkdir(parents=True, exist_ok=True)
+
+    spec = json.loads(pio.to_json(fig, validate=False))
+    used = []
+    for tr in spec.get("data", []):
+        gj = tr.get("geojson")
+        if isinstance(gj, dict):
+            text, h = _digest(gj)
+            name = f"geo.{h}.json"
+            _put(asset_dir, name, text)
+            tr["geojson"] = {"$asset": f"{ASSET_DIR}/{name}"}
+            used.append(name)
+
+    # the plotly theme is identical across pages -> share it too
+    layout = spec.get("layout", {})
+    if isinstance(layout.get("template"), dict):
+        text, h = _digest(layout["template"])
+        name = f"template.{h}.json"
+        _put(asset_dir, name, text)
+        layout["template"] = {"$asset": f"{ASSET_DIR}/{name}"}
+        used.append(name)
+
+    js_text, js_name = _plotly_js()
+    _put(asset_dir, js_name, js_text)
+    used.append(js_name)
+
+    text, h = _digest({"data": spec.get("data", []), "layout": layout})
+    spec_name = f"{out_html.stem}.{h}.json"
+    _put(asset_dir, spec_name, text)
+    used.append(spec_name)
+
+    if title is None:
+        t = layout.get("title", {})
+        title = (t.get("text") if isinstance(t, dict) else t) or out_html.stem
+    out_html.write_text(
+        _PAGE.format(title=html.escape(title), plotly_js=f"{ASSET_DIR}/{js_name}", spec=f"{ASSET_DIR}/{spec_name}"),
+        encoding="utf-8",
+    )
+
+    man_path = asset_dir / "manifest.json"
+    man = json.loads(man_path.read_text()) if man_path.exists() else {}
+    man[out_html.name] = sorted(set(used))
+    man_path.write_text(json.dumps(man, indent=2, sort_keys=True))
+    return out_html
@@ -0,0 +1,209 @@
+# scripts/spatial.py
+# Neighbour graphs for zone layers and spatial autocorrelation of per-zone values.
+#
+#   from spatial import weights, morans_i, gi_star
+#   w = weights("ta")                                  # queen contiguity (or kind="knn", k=6)
+#   x = w.align(df.set_index("ta_code_str")["radiance_mean"])   # values in graph order
+#   morans_i(x.values, x.W)                            # global: I, E[I], z, p_sim
+#   gi_star(x.values, x.W)                             # local hot/cold spots per zone
+#
+# The graph is built once per boundary vintage and cached as a sparse matrix under
+# data_proc/cache/spatial_weights (keyed by layer, kind, k and the boundary file's
+# fingerprint). Contiguity: polygons within TOUCH_M of each other in NZTM (the
+# simplified boundaries don't share vertices exactly), found in one bulk STRtree
+# query. kNN: nearest centroids in NZTM via a KD-tree. Zones with no contiguous
+# neighbour (Chatham Islands) are linked to their nearest zone.
+#
+# Permutation inference runs in blocks: a (n_zones, B) matrix of permuted values
+# goes through one sparse mat-mat product (W @ Z) per block, so there is no
+# per-permutation or per-zone loop, and block width shrinks with n so ~57k
+# meshblocks stay within a few hundred MB. Local tests permute the whole map and
+# hold each zone's own value fixed (the usual conditional permutation, drawn
+# jointly for all zones).
+
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import shapely
+from pyproj import Transformer
+from scipy import sparse
+from scipy.spatial import cKDTree
+from shapely.geometry import shape
+
+from geo_registry import GEOGRAPHIES
+from lawa_io import CACHE_DIR, fingerprint
+
+WEIGHTS_DIR = CACHE_DIR / "spatial_weights"
+METRIC_CRS = "EPSG:2193"             # NZTM, metres
+TOUCH_M = 50.0                       # contiguity tolerance for simplified boundaries
+BLOCK_CELLS = 5_000_000              # n_zones × permutations evaluated per block
+
+
+class Weights:
+    """Row-standardised sparse neighbour matrix W with zone ids in row order."""
+
+    def __init__(self, ids: np.ndarray, B: sparse.csr_matrix, kind: str):
+        self.ids = np.asarray(ids, dtype=object)
+        self.B = B.tocsr()                                     # binary, symmetric for contiguity
+        self.kind = kind
+        deg = np.asarray(self.B.sum(axis=1)).ravel()
+        self.islands = self.ids[deg == 0]
+        self.W = sparse.diags(np.where(deg > 0, 1.0 / np.maximum(deg, 1), 0.0)) @ self.B
+
+    @property
+    def n(self) -> int:
+        return len(self.ids)
+
+    def subset(self, ids) -> "Weights":
+        """Graph restricted to `ids` (in that order); rows re-standardised."""
+        pos = pd.Index(self.ids).get_indexer(list(ids))
+        if (pos < 0).any():
+            raise KeyError(f"ids not in the graph: {list(np.asarray(ids, dtype=object)[pos < 0])[:5]}")
+        return Weights(self.ids[pos], self.B[pos][:, pos], self.kind)
+
+    def align(self, values: pd.Series) -> "Aligned":
+        """Values indexed by zone id -> graph restricted to zones with a value."""
+        v = values[values.notna()]
+        v = v[~v.index.duplicated()]
+        keep = [i for i in self.ids if i in v.index]
+        missing = len(self.ids) - len(keep)
+        if missing:
+            print(f"ℹ️ {missing} zone(s) without a value left out of the graph")
+        w = self.subset(keep)
+        return Aligned(w.ids, v.reindex(w.ids).to_numpy("float64"), w.W)
+
+
+class Aligned:
+    def __init__(self, ids, values, W):
+        self.ids, self.values, self.W = ids, values, W
+
+
+# ---------- graph construction ----------
+def _load_layer(path: Path, code_prop: str, pad: int) -> tuple:
+    with open(path) as f:
+        feats = json.load(f)["features"]
+    ids = np.array([str(ft["properties"][code_prop]).zfill(pad) for ft in feats], dtype=object)
+    to_m = Transformer.from_crs("EPSG:4326", METRIC_CRS, always_xy=True)
+    geoms = shapely.transform([shape(ft["geometry"]) for ft in feats],
+                              lambda xy: np.column_stack(to_m.transform(xy[:, 0], xy[:, 1])))
+    return ids, geoms
+
+
+def _knn(xy: np.ndarray, k: int) -> tuple:
+    k = min(k, len(xy) - 1)
+    _, nn = cKDTree(xy).query(xy, k=k + 1)
+    rows = np.repeat(np.arange(len(xy)), k)
+    return rows, nn[:, 1:].ravel()
+
+
+def _contiguity(geoms: np.ndarray, xy: np.ndarray, tol: float) -> tuple:
+    a, b = shapely.STRtree(geoms).query(geoms, predicate="dwithin", distance=tol)
+    keep = a != b
+    a, b = a[keep], b[keep]
+    lonely = np.setdiff1d(np.arange(len(geoms)), a)
+    if len(lonely):                                              # islands -> nearest zone
+        ra, rb = _knn(xy, 1)
+        link = np.isin(ra, lonely)
+        a, b = np.concatenate([a, ra[link], rb[link]]), np.concatenate([b, rb[link], ra[link]])
+    return a, b
+
+
+def build_weights(path: Path, code_prop: str, kind: str = "queen", k: int = 6,
+                  pad: int = 0, tol: float = TOUCH_M) -> Weights:
+    ids, geoms = _load_layer(path, code_prop, pad)
+    xy = shapely.get_coordinates(shapely.point_on_surface(geoms))
+    if kind == "queen":
+        a, b = _contiguity(geoms, xy, tol)
+    elif kind == "knn":
+        a, b = _knn(xy, k)
+    else:
+        raise ValueError(f"kind must be 'queen' or 'knn', not {kind!r}")
+    n = len(ids)
+    B = sparse.csr_matrix((np.ones(len(a)), (a, b)), shape=(n, n))
+    B.data[:] = 1.0                                              # duplicate pairs summed -> binary
+    return Weights(ids, B, kind)
+
+
+def weights(layer: str = "ta", kind: str = "queen", k: int = 6, path: Path | None = None,
+            code_prop: str | None = None) -> Weights:
+    """Neighbour graph for a registered layer (or any boundary GeoJSON), cached."""
+    if path is None:
+        path, code_prop, _ = GEOGRAPHIES[layer]
+    path = Path(path)
+    pad = {"ta": 3, "regional_council": 2}.get(layer, 0)
+    tag = f"{kind}{k}" if kind == "knn" else kind
+    cache = WEIGHTS_DIR / f"{layer}_{tag}_{fingerprint(path)}.npz"
+    if cache.exists():
+        z = np.load(cache, allow_pickle=True)
+        B = sparse.csr_matrix((z["data"], z["indices"], z["indptr"]), shape=(len(z["ids"]),) * 2)
+        return Weights(z["ids"], B, kind)
+    w = build_weights(path, code_prop, kind, k, pad)
+    WEIGHTS_DIR.mkdir(parents=True, exist_ok=True)
+    np.savez_compressed(cache, ids=w.ids, data=w.B.data, indices=w.B.indices, indptr=w.B.indptr)
+    return w
+
+
+# ---------- statistics ----------
+def _perm_blocks(n: int, n_perm: int, seed: int):
+    """Yield (n, b) index matrices, each column a permutation of range(n)."""
+    rng = np.random.default_rng(seed)
+    step = max(1, BLOCK_CELLS // max(n, 1))
+    for i in range(0, n_perm, step):
+        b = min(step, n_perm - i)
+        yield rng.permuted(np.tile(np.arange(n), (b, 1)), axis=1).T
+
+
+def morans_i(x: np.ndarray, W: sparse.spmatrix, n_perm: int = 9_999, seed: int = 42) -> dict:
+    """Global Moran's I with a pseudo p-value from n_perm permutations (one-sided, toward the observed sign)."""
+    x = np.asarray(x, dtype="float64")
+    n = len(x)
+    z = x - x.mean()
+    s0 = W.sum()
+    zz = z @ z
+    I = n / s0 * (z @ (W @ z)) / zz
+    EI = -1.0 / (n - 1)
+
+    sims = []
+    for P in _perm_blocks(n, n_perm, seed):
+        Z = z[P]                                                  # (n, b)
+        sims.append(n / s0 * np.einsum("ij,ij->j", Z, W @ Z) / zz)
+    sims = np.concatenate(sims) if sims else np.array([])
+    larger = (sims >= I).sum() if I >= EI else (sims <= I).sum()
+    return {"I": float(I), "EI": EI, "z_sim": float((I - sims.mean()) / sims.std()) if len(sims) else np.nan,
+            "p_sim": float((larger + 1) / (len(sims) + 1)), "n": n, "n_perm": len(sims)}
+
+
+def gi_star(x: np.ndarray, W: sparse.spmatrix, n_perm: int = 999, seed: int = 42,
+            alpha: float = 0.05) -> pd.DataFrame:
+    """
+    Getis–Ord Gi* per zone (each zone's own value included, binary weights):
+    gi_z (analytical z-score), p_sim (folded two-sided pseudo p-value) and
+    spot ("hot" / "cold" where p_sim < alpha).
+    """
+    x = np.asarray(x, dtype="float64")
+    n = len(x)
+    Bs = (W != 0).astype("float64")
+    Bs = (Bs + sparse.identity(n, format="csr")).tocsr()
+    Bs.data[:] = 1.0
+    wi = np.asarray(Bs.sum(axis=1)).ravel()                       # Σ_j w_ij (incl. self)
+    xbar, s = x.mean(), x.std()
+    # binary weights: Σ_j w_ij² = Σ_j w_ij
+    mean_lag = (xbar * wi)[:, None]
+    denom = (s * np.sqrt((n * wi - wi ** 2) / (n - 1)))[:, None]
+
+    obs = ((Bs @ x)[:, None] - mean_lag) / denom
+
+    # permuted lags with each zone's own value held fixed: Bs @ Z − Z_self + x_self
+    ge = np.zeros(n)
+    total = 0
+    for P in _perm_blocks(n, n_perm, seed):
+        Z = x[P]
+        sim = (Bs @ Z - Z + x[:, None] - mean_lag) / denom
+        ge += (np.abs(sim) >= np.abs(obs)).sum(axis=1)
+        total += Z.shape[1]
+    obs = obs[:, 0]
+    p = (ge + 1) / (total + 1)
+    spot = np.where(p < alpha, np.where(obs > 0, "hot", "cold"), "")
+    return pd.DataFrame({"gi_z": obs, "p_sim": p, "spot": spot})
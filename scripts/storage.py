@@ -0,0 +1,152 @@
+# scripts/storage.py
+# Typed columnar storage for data_proc tables. Stages keep naming their outputs by
+# the familiar CSV path; the table itself is written next to it as Parquet.
+#
+#   from storage import save, load
+#   save(df, "data_proc/air_annual_by_site.csv")     # -> .parquet (+ .csv if exported)
+#   df = load("data_proc/air_annual_by_site.csv", columns=["lawa_site_id", "year", "mean_ugm3"])
+#
+# Types come from one registry keyed by column name (COLUMN_TYPES): text labels are
+# categoricals, TA codes are fixed-width strings ('001'), dates are datetime64, years
+# int16, shares float32. save() applies them and records the applied schema in the
+# Parquet metadata (read it back with schema()); load() is a column-projected
+# Parquet read with nothing left to parse. A table read from an older CSV (or one
+# only committed as CSV, as on the deployed app) gets the same types on load, and
+# ta_code_str is derived from ta_code when a file only has the integer code.
+#
+# CSV stays as an export: tables in CSV_EXPORT (committed to the repo / read by the
+# app and GitHub Pages) are also written as CSV, as is every table when ALAN_CSV=1
+# or save(..., csv=True). load() prefers the Parquet file unless the CSV is newer.
+
+import json
+import os
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+SCHEMA_KEY = b"alan_nz.schema"
+
+COLUMN_TYPES = {
+    # fixed-width codes
+    "ta_code_str": "code3",
+    "TA_CODE": "code3",
+    "ta_code": "int16",
+    # labels
+    **{c: "category" for c in [
+        "region", "agency", "town", "site_name", "lawa_site_id", "site_type", "indicator",
+        "freq", "period", "label", "health_region", "regional_council", "ethnicity", "year_to",
+        "ta_name", "measure", "indicator_label", "method", "trend", "exposure", "outcome",
+        "stat", "control", "metric", "spot", "survey"]},
+    # dates
+    **{c: "datetime" for c in ["sample_date", "first_date", "last_date", "start", "end"]},
+    # small integers
+    **{c: "int16" for c in ["year", "viirs_year", "first_year", "last_year", "n_years"]},
+    **{c: "int32" for c in ["n_sites", "days_measured", "days_in_period", "n_months", "n_obs",
+                            "n_clusters"]},
+    # shares / coverage: float32 is plenty
+    **{c: "float32" for c in ["coverage", "mean_coverage", "pct_coverage", "boot_valid"]},
+}
+# columns filled in on load from another column when a file lacks them
+DERIVED = {"ta_code_str": "ta_code"}
+# tables also written as CSV (committed; read by the deployed app / GitHub Pages)
+CSV_EXPORT = {
+    "air_annual_by_region", "air_annual_by_site", "air_thresholds_by_site",
+    "air_obesity_by_health_region_2023", "air_obesity_deprivation_2023", "association_stats",
+    "brightness_by_health_region", "obesity_by_region_ethnicity", "obesity_vs_brightness_by_region",
+    "viirs_ta_2021_normalized", "viirs_ta_annual_2021", "viirs_ta_annual_2021_with_names",
+    "viirs_ta_timeseries_2014_2023",
+}
+
+
+def _code3(s: pd.Series) -> pd.Series:
+    num = pd.to_numeric(s, errors="coerce")
+    txt = s.astype("string").str.strip()
+    txt = txt.where(num.isna(), num.astype("Int64").astype("string"))
+    return txt.str.zfill(3).astype("category")
+
+
+def _cast(s: pd.Series, kind: str) -> pd.Series:
+    if kind == "category":
+        return s if isinstance(s.dtype, pd.CategoricalDtype) else s.astype("category")
+    if kind == "code3":
+        return _code3(s)
+    if kind == "datetime":
+        return s if pd.api.types.is_datetime64_any_dtype(s) else pd.to_datetime(s, errors="coerce")
+    num = pd.to_numeric(s, errors="coerce")
+    if kind.startswith("int"):
+        return num.astype(kind if num.notna().all() else kind.capitalize())
+    return num.astype(kind)
+
+
+def typed(df: pd.DataFrame) -> pd.DataFrame:
+    """Apply COLUMN_TYPES to the columns df has (others are left as they are)."""
+    cols = {c: _cast(df[c], COLUMN_TYPES[c]) for c in df.columns if c in COLUMN_TYPES}
+    return df.assign(**cols) if cols else df
+
+
+def parquet_path(path) -> Path:
+    return Path(path).with_suffix(".parquet")
+
+
+def csv_path(path) -> Path:
+    return Path(path).with_suffix(".csv")
+
+
+def save(df: pd.DataFrame, path, csv: bool | None = None) -> Path:
+    """Write df typed to <path>.parquet (and <path>.csv if exported); returns the Parquet path."""
+    path = Path(path)
+    df = typed(df.reset_index(drop=True))
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    applied = {c: COLUMN_TYPES.get(c, str(df[c].dtype)) for c in df.columns}
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}),
+                                           SCHEMA_KEY: json.dumps(applied).encode()})
+    pq_path = parquet_path(path)
+    pq_path.parent.mkdir(parents=True, exist_ok=True)
+    if csv or (csv is None and (path.stem in CSV_EXPORT or os.environ.get("ALAN_CSV") == "1")):
+        df.to_csv(csv_path(path), index=False)          # before the Parquet, so it isn't "newer"
+    tmp = pq_path.with_suffix(".tmp")
+    pq.write_table(table, tmp)
+    os.replace(tmp, pq_path)
+    return pq_path
+
+
+def schema(path) -> dict:
+    """Column -> type recorded when the table was saved ({} for files from elsewhere)."""
+    meta = pq.read_schema(parquet_path(path)).metadata or {}
+    return json.loads(meta[SCHEMA_KEY]) if SCHEMA_KEY in meta else {}
+
+
+def exists(path) -> bool:
+    return parquet_path(path).exists() or csv_path(path).exists()
+
+
+def load(path, columns: list | None = None) -> pd.DataFrame:
+    """Typed table (only `columns`, if given) from Parquet, or from the CSV when that is all there is / newer."""
+    pq_file, csv_file = parquet_path(path), csv_path(path)
+    use_pq = pq_file.exists() and (not csv_file.exists()
+                                   or pq_file.stat().st_mtime >= csv_file.stat().st_mtime)
+    if not use_pq and not csv_file.exists():
+        raise FileNotFoundError(f"No {pq_file.name} or {csv_file.name} in {pq_file.parent}")
+
+    if use_pq:
+        have = pq.read_schema(pq_file).names
+    else:
+        have = list(pd.read_csv(csv_file, nrows=0).columns)
+    derive = {c: DERIVED[c] for c in (columns or []) if c not in have and DERIVED.get(c) in have}
+    if columns is None:
+        derive = {c: src for c, src in DERIVED.items() if c not in have and src in have}
+    read = None if columns is None else [c for c in dict.fromkeys(list(columns) + list(derive.values()))
+                                         if c in have]
+    missing = [c for c in (columns or []) if c not in have and c not in derive]
+    if missing:
+        raise KeyError(f"{Path(path).stem}: no column(s) {missing}")
+
+    if use_pq:
+        df = pd.read_parquet(pq_file, columns=read)
+    else:
+        text = {c: str for c in (read or have) if COLUMN_TYPES.get(c) in ("code3", "category")}
+        df = pd.read_csv(csv_file, usecols=read, dtype=text)
+    df = typed(df.assign(**{c: df[src] for c, src in derive.items()}))
+    return df[columns] if columns is not None else df
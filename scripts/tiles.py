@@ -0,0 +1,158 @@
+# scripts/tiles.py
+# Web-Mercator XYZ tile helpers shared by the tile builders (33_*, 21_*)
+# plus a small MapLibre page template used by docs/ and the Streamlit app.
+
+import json
+import math
+
+import numpy as np
+
+R = 6378137.0
+ORIGIN = math.pi * R   # half the world width in metres (EPSG:3857)
+
+
+# ---------- tile math ----------
+def lonlat_to_merc(lon, lat):
+    """lon/lat (degrees, scalars or arrays) -> EPSG:3857 metres."""
+    lon = np.asarray(lon, dtype="float64")
+    lat = np.clip(np.asarray(lat, dtype="float64"), -85.0511, 85.0511)
+    return lon * math.pi / 180 * R, R * np.log(np.tan(math.pi / 4 + lat * math.pi / 360))
+
+
+def merc_to_lonlat(x, y):
+    x = np.asarray(x, dtype="float64")
+    y = np.asarray(y, dtype="float64")
+    return x / R * 180 / math.pi, (2 * np.arctan(np.exp(y / R)) - math.pi / 2) * 180 / math.pi
+
+
+def tile_size_m(z: int) -> float:
+    return 2 * ORIGIN / 2 ** z
+
+
+def tile_bounds(z: int, x: int, y: int) -> tuple:
+    """(minx, miny, maxx, maxy) of tile z/x/y in EPSG:3857 metres."""
+    size = tile_size_m(z)
+    minx = -ORIGIN + x * size
+    maxy = ORIGIN - y * size
+    return (minx, maxy - size, minx + size, maxy)
+
+
+def tile_range(bounds_merc: tuple, z: int) -> tuple:
+    """Inclusive (x0, y0, x1, y1) tile indices covering a 3857 bbox at zoom z."""
+    minx, miny, maxx, maxy = bounds_merc
+    size = tile_size_m(z)
+    n = 2 ** z
+    x0 = int(max(0, math.floor((minx + ORIGIN) / size)))
+    x1 = int(min(n - 1, math.floor((maxx + ORIGIN) / size)))
+    y0 = int(max(0, math.floor((ORIGIN - maxy) / size)))
+    y1 = int(min(n - 1, math.floor((ORIGIN - miny) / size)))
+    return x0, y0, x1, y1
+
+
+# NZ mainland + Chathams west of the antimeridian (lon/lat)
+NZ_BOUNDS = (165.8, -47.4, 178.7, -34.3)
+
+
+# ---------- MapLibre page ----------
+MAPLIBRE_VERSION = "4.7.1"
+
+_PAGE = """<!doctype html>
+<html lang="en">
+<head>
+  <meta charset="utf-8" />
+  <title>{title}</title>
+  <meta name="viewport" content="width=device-width, initial-scale=1" />
+  <link href="https://unpkg.com/maplibre-gl@{ver}/dist/maplibre-gl.css" rel="stylesheet" />
+  <script src="https://unpkg.com/maplibre-gl@{ver}/dist/maplibre-gl.js"></script>
+  <style>
+    html,body,#map{{margin:0;height:100%;font:13px system-ui,-apple-system,Segoe UI,Roboto,Arial}}
+    .legend{{position:absolute;bottom:24px;left:10px;background:#fff;padding:8px 10px;border-radius:6px;
+             box-shadow:0 1px 4px rgba(0,0,0,.3)}}
+    .legend .bar{{height:10px;width:180px;background:linear-gradient(to right,{gradient})}}
+    .legend .ticks{{display:flex;justify-content:space-between}}
+  </style>
+</head>
+<body>
+<div id="map"></div>
+{legend_html}
+<script>
+const CFG = {cfg};
+const abs = (u) => new URL(u, window.location.href).href;   // MapLibre wants absolute tile URLs
+const map = new maplibregl.Map({{
+  container: "map",
+  style: "https://basemaps.cartocdn.com/gl/positron-gl-style/style.json",
+  center: CFG.center, zoom: CFG.zoom,
+}});
+map.on("load", () => {{
+  for (const r of CFG.rasters) {{
+    map.addSource(r.id, {{type: "raster", tiles: [abs(r.url)], tileSize: 256,
+                         minzoom: r.minzoom, maxzoom: r.maxzoom}});
+    map.addLayer({{id: r.id, type: "raster", source: r.id, paint: {{"raster-opacity": r.opacity}}}});
+  }}
+  if (!CFG.vector) return;
+  const v = CFG.vector;
+  map.addSource("zones", {{type: "vector", tiles: [abs(v.url)], minzoom: v.minzoom, maxzoom: v.maxzoom,
+                           promoteId: {{[v.layer]: "zone_id"}}}});
+  // join values to tile features by zone id, entirely client-side
+  // (feature state is kept per id and applied to tiles as they arrive)
+  for (const [id, val] of Object.entries(v.values)) {{
+    map.setFeatureState({{source: "zones", sourceLayer: v.layer, id}}, {{value: val}});
+  }}
+  map.addLayer({{id: "zones-fill", type: "fill", source: "zones", "source-layer": v.layer,
+    paint: {{"fill-opacity": v.opacity,
+            "fill-color": ["case", ["==", ["feature-state", "value"], null], "rgba(0,0,0,0)",
+                           ["interpolate", ["linear"], ["feature-state", "value"], ...v.stops]]}}}});
+  map.addLayer({{id: "zones-line", type: "line", source: "zones", "source-layer": v.layer,
+    paint: {{"line-color": "#000", "line-width": 0.4}}}});
+  const popup = new maplibregl.Popup({{closeButton: false}});
+  map.on("mousemove", "zones-fill", (e) => {{
+    const f = e.features[0]; const val = v.values[f.properties.zone_id];
+    popup.setLngLat(e.lngLat).setHTML(`<b>${{f.properties.name || f.properties.zone_id}}</b><br>` +
+      (val == null ? "no data" : `${{v.label}}: ${{val.toFixed(3)}}`)).addTo(map);
+  }});
+  map.on("mouseleave", "zones-fill", () => popup.remove());
+}});
+</script>
+</body>
+</html>
+"""
+
+_LEGEND = """<div class="legend"><b>{legend}</b><div class="bar"></div>
+  <div class="ticks"><span>{lo}</span><span>{hi}</span></div></div>"""
+
+VIRIDIS = ["#440154", "#3b528b", "#21918c", "#5ec962", "#fde725"]
+
+
+def maplibre_page(title: str, center: tuple = (-41.2, 173.0), zoom: float = 4.4,
+                  vector: dict | None = None, rasters: list | None = None,
+                  legend: str = "", colors: list = VIRIDIS,
+                  legend_ticks: tuple | None = None) -> str:
+    """
+    Build a standalone MapLibre page.
+      vector  = {"url": ".../{z}/{x}/{y}.pbf", "layer": "ta", "values": {zone_id: value},
+                 "label": "...", "minzoom": 3, "maxzoom": 12, "opacity": 0.75}
+      rasters = [{"id": "viirs", "url": ".../{z}/{x}/{y}.png", "minzoom": 3, "maxzoom": 10,
+                  "opacity": 0.9}]
+    Tile URLs may be relative to the page. The legend follows the vector values
+    unless `legend_ticks` (low, high labels) is given, e.g. for a raster-only page.
+    """
+    vmin = vmax = 0.0
+    if vector:
+        vals = [float(v) for v in vector["values"].values() if v is not None and v == v]
+        vmin, vmax = (min(vals), max(vals)) if vals else (0.0, 1.0)
+        step = (vmax - vmin) / (len(colors) - 1) or 1.0
+        stops = []
+        for i, c in enumerate(colors):
+            stops += [vmin + i * step, c]
+        vector = {"minzoom": 3, "maxzoom": 12, "opacity": 0.75, "label": legend,
+                  **vector, "stops": stops}
+        vector["values"] = {k: (None if v is None or v != v else float(v))
+                            for k, v in vector["values"].items()}
+    cfg = {"center": [center[1], center[0]], "zoom": zoom,
+           "vector": vector, "rasters": rasters or []}
+    legend_html = ""
+    if legend_ticks or vector:
+        lo, hi = legend_ticks or (f"{vmin:.2f}", f"{vmax:.2f}")
+        legend_html = _LEGEND.format(legend=legend or title, lo=lo, hi=hi)
+    return _PAGE.format(title=title, ver=MAPLIBRE_VERSION, legend_html=legend_html,
+                        gradient=",".join(colors), cfg=json.dumps(cfg, ensure_ascii=False))
@@ -0,0 +1,93 @@
+# scripts/viirs_store.py
+# Annual VIIRS radiance per TA as a typed, year-partitioned Parquet store:
+#   data_proc/viirs_ta_store/year=<yyyy>/part.parquet   (ta_code int16, ta_name, radiance_mean)
+#
+#   from viirs_store import write_year, read_viirs
+#   write_year(df, 2023)                                # 20b: one run = one partition
+#   ts = read_viirs(years=range(2016, 2024), tas=[76, 60])   # viirs_year, ta_code, ta_name, radiance_mean
+#
+# A year's partition is only ever written whole (to a temp file, then renamed), so
+# re-running a year replaces it and nothing else is touched. Rows are validated
+# against SCHEMA before the write — required columns, integer TA codes with no
+# duplicates, numeric radiance — so every partition reads back with the same types
+# and no reader has to sniff column names. read_viirs() skips years by directory
+# name and pushes the TA filter into the Parquet read.
+
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+ROOT = Path(__file__).resolve().parents[1]
+VIIRS_STORE = ROOT / "data_proc" / "viirs_ta_store"
+SCHEMA = pa.schema([
+    ("ta_code", pa.int16()),
+    ("ta_name", pa.string()),
+    ("radiance_mean", pa.float64()),
+])
+COLUMNS = ["viirs_year"] + SCHEMA.names
+
+
+def year_path(year: int) -> Path:
+    return VIIRS_STORE / f"year={int(year)}" / "part.parquet"
+
+
+def years() -> list:
+    return sorted(int(p.parent.name.split("=", 1)[1]) for p in VIIRS_STORE.glob("year=*/part.parquet"))
+
+
+def validate(df: pd.DataFrame, year: int) -> pa.Table:
+    """Rows for one year -> Arrow table in SCHEMA; ValueError on anything off-schema."""
+    missing = [c for c in SCHEMA.names if c not in df.columns]
+    if missing:
+        raise ValueError(f"VIIRS {year}: missing column(s) {missing}")
+    if "viirs_year" in df.columns and (df["viirs_year"] != year).any():
+        raise ValueError(f"VIIRS {year}: rows for other years {sorted(set(df['viirs_year']) - {year})}")
+    code = pd.to_numeric(df["ta_code"], errors="coerce")
+    bad = code.isna() | (code % 1 != 0) | ~code.between(1, 999)
+    if bad.any():
+        raise ValueError(f"VIIRS {year}: TA codes must be integers 1–999, got {df.loc[bad, 'ta_code'].tolist()[:5]}")
+    if code.duplicated().any():
+        raise ValueError(f"VIIRS {year}: duplicate TA codes {sorted(code[code.duplicated()].astype(int))[:5]}")
+    rad = pd.to_numeric(df["radiance_mean"], errors="coerce")
+    if (rad.isna() & df["radiance_mean"].notna()).any():
+        raise ValueError(f"VIIRS {year}: non-numeric radiance_mean")
+    out = pd.DataFrame({"ta_code": code.astype("int16"), "ta_name": df["ta_name"].astype(str).str.strip(),
+                        "radiance_mean": rad.astype("float64")}).sort_values("ta_code")
+    return pa.Table.from_pandas(out, schema=SCHEMA, preserve_index=False)
+
+
+def write_year(df: pd.DataFrame, year: int) -> Path:
+    """Validate and (re)place one year's partition."""
+    table = validate(df, year)
+    path = year_path(year)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    pq.write_table(table, tmp)
+    os.replace(tmp, path)
+    return path
+
+
+def read_viirs(years: list | range | None = None, tas: list | None = None,
+               columns: list | None = None) -> pd.DataFrame:
+    """Rows for the given years / TA codes (None = all); viirs_year is an int column."""
+    wanted = set(int(y) for y in years) if years is not None else None
+    cols = [c for c in (columns or COLUMNS) if c != "viirs_year"]
+    filters = [("ta_code", "in", [int(t) for t in tas])] if tas is not None else None
+    parts = []
+    for p in sorted(VIIRS_STORE.glob("year=*/part.parquet")):
+        yr = int(p.parent.name.split("=", 1)[1])
+        if wanted is not None and yr not in wanted:
+            continue
+        t = pq.read_table(p, columns=cols, filters=filters, schema=SCHEMA)
+        parts.append(t.to_pandas().assign(viirs_year=np.int16(yr)))
+    if not parts:
+        return pd.DataFrame({c: pd.Series(dtype=d) for c, d in
+                             [("viirs_year", "int16"), ("ta_code", "int16"), ("ta_name", object),
+                              ("radiance_mean", "float64")] if c in (columns or COLUMNS)})
+    df = pd.concat(parts, ignore_index=True)
+    return df[columns or COLUMNS].sort_values([c for c in ("ta_code", "viirs_year") if c in df.columns],
+                                               ignore_index=True)
@@ -0,0 +1,68 @@
+# scripts/zonal.py
+# Shared raster -> TA -> health-region aggregation, so every gridded layer (VIIRS
+# radiance, interpolated PM surfaces, ...) gets exactly the same geometry.
+#
+#   from zonal import zonal_means, to_health_region
+#   ta = zonal_means("data_raw/viirs_annual_2021.tif")          # ta_code_str, ta_name, mean
+#   hr = to_health_region(ta.rename(columns={"mean": "radiance_mean"}), "radiance_mean")
+#                                                    # health_region, health_region_code, radiance_mean
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import rasterio
+from rasterio.mask import mask
+
+from geo_registry import CODE_PROP, TA_GEOJSON, TA_HR_LUT, codes, load_ta, names
+
+
+def zonal_means(tif_path, ta_path: Path = TA_GEOJSON, drop_negative: bool = True) -> pd.DataFrame:
+    """Mean of valid raster cells inside each TA polygon (NaN if none)."""
+    tif_path = Path(tif_path)
+    if not tif_path.exists():
+        raise FileNotFoundError(f"Missing raster: {tif_path}")
+    features, code_to_name = load_ta(ta_path)
+
+    recs = []
+    with rasterio.open(tif_path) as src:
+        nodata = src.nodata
+        for feat in features:
+            code = str(feat["properties"][CODE_PROP]).zfill(3)
+            try:
+                data, _ = mask(src, [feat["geometry"]], crop=True, filled=True)
+            except ValueError:          # polygon outside the raster
+                recs.append({"ta_code_str": code, "mean": np.nan})
+                continue
+
+            arr = data[0].astype("float32")
+            if nodata is not None:
+                arr[arr == nodata] = np.nan
+            if drop_negative:
+                arr[arr < 0] = np.nan
+            mean_val = float(np.nanmean(arr)) if np.isfinite(arr).any() else np.nan
+            recs.append({"ta_code_str": code, "mean": mean_val})
+
+    df = pd.DataFrame(recs)
+    df.insert(1, "ta_name", df["ta_code_str"].map(code_to_name))
+    return df
+
+
+def to_health_region(ta: pd.DataFrame, value_col: str, lut_path: Path = TA_HR_LUT) -> pd.DataFrame:
+    """Mean of TA values per Health NZ region (TA code -> region through the LUT)."""
+    lut = pd.read_csv(lut_path)
+    lut = pd.DataFrame({"ta_code": codes(lut["ta_name"], "ta"),
+                        "health_region_code": codes(lut["health_region"], "health_region")})
+    lut = lut[(lut["ta_code"] >= 0) & (lut["health_region_code"] >= 0)].drop_duplicates("ta_code")
+
+    m = ta.assign(ta_code=pd.to_numeric(ta["ta_code_str"]).astype("int64")).merge(lut, on="ta_code", how="left")
+    missing = sorted(m.loc[m["health_region_code"].isna(), "ta_name"].dropna().astype(str).unique())
+    if missing:
+        print(f"⚠️ TAs missing from lookup (add to data_raw/{lut_path.name}):")
+        for x in missing:
+            print(" -", x)
+
+    m = m.dropna(subset=["health_region_code"]).astype({"health_region_code": "int64"})
+    out = m.groupby("health_region_code", as_index=False)[value_col].mean()
+    out.insert(0, "health_region", names(out["health_region_code"], "health_region"))
+    return out
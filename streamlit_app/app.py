@@ -1,10 +1,13 @@
 # streamlit_app/app.py
 import json
+import os
+import sys
 from pathlib import Path
 
 import pandas as pd
 import plotly.express as px
 import streamlit as st
+import streamlit.components.v1 as components
 
 # -------------------------------------------------
 # App config
@@ -23,56 +26,126 @@ DATA_PROC = ROOT / "data_proc"
 DATA_RAW = ROOT / "data_raw"
 DOCS = ROOT / "docs"  # (fallbacks if you ever export figs to /docs)
 
+# shared helpers live next to the pipeline scripts
+sys.path.insert(0, str(ROOT / "scripts"))
+import geo_lod  # noqa: E402
+import lawa_io  # noqa: E402
+import panel_store  # noqa: E402
+import storage  # noqa: E402
+from tiles import maplibre_page  # noqa: E402
+
+# where scripts/34_serve_tiles.py (or any static host of docs/) serves the tile pyramids
+TILE_URL = os.environ.get("ALAN_TILE_URL", "http://localhost:8765").rstrip("/")
+
+# Night-lights map views: label -> (center (lat, lon), zoom)
+MAP_VIEWS = {
+    "All of New Zealand": ((-41.2, 173.0), 4.2),
+    "Auckland": ((-36.87, 174.77), 9.0),
+    "Wellington": ((-41.22, 174.88), 9.0),
+    "Christchurch": ((-43.53, 172.64), 9.0),
+    "Hamilton / Tauranga": ((-37.75, 175.75), 8.0),
+}
+
 # -------------------------------------------------
 # Helpers
 # -------------------------------------------------
 @st.cache_data(show_spinner=False)
 def load_csv(path: Path) -> pd.DataFrame:
-    return pd.read_csv(path)
+    # typed Parquet locally, the committed CSV on deploy; labels back to plain objects for plotly
+    df = storage.load(path)
+    return df.astype({c: object for c in df.select_dtypes("category").columns})
 
 @st.cache_data(show_spinner=False)
 def load_json(path: Path) -> dict:
     with open(path) as f:
         return json.load(f)
 
+@st.cache_data(show_spinner=False)
+def load_ta_geojson(zoom: float, center: tuple | None) -> dict:
+    """Smallest TA geometry level good enough for this zoom/extent (see scripts/geo_lod.py)."""
+    return geo_lod.load_layer("ta", zoom=zoom, center=center)
+
 @st.cache_data(show_spinner=False)
 def load_lawa_annual(path_xlsx: Path) -> pd.DataFrame:
     """
-    Load LAWA Excel and return annual means by region for a chosen year.
-    Works with the 2016–2024 download you saved.
+    Annual means by region/indicator from the LAWA 2016–2024 download.
+    Reads the Parquet cache built by scripts/lawa_io.py (the Excel is parsed once).
     """
-    import re
-    xls = pd.ExcelFile(path_xlsx, engine="openpyxl")
-    sheets = xls.sheet_names
-    pref = [s for s in sheets if re.search(r"(data|monitor|dataset|pm|meas|observ)", s, re.I)]
-    sheet = pref[0] if pref else sheets[0]
-    df = xls.parse(sheet)
-
-    # Normalise columns
-    df.columns = [c.strip() for c in df.columns]
-    col_region = [c for c in df.columns if c.lower() in ("region", "regional council", "council")][0]
-    col_ind = [c for c in df.columns if "indicator" in c.lower()][0]
-    col_date = [c for c in df.columns if "sample date" in c.lower()][0]
-    col_value = [c for c in df.columns if "concentration" in c.lower()][0]
-
-    df[col_date] = pd.to_datetime(df[col_date], errors="coerce")
-    df["year"] = df[col_date].dt.year
+    df = lawa_io.load_lawa(path_xlsx, columns=["region", "indicator", "sample_date", "value_ugm3"])
+    df["year"] = df["sample_date"].dt.year
     df = df[df["year"].between(2016, 2100)]
 
     annual = (
-        df.groupby([col_region, "year", col_ind], as_index=False)[col_value]
+        df.groupby(["region", "year", "indicator"], as_index=False, observed=True)["value_ugm3"]
           .mean()
-          .rename(columns={
-              col_region: "region",
-              col_ind: "indicator",
-              col_value: "value_ugm3",
-          })
+          .astype({"region": str, "indicator": str, "year": int})
     )
     return annual
 
+def viirs_tile_layer() -> dict | None:
+    """Latest VIIRS pixel pyramid from scripts/21_render_viirs_tiles.py as a tile-layer spec."""
+    man_path = DOCS / "tiles" / "viirs" / "manifest.json"
+    if not man_path.exists():
+        return None
+    man = load_json(man_path)
+    years = sorted(k for k in man if k.isdigit())
+    if not years:
+        return None
+    o = man[years[-1]]["opts"]
+    return {"id": "viirs", "year": years[-1], "opacity": 0.85,
+            "url": f"{TILE_URL}/tiles/viirs/{years[-1]}/{{z}}/{{x}}/{{y}}.{o['fmt']}",
+            "minzoom": o["minzoom"], "maxzoom": o["maxzoom"]}
+
 def note_missing(path: Path, extra_text: str = ""):
     st.warning(f"Missing file: `{path.as_posix()}`. {extra_text}".strip())
 
+# Equity lens columns in the analysis panel (scripts/panel_store.py)
+PANEL_POLLUTANTS = {"PM2.5": "pm25_ugm3", "PM10": "pm10_ugm3"}
+EQUITY_COLS = ["obesity_rate", "obesity_rate_low", "obesity_rate_high", *PANEL_POLLUTANTS.values()]
+
+@st.cache_data(show_spinner=False)
+def load_equity_panel() -> pd.DataFrame:
+    """
+    Obesity × PM by health region / survey year / ethnicity from the analysis panel,
+    with NZDep attached per region. Reads only the equity-lens columns. Empty if the
+    panel hasn't been built (scripts/71, 72).
+    """
+    df = panel_store.read_panel("health_region", EQUITY_COLS).dropna(subset=["obesity_rate"])
+    if df.empty:
+        return df
+    df = panel_store.attach(df, "health_region", "nzdep_9_10_share")
+    df = df.rename(columns={"zone": "health_region", "period": "year_to"})
+    return df.astype({"health_region": str, "ethnicity": str})
+
+def show_associations(exposure: str, survey: str | None = None):
+    """r / slope / partial r with cluster-bootstrap CIs from scripts/74_association_stats.py."""
+    path = DATA_PROC / "association_stats.csv"
+    if not path.exists():
+        st.caption("Run scripts/74_association_stats.py for correlations with bootstrap CIs.")
+        return
+    a = load_csv(path)
+    a = a[a["exposure"] == exposure]
+    if survey is not None and (a["survey"].astype(str) == survey).any():
+        a = a[a["survey"].astype(str) == survey]
+    if a.empty:
+        return
+    a = a.assign(estimate=a["estimate"].round(3),
+                 ci=[f"[{lo:.3f}, {hi:.3f}]" for lo, hi in zip(a["ci_low"], a["ci_high"])],
+                 p_perm=a["p_perm"].round(3))
+    tbl = a.pivot_table(index="ethnicity", columns="stat", values=["estimate", "ci", "p_perm"],
+                        aggfunc="first", sort=False)
+    tbl.columns = [f"{stat} {what}" for what, stat in tbl.columns]
+    order = [f"{s} {w}" for s in ["r", "slope", "partial_r"] for w in ["estimate", "ci", "p_perm"]]
+    st.subheader("Association strength")
+    st.dataframe(tbl[[c for c in order if c in tbl.columns]], use_container_width=True)
+    n = int(a["n_clusters"].max())
+    st.caption(f"{n} health regions per estimate: CIs resample whole regions "
+               f"({'all' if a['boot_exact'].all() else int(a['n_boot'].max())} bootstrap draws), "
+               f"p-values permute the exposure between regions "
+               f"({'exact' if a['perm_exact'].all() else int(a['n_perm'].max())}). "
+               "partial_r controls for NZDep deciles 9–10. "
+               "With this few regions, wide intervals are expected.")
+
 def pollutant_options_from(df: pd.DataFrame) -> dict:
     """
     Return a mapping like {"PM2.5": "pm25_ugm3_2023", "PM10": "pm10_ugm3_2023"}
@@ -106,23 +179,36 @@ if page == "Night-lights":
     st.title("🌃 Night-time brightness by Territorial Authority (VIIRS 2021)")
 
     csv_path = DATA_PROC / "viirs_ta_annual_2021_with_names.csv"
-    gj_path = DATA_RAW / "ta2025_ms_5pct.geojson"
+    gj_path = geo_lod.manifest_path("ta")
+    if not gj_path.exists():
+        gj_path = geo_lod.FALLBACK["ta"]
 
     if not csv_path.exists():
         note_missing(csv_path, "Run your choropleth script or commit the CSV.")
     elif not gj_path.exists():
         note_missing(gj_path, "Commit the TA 2025 GeoJSON to the repo.")
     else:
-        df = load_csv(csv_path).copy()
-        df["ta_code_str"] = (
-            pd.to_numeric(df["ta_code"], errors="coerce")
-            .astype("Int64").astype(str).str.zfill(3)
-        )
+        df = load_csv(csv_path).copy()                  # ta_code_str: '001'
         bands = ["Very low", "Low", "Medium", "High", "Very high"]
         df["radiance_band"] = pd.qcut(df["radiance_mean"], 5, labels=bands)
 
-        gj = load_json(gj_path)
-        tab1, tab2 = st.tabs(["Relative (quantiles)", "Absolute (radiance)"])
+        c1, c2 = st.columns([2, 1])
+        with c1:
+            view = st.selectbox("View", list(MAP_VIEWS), index=0)
+        (lat, lon), zoom = MAP_VIEWS[view]
+        raster = viirs_tile_layer()
+        with c2:
+            show_px = st.checkbox(
+                f"Overlay VIIRS {raster['year']} pixels" if raster else "Overlay VIIRS pixels",
+                value=False, disabled=raster is None,
+                help="Pre-rendered tiles from scripts/21_render_viirs_tiles.py",
+            )
+        # plotly mapbox raster layer (drawn above the TA fills; dark pixels are transparent)
+        px_layers = [{"sourcetype": "raster", "source": [raster["url"]], "opacity": raster["opacity"],
+                      "minzoom": raster["minzoom"], "maxzoom": raster["maxzoom"]}] if show_px else []
+        # national view: no extent filter; city views: only ship nearby TAs
+        gj = load_ta_geojson(zoom, None if zoom < 6 else (lat, lon))
+        tab1, tab2, tab3 = st.tabs(["Relative (quantiles)", "Absolute (radiance)", "Vector tiles"])
 
         with tab1:
             fig_rel = px.choropleth_mapbox(
@@ -131,14 +217,14 @@ if page == "Night-lights":
                 color="radiance_band",
                 hover_name="ta_name",
                 mapbox_style="carto-positron",
-                center={"lat": -41.3, "lon": 174.7}, zoom=4.9,
+                center={"lat": lat, "lon": lon}, zoom=zoom,
             )
             fig_rel.update_traces(marker_line_color="black", marker_line_width=0.4)
             fig_rel.update_layout(
                 height=680,
                 margin=dict(l=0, r=0, t=60, b=10),
                 legend=dict(orientation="h", y=0.02, x=0.99, xanchor="right"),
-                mapbox=dict(center=dict(lat=-41.2, lon=173.0), zoom=4.2),
+                mapbox=dict(center=dict(lat=lat, lon=lon), zoom=zoom, layers=px_layers),
             )
             st.plotly_chart(fig_rel, width="stretch", config={"displayModeBar": True})
 
@@ -149,17 +235,32 @@ if page == "Night-lights":
                 color="radiance_mean", color_continuous_scale="Viridis",
                 hover_name="ta_name",
                 mapbox_style="carto-positron",
-                center={"lat": -41.3, "lon": 174.7}, zoom=4.9,
+                center={"lat": lat, "lon": lon}, zoom=zoom,
             )
             fig_abs.update_traces(marker_line_color="black", marker_line_width=0.4)
             fig_abs.update_layout(
                 height=680,
                 margin=dict(l=0, r=0, t=60, b=10),
                 legend=dict(orientation="h", y=0.02, x=0.99, xanchor="right"),
-                mapbox=dict(center=dict(lat=-41.2, lon=173.0), zoom=4.2),
+                mapbox=dict(center=dict(lat=lat, lon=lon), zoom=zoom, layers=px_layers),
             )
             st.plotly_chart(fig_abs, width="stretch", config={"displayModeBar": True})
 
+        with tab3:
+            # geometry streams from the MVT pyramid; only the ~70 TA values are sent
+            if not (DOCS / "tiles" / "ta" / "tiles.json").exists() and "ALAN_TILE_URL" not in os.environ:
+                st.info("Build tiles with scripts/33_build_vector_tiles.py and serve them with "
+                        "scripts/34_serve_tiles.py (or set ALAN_TILE_URL).")
+            else:
+                html = maplibre_page(
+                    "TA radiance (vector tiles)", center=(lat, lon), zoom=zoom,
+                    vector={"url": f"{TILE_URL}/tiles/ta/{{z}}/{{x}}/{{y}}.pbf", "layer": "ta",
+                            "values": dict(zip(df["ta_code_str"], df["radiance_mean"]))},
+                    rasters=[raster] if show_px else None,
+                    legend="Mean radiance (nW/cm²·sr)",
+                )
+                components.html(html, height=680)
+
     st.caption("Data: NASA VIIRS Night Lights (2021), Stats NZ TA 2025")
 
 # -------------------------------------------------
@@ -169,10 +270,23 @@ elif page == "Air quality":
     st.title("🌬️ PM₂.₅ / PM₁₀ — annual means by region")
 
     xlsx_path = DATA_RAW / "lawa_air-quality-download-data_2016-2024.xlsx"
-    if not xlsx_path.exists():
+    periods_csv = DATA_PROC / "air_periods_by_region.csv"
+    if not xlsx_path.exists() and not storage.exists(periods_csv):
         note_missing(xlsx_path, "Download from LAWA and save to data_raw/.")
     else:
-        annual = load_lawa_annual(xlsx_path)
+        if storage.exists(periods_csv):
+            # coverage-weighted region means from scripts/61_clean_lawa_air.py
+            per = load_csv(periods_csv)
+            span = st.radio("Period", ["Annual", "Winter (JJA)"], horizontal=True)
+            if span == "Annual":
+                annual = per[per["freq"] == "year"]
+            else:
+                annual = per[(per["freq"] == "season") & per["period"].str.endswith("JJA")]
+            annual = (annual.rename(columns={"mean_ugm3": "value_ugm3"})
+                            .assign(year=annual["period"].str[:4].astype(int)))
+        else:
+            span = "Annual"
+            annual = load_lawa_annual(xlsx_path)
         year = st.slider(
             "Year",
             min_value=int(annual["year"].min()),
@@ -192,14 +306,16 @@ elif page == "Air quality":
         fig = px.bar(
             pick, x="region", y="value_ugm3",
             color="value_ugm3", color_continuous_scale="Viridis",
-            title=f"{metric} annual mean by region — {year}",
+            title=f"{metric} {'annual' if span == 'Annual' else 'winter (JJA)'} mean by region — {year}",
             labels={"value_ugm3": "µg/m³", "region": "Region"},
         )
         fig.update_layout(xaxis_tickangle=-30, coloraxis_showscale=True,
                           height=520, margin=dict(l=10, r=10, t=60, b=10))
         st.plotly_chart(fig, width="stretch")
 
-        st.caption("Source: LAWA air quality monitoring (download 2016–2024).")
+        st.caption("Source: LAWA air quality monitoring (download 2016–2024)."
+                   + (" Site means need ≥ 75% of days measured; regions weight sites by coverage."
+                      if periods_csv.exists() else ""))
 
 # -------------------------------------------------
 # Health × Night-lights page
@@ -226,6 +342,7 @@ elif page == "Health × Night-lights":
         )
         fig.update_layout(height=520, margin=dict(l=10, r=10, t=60, b=10))
         st.plotly_chart(fig, width="stretch")
+        show_associations("radiance_mean")
     else:
         note_missing(merged_csv, "Run your merge & plotting scripts to generate it.")
 
@@ -242,26 +359,35 @@ elif page == "Health × Night-lights":
 # Equity lens page
 # -------------------------------------------------
 elif page == "Equity lens: PM₂.₅ × Obesity":
-    st.title("⚖️ Equity lens — Air pollution × Obesity (2020/21 × 2023)")
+    st.title("⚖️ Equity lens — Air pollution × Obesity")
 
     csv_merged = DATA_PROC / "air_obesity_by_health_region_2023.csv"
-    if not csv_merged.exists():
+    panel = load_equity_panel()
+    if panel.empty and not csv_merged.exists():
         note_missing(csv_merged, "Run scripts/71_merge_pm25_obesity_by_health_region.py first.")
     else:
-        df = load_csv(csv_merged).copy()
-
-        # Clean names and sanity check
-        df.columns = [c.strip().replace(" ", "_").lower() for c in df.columns]
-        need = {"health_region", "ethnicity", "obesity_rate"}
-        miss = need - set(df.columns)
-        if miss:
-            st.error(f"Missing columns in {csv_merged.name}: {sorted(miss)}")
-            st.stop()
+        if len(panel):
+            # analysis panel: every survey year, PM matched to each survey period
+            surveys = sorted(panel["year_to"].unique())
+            survey = st.selectbox("Survey year", surveys, index=len(surveys) - 1)
+            df = panel[panel["year_to"] == survey].copy()
+            pol_map = {k: c for k, c in PANEL_POLLUTANTS.items() if df[c].notna().any()}
+            pm_period = f"matched to {survey}"
+        else:
+            # committed snapshot CSV (latest survey × 2023 PM)
+            df = load_csv(csv_merged).copy()
+            df.columns = [c.strip().replace(" ", "_").lower() for c in df.columns]
+            need = {"health_region", "ethnicity", "obesity_rate"}
+            miss = need - set(df.columns)
+            if miss:
+                st.error(f"Missing columns in {csv_merged.name}: {sorted(miss)}")
+                st.stop()
+            pol_map = pollutant_options_from(df)  # {"PM2.5": "...", "PM10": "..."}
+            survey = str(df["year_to"].iloc[0]) if "year_to" in df.columns and len(df) else "2020/21"
+            pm_period = "2023"
 
-        # Pollutant choices
-        pol_map = pollutant_options_from(df)  # {"PM2.5": "...", "PM10": "..."}
         if not pol_map:
-            st.error("No pollutant columns found (expected pm25_ugm3_2023 and/or pm10_ugm3_2023).")
+            st.error("No pollutant columns found (expected pm25_ugm3 and/or pm10_ugm3).")
             st.stop()
 
         # Controls
@@ -297,8 +423,8 @@ elif page == "Equity lens: PM₂.₅ × Obesity":
             size=size_arg, size_max=30,
             facet_col="health_region", facet_col_wrap=2,
             labels={
-                pol_col: f"{pol_label} annual mean (µg/m³, 2023)",
-                "obesity_rate": "Obesity rate (proportion of adults, 2020/21)"
+                pol_col: f"{pol_label} mean (µg/m³, {pm_period})",
+                "obesity_rate": f"Obesity rate (proportion of adults, {survey})"
             },
             hover_data=[c for c in ["health_region","ethnicity","nzdep_9_10_share",
                                     "obesity_rate_low","obesity_rate_high"] if c in df.columns],
@@ -335,8 +461,8 @@ elif page == "Equity lens: PM₂.₅ × Obesity":
             color="ethnicity", symbol="ethnicity",
             size=size_arg, size_max=34, text="ethnicity",
             labels={
-                pol_col: f"{pol_label} annual mean (µg/m³, 2023)",
-                "obesity_rate": "Obesity rate (proportion of adults, 2020/21)"
+                pol_col: f"{pol_label} mean (µg/m³, {pm_period})",
+                "obesity_rate": f"Obesity rate (proportion of adults, {survey})"
             },
         )
         fig_one.update_traces(marker_line=dict(width=0.8, color="black"),
@@ -352,6 +478,8 @@ elif page == "Equity lens: PM₂.₅ × Obesity":
         fig_one.update_layout(margin=dict(l=10, r=10, t=40, b=10), height=520)
         st.plotly_chart(fig_one, width="stretch")
 
+        show_associations(PANEL_POLLUTANTS[pol_label], survey)
+
         # Table + download
         st.caption("Data table (filtered to available rows).")
         cols_show = ["health_region", "ethnicity", pol_col, "obesity_rate",
@@ -362,7 +490,7 @@ elif page == "Equity lens: PM₂.₅ × Obesity":
         st.download_button(
             "Download CSV",
             data=df[cols_show].to_csv(index=False).encode("utf-8"),
-            file_name=f"equity_lens_{pol_label.replace('.','')}_2023.csv",
+            file_name=f"equity_lens_{pol_label.replace('.','')}_{survey.replace('/', '-')}.csv",
             mime="text/csv",
         )
 